@@ -0,0 +1,127 @@
+from common.clean_lyrics import apply_lowercase, WORD_BOUNDARY_CHARS
+from common.benchmark_compression import repetitive_songs
+from random import Random
+import time
+
+
+def apply_lowercase_legacy(lyrics):
+    # "apply_lowercase" before it was a regular expression search, kept to
+    # validate and compare the speed of the new version (its uppercase check,
+    # "ch.lower != ch", is always true, so every character follows the
+    # uppercase rules; lowering a character that is not uppercase does not
+    # change it):
+    lowered_lyrics = ''
+
+    for i, ch in enumerate(lyrics):
+
+        # load next and previous character:
+        if i == 0:  # first character
+            previous_ch = ' '  # split word character
+        else:
+            previous_ch = lyrics[i-1]
+
+        if i == len(lyrics) - 1:  # last character
+            next_ch = ' '  # split word character
+        else:
+            next_ch = lyrics[i+1]
+
+        # decide whether or not to lower an uppercase character:
+        if ch.lower != ch:  # uppercase ("A")
+            if previous_ch in WORD_BOUNDARY_CHARS:  # (" A")
+                if next_ch.lower() != next_ch:  # uppercase too (" AB")
+                    lowered_lyrics += ch
+                elif ch == 'I' and next_ch in WORD_BOUNDARY_CHARS:  # (" I ")
+                    lowered_lyrics += ch
+                else:  # (" Ab")
+                    lowered_lyrics += ch.lower()
+
+            elif previous_ch.lower() != previous_ch:  # uppercase too ("BA")
+                lowered_lyrics += ch
+
+            else:  # weird case ("bA")
+                lowered_lyrics += ch.lower()
+
+        elif ch in WORD_BOUNDARY_CHARS:  # split character (" ")
+            lowered_lyrics += ch
+
+        else:  # lowercase ("a")
+            lowered_lyrics += ch
+
+    return lowered_lyrics
+
+
+def fixture_texts(num_texts=100000, seed=0):
+    # short random texts made of letters (including non-ASCII uppercase and
+    # titlecase letters), word boundaries and other characters, covering all
+    # the rules of "apply_lowercase":
+    rand = Random(seed)
+    characters = ('aAbBIiUuSsXY \n,.;:/_()[]{}?!"\'’-1'
+                  'İǅΣσßẞÉé')
+    return [''.join(rand.choices(characters, k=rand.randint(0, 12)))
+            for _ in range(num_texts)]
+
+
+def fixture_lyrics(num_songs=1000):
+    # lyrics of synthetic songs (see "repetitive_songs") with capitalised
+    # lines, acronyms and "I" pronouns:
+    rand = Random(0)
+    lyrics = []
+    for song in repetitive_songs(num_songs):
+        lines = []
+        for line in song.lyrics.split('\n'):
+            words = line.split(' ')
+            for i in range(len(words)):
+                dice = rand.random()
+                if dice < 0.05:
+                    words[i] = 'I'
+                elif dice < 0.08:
+                    words[i] = '"USA"'
+                elif dice < 0.1:
+                    words[i] = words[i].upper()
+            lines.append(' '.join(words).capitalize())
+        lyrics.append('\n'.join(lines))
+    return lyrics
+
+
+def validate_apply_lowercase():
+    """
+    Check that "apply_lowercase" gives the same output as the legacy
+    implementation on the fixture texts and lyrics.
+    """
+    texts = fixture_texts() + fixture_lyrics()
+    for text in texts:
+        if apply_lowercase(text) != apply_lowercase_legacy(text):
+            raise ValueError('Different output for {!r}: {!r} != {!r}'
+                             .format(text, apply_lowercase(text),
+                                     apply_lowercase_legacy(text)))
+    print('{} texts lowered identically.'.format(len(texts)))
+
+
+def benchmark_apply_lowercase():
+    """
+    Print the time taken by "apply_lowercase" and by the legacy
+    implementation on song-length, album-length and songwriter-length
+    lyrics.
+    """
+    lyrics = fixture_lyrics()
+    apply_lowercase('')  # compile the regular expression
+    for name, texts in (('song', lyrics),
+                        ('album', ['\n\n'.join(lyrics[i:i + 10])
+                                   for i in range(0, len(lyrics), 10)]),
+                        ('songwriter', ['\n\n'.join(lyrics[i:i + 200])
+                                        for i in range(0, len(lyrics), 200)])):
+        times = []
+        for function in (apply_lowercase_legacy, apply_lowercase):
+            start = time.perf_counter()
+            for text in texts:
+                function(text)
+            times.append(time.perf_counter() - start)
+        print('{:>10} lyrics ({} x {:,} characters): legacy {:.3f} s, new '
+              '{:.3f} s ({:.0f}x faster)'
+              .format(name, len(texts), len(texts[0]), times[0], times[1],
+                      times[0] / times[1]))
+
+
+if __name__ == '__main__':
+    validate_apply_lowercase()
+    benchmark_apply_lowercase()
@@ -0,0 +1,75 @@
+from common.songs_and_albums import write_songs_json, load_songs_json, \
+    write_songs_csv, load_songs_csv
+from common.benchmark_song_memory import random_songs
+from os.path import getsize
+from random import Random
+import time
+
+
+# compressed files compared with the uncompressed JSON and CSV files, as
+# (extension, compression level):
+BENCHMARK_COMPRESSIONS = [('', None), ('.gz', 1), ('.gz', 6), ('.gz', 9),
+                          ('.bz2', 1), ('.bz2', 9), ('.xz', 1), ('.xz', 6),
+                          ('.xz', 9)]
+
+
+def repetitive_songs(num_songs, seed=0):
+    # synthetic songs (see "random_songs") with lyrics made of verses of
+    # random words and a chorus repeated three times, like real lyrics:
+    rand = Random(seed)
+    vocabulary = ['word{}'.format(i) for i in range(5000)]
+
+    def lines(num_lines):
+        return '\n'.join([' '.join(rand.choices(vocabulary, k=7))
+                          for _ in range(num_lines)])
+
+    for song in random_songs(num_songs, seed=seed):
+        chorus = lines(4)
+        song.lyrics = '\n\n'.join([lines(8), chorus, lines(8), chorus,
+                                   lines(4), chorus])
+        yield song
+
+
+def benchmark_compression(base_path, num_songs=20000):
+    """
+    Write a corpus of synthetic songs as JSON and CSV files, uncompressed and
+    compressed with several formats and levels, and print the time to write
+    each file, its size, and the time to load it.
+    :param base_path: (str) path to the files to write, without extension.
+    :param num_songs: (int) number of songs.
+    """
+    songs = {song.title: song for song in repetitive_songs(num_songs)}
+    print('{:>14} {:>6} {:>9} {:>10} {:>6} {:>8}'
+          .format('file', 'level', 'write (s)', 'size (MiB)', 'ratio',
+                  'load (s)'))
+    for extension, write_function, load_function in (
+            ('.json', write_songs_json, load_songs_json),
+            ('.csv', write_songs_csv, load_songs_csv)):
+        uncompressed_size = None
+        for compression, level in BENCHMARK_COMPRESSIONS:
+            path = base_path + extension + compression
+            start = time.perf_counter()
+            if level is None:
+                write_function(songs, path)
+            else:
+                write_function(songs, path, compresslevel=level)
+            write_seconds = time.perf_counter() - start
+
+            size = getsize(path)
+            if uncompressed_size is None:
+                uncompressed_size = size
+
+            start = time.perf_counter()
+            load_function(path)
+            load_seconds = time.perf_counter() - start
+
+            print('{:>14} {:>6} {:9.2f} {:10.1f} {:6.1f} {:8.2f}'
+                  .format(extension + compression,
+                          '-' if level is None else level, write_seconds,
+                          size / 2 ** 20, uncompressed_size / size,
+                          load_seconds))
+
+
+if __name__ == '__main__':
+    benchmark_path = r"C:\Users\pablo\ProjectsData\Lyrics\benchmark_songs"
+    benchmark_compression(benchmark_path)
@@ -0,0 +1,66 @@
+from common.clean_lyrics import get_pos_tagger, apply_lowercase
+from common.benchmark_clean_lyrics import fixture_lyrics
+from nltk import word_tokenize
+import nltk
+import time
+
+
+def pos_tag_lyrics_legacy(lyrics):
+    # tags of some lyrics as "filter_pos" used to compute them, kept to
+    # validate and compare the speed of "PosTagger" (older NLTK versions
+    # load the tagger model on every "nltk.pos_tag" call):
+    return nltk.pos_tag(word_tokenize(lyrics))
+
+
+def validate_pos_tagger(num_songs=200):
+    """
+    Check that "PosTagger" gives the same tags as the legacy per-call path on
+    the fixture lyrics, one at a time and in a batch.
+    :param num_songs: (int) number of fixture songs.
+    """
+    lyrics = [apply_lowercase(text) for text in fixture_lyrics(num_songs)]
+    tagger = get_pos_tagger()
+    legacy_tags = [pos_tag_lyrics_legacy(text) for text in lyrics]
+    if [tagger.tag(text) for text in lyrics] != legacy_tags:
+        raise ValueError('Different tags of single lyrics')
+    if tagger.tag_many(lyrics) != legacy_tags:
+        raise ValueError('Different tags of batched lyrics')
+    print('{} lyrics tagged identically.'.format(len(lyrics)))
+
+
+def benchmark_pos_tagger(num_songs=1000, batch_size=100):
+    """
+    Print the throughput (tokens per second) of the legacy per-call tagging
+    and of "PosTagger", one song at a time and in batches of songs.
+    :param num_songs: (int) number of fixture songs.
+    :param batch_size: (int) number of songs per batch.
+    """
+    lyrics = [apply_lowercase(text) for text in fixture_lyrics(num_songs)]
+    tagger = get_pos_tagger()  # load the model before timing
+
+    def per_song(function):
+        return lambda texts: [function(text) for text in texts]
+
+    def batched(texts):
+        tagged = []
+        for start in range(0, len(texts), batch_size):
+            tagged.extend(tagger.tag_many(texts[start:start + batch_size]))
+        return tagged
+
+    legacy_seconds = None
+    for name, function in (('legacy', per_song(pos_tag_lyrics_legacy)),
+                           ('tagger', per_song(tagger.tag)),
+                           ('batched', batched)):
+        start = time.perf_counter()
+        num_tokens = sum(map(len, function(lyrics)))
+        seconds = time.perf_counter() - start
+        if legacy_seconds is None:
+            legacy_seconds = seconds
+        print('{:>8}: {:,} tokens in {:.2f} s ({:,.0f} tokens/s, {:.1f}x)'
+              .format(name, num_tokens, seconds, num_tokens / seconds,
+                      legacy_seconds / seconds))
+
+
+if __name__ == '__main__':
+    validate_pos_tagger()
+    benchmark_pos_tagger()
@@ -0,0 +1,114 @@
+from common.songs_and_albums import Song, Album, write_songs_json, \
+    load_songs_json
+from common.song_table import SongTable
+from random import Random
+import tracemalloc
+import json
+import gc
+
+
+class DictSong:
+    # Song object with a dictionary of attributes, as before the slots were
+    # introduced, kept to compare the memory used by both:
+    def __init__(self, title):
+        self.title = title
+        self.songwriters = set()
+
+
+def load_dict_songs(input_path):
+    # load the songs of a JSON file in DictSong objects, as "load_songs_json"
+    # did before the slots were introduced:
+    songs, albums = {}, {}
+    for line in open(input_path, 'r', encoding="utf-8"):
+        json_dict = json.loads(line.rstrip())
+        song = DictSong(json_dict['title'])
+        for key, value in json_dict.items():
+            setattr(song, key, value)
+        song.songwriters = set(song.songwriters)
+        album_title = json_dict['album']['title']
+        if album_title not in albums:
+            albums[album_title] = DictSong(album_title)
+            for key, value in json_dict['album'].items():
+                setattr(albums[album_title], key, value)
+        song.album = albums[album_title]
+        albums[album_title].songs.append(song)
+        songs['{} - {}'.format(song.title, album_title)] = song
+    return songs, albums
+
+
+def random_songs(num_songs, seed=0):
+    """
+    Generate synthetic songs: about 10 songs per album, 10 albums per artist
+    and 2 songwriters per song, with short lyrics.
+    :param num_songs: (int) number of songs.
+    :param seed: (int) random seed.
+    :return songs: generator of Song objects.
+    """
+    rand = Random(seed)
+    album = None
+    for i in range(num_songs):
+        if i % 10 == 0:
+            album = Album('Album {}'.format(i // 10))
+            album.year = 1960 + rand.randint(0, 60)
+            album.number = (i // 10) % 10 + 1
+            album.album_type = 'album'
+        song = Song('Song {}'.format(i))
+        song.artist = 'Artist {}'.format(i // 100)
+        song.track_number = i % 10 + 1
+        song.album = album
+        song.lyrics_url = 'https://www.azlyrics.com/lyrics/{}.html'.format(i)
+        song.lyrics = 'la la la {}'.format(i)
+        song.instrumental = False
+        song.songwriters = set(['Songwriter {}'.format(rand.randint(0, 5000))
+                                for _ in range(2)])
+        song.positive_sentiment = rand.random()
+        song.negative_sentiment = rand.random()
+        song.compound_sentiment = rand.random()
+        yield song
+
+
+def write_random_songs(output_path, num_songs, seed=0):
+    """
+    Write a JSON file with synthetic songs (see "random_songs"; the memory
+    used by their short lyrics is the same in all representations).
+    :param output_path: (str) path to the output JSON file.
+    :param num_songs: (int) number of songs.
+    :param seed: (int) random seed.
+    """
+    songs = {song.title: song for song in random_songs(num_songs, seed=seed)}
+    write_songs_json(songs, output_path)
+
+
+def measure_bytes(load_function, input_path):
+    # bytes allocated by the objects returned by a loading function:
+    gc.collect()
+    tracemalloc.start()
+    loaded = load_function(input_path)
+    gc.collect()
+    loaded_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del loaded
+    return loaded_bytes
+
+
+def benchmark_song_memory(input_path, num_songs=100000):
+    """
+    Write a JSON file with synthetic songs and print the memory used per song
+    after loading it as dictionary-based objects, as slotted Song objects and
+    as a SongTable.
+    :param input_path: (str) path to the JSON file to write and load.
+    :param num_songs: (int) number of songs.
+    """
+    write_random_songs(input_path, num_songs)
+    for name, load_function in (('dict-based objects', load_dict_songs),
+                                ('slotted Song objects', load_songs_json),
+                                ('SongTable', SongTable.load_json)):
+        loaded_bytes = measure_bytes(load_function, input_path)
+        print('{:>20}: {:7.1f} bytes per song ({:.1f} MiB for {} songs)'
+              .format(name, loaded_bytes / num_songs, loaded_bytes / 2 ** 20,
+                      num_songs))
+
+
+if __name__ == '__main__':
+    benchmark_path = r"C:\Users\pablo\ProjectsData\Lyrics\benchmark_songs.json"
+    benchmark_song_memory(benchmark_path)
@@ -0,0 +1,110 @@
+from common.songs_and_albums import write_songs_csv, load_songs_csv, \
+    iter_songs, CSV_HEADER
+from common.words import get_word_stats
+from common.benchmark_song_memory import random_songs
+import time
+
+
+# lyrics with the characters that the CSV files have to quote:
+BENCHMARK_LYRICS = ('I said "hey | you"\nla la la {}\n\n'
+                    'Oh, oh, oh | "yeah"\nla la la')
+
+
+def benchmark_songs(num_songs, seed=0):
+    # synthetic songs (see "random_songs") with multi-line lyrics that contain
+    # quotes and delimiters:
+    for song in random_songs(num_songs, seed=seed):
+        song.lyrics = BENCHMARK_LYRICS.format(song.title)
+        yield song
+
+
+def write_songs_csv_legacy(songs, output_path):
+    # CSV writer before the csv module was used, kept to compare the speed of
+    # both (its lyrics lose their line breaks and break on quotes):
+    with open(output_path, 'w', encoding="utf-8") as output_file:
+        output_file.write('|'.join(CSV_HEADER) + '\n')
+        for song in songs:
+
+            lyrics = song.lyrics
+            num_words, num_unique_words = get_word_stats(lyrics)
+            while '\n' in lyrics:
+                lyrics = lyrics.replace('\n', '  ')
+
+            output_file.write(
+                '{}|{}|{}|{}|{}|{}|{}|{}|"{}"|{}|{}|{}|{}|{}\n'
+                .format(song.title,
+                        song.artist,
+                        song.track_number,
+                        song.album.title,
+                        song.album.year,
+                        song.album.number,
+                        song.instrumental,
+                        ','.join(sorted(list(song.songwriters))),
+                        lyrics,
+                        num_words,
+                        num_unique_words,
+                        song.positive_sentiment,
+                        song.negative_sentiment,
+                        song.compound_sentiment
+                        )
+                              )
+
+
+def check_round_trip(input_path, num_songs, seed=0):
+    # check that the songs loaded from a CSV file written by
+    # "write_songs_csv" are the songs that were written:
+    loaded_songs = iter_songs(input_path)
+    for song, loaded_song in zip(benchmark_songs(num_songs, seed=seed),
+                                 loaded_songs):
+        for name in ('title', 'artist', 'track_number', 'instrumental',
+                     'songwriters', 'lyrics', 'positive_sentiment',
+                     'negative_sentiment', 'compound_sentiment'):
+            if getattr(song, name) != getattr(loaded_song, name):
+                raise ValueError('{} of song "{}" changed: {!r} != {!r}'
+                                 .format(name, song.title,
+                                         getattr(song, name),
+                                         getattr(loaded_song, name)))
+        if (song.album.title, song.album.year, song.album.number) != \
+                (loaded_song.album.title, loaded_song.album.year,
+                 loaded_song.album.number):
+            raise ValueError('album of song "{}" changed'.format(song.title))
+
+
+def benchmark_songs_csv(output_path, num_songs=1000000):
+    """
+    Write a CSV file with synthetic songs with the legacy writer and with
+    "write_songs_csv", read it back with "iter_songs" and "load_songs_csv", and
+    print the throughput of each step. The songs read are checked against the
+    songs written.
+    :param output_path: (str) path to the CSV file to write and load.
+    :param num_songs: (int) number of songs.
+    """
+    def report(name, start):
+        seconds = time.perf_counter() - start
+        print('{:>16}: {:6.2f} s ({:,.0f} rows/s)'
+              .format(name, seconds, num_songs / seconds))
+
+    start = time.perf_counter()
+    write_songs_csv_legacy(benchmark_songs(num_songs), output_path)
+    report('legacy export', start)
+
+    start = time.perf_counter()
+    write_songs_csv(benchmark_songs(num_songs), output_path)
+    report('export', start)
+
+    start = time.perf_counter()
+    for _ in iter_songs(output_path):
+        pass
+    report('streaming import', start)
+
+    start = time.perf_counter()
+    load_songs_csv(output_path)
+    report('import', start)
+
+    check_round_trip(output_path, num_songs)
+    print('{} songs read back unchanged.'.format(num_songs))
+
+
+if __name__ == '__main__':
+    benchmark_path = r"C:\Users\pablo\ProjectsData\Lyrics\benchmark_songs.csv"
+    benchmark_songs_csv(benchmark_path)
@@ -1,76 +1,169 @@
 import nltk
 from nltk import word_tokenize
 from random import shuffle, seed
+import re
+import sys
 
 
 SPLIT_WORD_CHARS = {' ', '\n', ',', '.', ';', ':', '/', '_',
                     '(', ')', '[', ']', '{', '}', '?', '!'}
 
 
+# characters around words: an uppercase letter next to one of them is at the
+# beginning or end of a word. Quotes are included so that '"USA"' is not
+# mistakenly converted to '"usa"':
+WORD_BOUNDARY_CHARS = SPLIT_WORD_CHARS | {'\"', '\'', '’'}
+
+# compiled by "_lowercase_pattern" the first time it is needed:
+_LOWERCASE_PATTERN = None
+
+# loaded by "get_pos_tagger" the first time it is needed:
+_POS_TAGGER = None
+
+
+def _char_class(chars):
+    # regular expression character class matching a set of characters, with
+    # consecutive code points written as ranges:
+    codes = sorted([ord(ch) for ch in chars])
+    ranges, start = [], 0
+    for i in range(1, len(codes) + 1):
+        if i == len(codes) or codes[i] != codes[i - 1] + 1:
+            first, last = chr(codes[start]), chr(codes[i - 1])
+            ranges.append(re.escape(first) if first == last else
+                          '{}-{}'.format(re.escape(first), re.escape(last)))
+            start = i
+    return ''.join(ranges)
+
+
+def _lowercase_pattern():
+    """
+    Regular expression matching the uppercase characters that
+    "apply_lowercase" converts to lowercase. A character is uppercase if
+    lowering it changes it, and it is converted unless:
+    - it starts a word and the next character is uppercase too (" AB"), or
+    - it is a single-letter "I" word (" I "), or
+    - the previous character, in the same word, is uppercase too ("BA").
+    :return pattern: (compiled regular expression)
+    """
+    global _LOWERCASE_PATTERN
+    if _LOWERCASE_PATTERN is None:
+        upper = _char_class([ch for ch in map(chr, range(sys.maxunicode + 1))
+                             if ch.lower() != ch])
+        boundary = _char_class(WORD_BOUNDARY_CHARS)
+        # the pattern starts with the uppercase characters, so that the
+        # search skips quickly to them, and the characters around each one
+        # are checked with lookarounds:
+        _LOWERCASE_PATTERN = re.compile(
+            '[{u}](?:'
+            # first letter of a word, not followed by uppercase ("Ab"), or "I"
+            # followed by a letter of the same word ("Iz"):
+            '(?<![^{b}].)(?:(?<!I)(?![{u}])|(?<=I)(?=[^{b}{u}]))'
+            # letter after a lowercase letter or other character ("bA"):
+            '|(?<=[^{b}{u}].))'.format(b=boundary, u=upper))
+    return _LOWERCASE_PATTERN
+
+
 def apply_lowercase(lyrics):
     """
     Given some lyrics, this function converts all letters to lowercase except
     for those uppercase letters that are followed and/or preceded by another
     uppercase letter (i.e. acronyms: "USA", etc.), and "I" pronouns.
+    The letters to convert are found with a single regular expression search
+    (see "_lowercase_pattern").
     :param lyrics: (str)
     :return lowered_lyrics: (str)
     """
-    # if we did not add these chars, then we would mistakenly convert '"USA"'
-    # to '"usa"':
-    split_word_chars = SPLIT_WORD_CHARS | {'\"', '\'', '’'}
+    return _lowercase_pattern().sub(_lower_match, lyrics)
 
-    lowered_lyrics = ''
 
-    for i, ch in enumerate(lyrics):
+def _lower_match(match):
+    return match.group().lower()
 
-        # load next and previous character:
-        if i == 0:  # first character
-            previous_ch = ' '  # split word character
-        else:
-            previous_ch = lyrics[i-1]
 
-        if i == len(lyrics) - 1:  # last character
-            next_ch = ' '  # split word character
-        else:
-            next_ch = lyrics[i+1]
+def tagger_version():
+    """
+    :return version: (str) identifier of the tokenizer and part-of-speech
+        tagger of "pos_tag_lyrics", which changes when NLTK is upgraded (so
+        that tags stored by other versions are not reused, see "TagCache").
+    """
+    return 'nltk {} word_tokenize pos_tag'.format(nltk.__version__)
 
-        # decide whether or not to lower an uppercase character:
-        if ch.lower != ch:  # uppercase ("A")
-            if previous_ch in split_word_chars:  # (" A")
-                if next_ch.lower() != next_ch:  # uppercase too (" AB")
-                    lowered_lyrics += ch
-                elif ch == 'I' and next_ch in split_word_chars:  # (" I ")
-                    lowered_lyrics += ch
-                else:  # (" Ab")
-                    lowered_lyrics += ch.lower()
 
-            elif previous_ch.lower() != previous_ch:  # uppercase too ("BA")
-                lowered_lyrics += ch
+class PosTagger:
+    """
+    Part-of-speech tagger of lyrics with the same model as "nltk.pos_tag",
+    which is loaded only once: older NLTK versions load the perceptron model
+    from disk on every "nltk.pos_tag" call (newer ones keep it, so the gain
+    is then only the overhead of each call). The tokenizer models of
+    "word_tokenize" are already loaded once by NLTK.
+    """
+    def __init__(self):
+        from nltk.tag.perceptron import PerceptronTagger
+        self.tagger = PerceptronTagger()
+
+    def tag(self, lyrics):
+        """
+        :param lyrics: (str)
+        :return tagged: ([(str, str)]) (token, tag) pairs of the lyrics.
+        """
+        return self.tagger.tag(word_tokenize(lyrics))
+
+    def tag_many(self, lyrics_list):
+        """
+        Tag the lyrics of many songs with a single call to the tagger.
+        :param lyrics_list: ([str])
+        :return tagged_list: ([[(str, str)]]) (token, tag) pairs of each
+            lyrics, in the same order.
+        """
+        return self.tagger.tag_sents([word_tokenize(lyrics)
+                                      for lyrics in lyrics_list])
+
+
+def get_pos_tagger():
+    """
+    :return tagger: (PosTagger object) tagger shared by the whole process.
+    """
+    global _POS_TAGGER
+    if _POS_TAGGER is None:
+        _POS_TAGGER = PosTagger()
+    return _POS_TAGGER
 
-            else:  # weird case ("bA")
-                lowered_lyrics += ch.lower()
 
-        elif ch in split_word_chars:  # split character (" ")
-            lowered_lyrics += ch
+def pos_tag_lyrics(lyrics):
+    """
+    Split some lyrics in NLTK tokens and tag them with their part-of-speech
+    (see "PosTagger").
+    :param lyrics: (str)
+    :return tagged: ([(str, str)]) (token, tag) pairs.
+    """
+    return get_pos_tagger().tag(lyrics)
 
-        else:  # lowercase ("a")
-            lowered_lyrics += ch
 
-    return lowered_lyrics
+def pos_tag_lyrics_many(lyrics_list):
+    """
+    Same as "pos_tag_lyrics", for the lyrics of many songs at once.
+    :param lyrics_list: ([str])
+    :return tagged_list: ([[(str, str)]])
+    """
+    return get_pos_tagger().tag_many(lyrics_list)
 
 
-def filter_pos(lyrics, pos_tags):
+def filter_pos(lyrics, pos_tags, tagged=None):
     """
     Given some lyrics, this function keeps only those words in the lyrics with
     part-of-speech tags contained in the given tag iterable.
     :param lyrics: (str)
     :param pos_tags: iterable(str)
+    :param tagged: ([(str, str)]) tagged tokens of the lyrics, if already
+        known (e.g. read from a "TagCache"). By default, the lyrics are
+        tagged with "pos_tag_lyrics".
     :return filtered_lyrics: (str)
     """
     seed(10)
     words = []
-    text = word_tokenize(lyrics)
-    for word, tag in nltk.pos_tag(text):
+    if tagged is None:
+        tagged = pos_tag_lyrics(lyrics)
+    for word, tag in tagged:
         if word == 'starman':
             tag = 'NN'
         if tag in pos_tags:
@@ -82,17 +175,19 @@ def filter_pos(lyrics, pos_tags):
     return filtered_lyrics
 
 
-def remove_stopwords(lyrics, stopwords, numbers=True):
+def remove_stopwords(lyrics, stopwords, numbers=True, tagged=None):
     """
     Remove stopwords from the given lyrics.
     :param lyrics: (str)
     :param stopwords: ([str])
     :param numbers: (boolean)
+    :param tagged: ([(str, str)]) see "filter_pos".
     :return filtered_lyrics: (str)
     """
     words = []
-    text = word_tokenize(lyrics)
-    for word, _tag in nltk.pos_tag(text):
+    if tagged is None:
+        tagged = pos_tag_lyrics(lyrics)
+    for word, _tag in tagged:
 
         if numbers is True:
             try:
@@ -1,5 +1,16 @@
 from os.path import join, exists
 from os import mkdir
+import gzip
+import bz2
+import lzma
+
+
+# compressed files are read and written with the module of their extension:
+COMPRESSION_MODULES = {'.gz': gzip, '.bz2': bz2, '.xz': lzma}
+
+# compression level (1 to 9) used by default: close to the size of the
+# highest level, at a fraction of its writing time:
+DEFAULT_COMPRESSLEVEL = 6
 
 
 def string_for_path(text):
@@ -32,3 +43,57 @@ def create_subdir(directory, subdir_name):
     if not exists(subdir):
         mkdir(subdir)
     return subdir
+
+
+def compression_extension(path):
+    """
+    :param path: (str)
+    :return extension: (str) compression extension of a path (e.g. '.gz' for
+        'songs.json.gz'), or '' if it is not compressed.
+    """
+    lower_path = path.lower()
+    for extension in COMPRESSION_MODULES:
+        if lower_path.endswith(extension):
+            return extension
+    return ''
+
+
+def uncompressed_path(path):
+    """
+    Remove the compression extension of a path, if any, e.g. to know the
+    format of a compressed file ('songs.csv.gz' -> 'songs.csv').
+    :param path: (str)
+    :return path: (str)
+    """
+    return path[:len(path) - len(compression_extension(path))]
+
+
+def open_text(path, mode='r', compresslevel=DEFAULT_COMPRESSLEVEL,
+              newline=None, buffering=-1):
+    """
+    Open a UTF-8 text file, compressed with gzip, bz2 or xz if its extension
+    is '.gz', '.bz2' or '.xz'. Compressed files are (de)compressed as they are
+    read or written, without being loaded in memory, and can be appended to.
+    :param path: (str) path to the file.
+    :param mode: (str) 'r', 'w' or 'a'.
+    :param compresslevel: (int) compression level, from 1 (fastest) to 9
+        (smallest), used when writing compressed files.
+    :param newline: (str) see the built-in "open" (e.g. '' for CSV files).
+    :param buffering: (int) buffer size of uncompressed files, see the
+        built-in "open".
+    :return file: (file object) text file.
+    """
+    extension = compression_extension(path)
+    if not extension:
+        return open(path, mode, encoding="utf-8", newline=newline,
+                    buffering=buffering)
+
+    options = {}
+    if mode != 'r':
+        if extension == '.xz':
+            options['preset'] = compresslevel
+        else:
+            options['compresslevel'] = compresslevel
+    return COMPRESSION_MODULES[extension].open(path, mode + 't',
+                                               encoding="utf-8",
+                                               newline=newline, **options)
@@ -0,0 +1,461 @@
+from common.songs_and_albums import Song, Album, SONG_ATTRIBUTES, \
+    ALBUM_ATTRIBUTES, load_songs_json, load_songs_csv, write_songs_json, \
+    write_songs_json_append
+from common.common import uncompressed_path
+import sqlite3
+import json
+import sys
+
+
+# extensions of the SQLite corpus files:
+DB_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS artists (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS albums (
+    id INTEGER PRIMARY KEY,
+    artist_id INTEGER REFERENCES artists (id),
+    title TEXT NOT NULL,
+    year INTEGER,
+    number INTEGER,
+    album_type TEXT,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS songs (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    artist_id INTEGER REFERENCES artists (id),
+    album_id INTEGER NOT NULL REFERENCES albums (id),
+    track_number INTEGER,
+    lyrics_url TEXT,
+    lyrics TEXT,
+    instrumental INTEGER,
+    positive_sentiment REAL,
+    negative_sentiment REAL,
+    compound_sentiment REAL,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS songwriters (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS song_songwriters (
+    song_id INTEGER NOT NULL REFERENCES songs (id),
+    songwriter_id INTEGER NOT NULL REFERENCES songwriters (id),
+    PRIMARY KEY (song_id, songwriter_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS albums_artist ON albums (artist_id, title);
+CREATE INDEX IF NOT EXISTS albums_title ON albums (title);
+CREATE INDEX IF NOT EXISTS albums_year ON albums (year);
+CREATE INDEX IF NOT EXISTS songs_album ON songs (album_id, title);
+CREATE INDEX IF NOT EXISTS songs_artist ON songs (artist_id);
+CREATE INDEX IF NOT EXISTS song_songwriters_songwriter
+    ON song_songwriters (songwriter_id);
+'''
+
+# song attributes stored in columns of the songs table:
+SONG_COLUMNS = ('track_number', 'lyrics_url', 'lyrics', 'instrumental',
+                'positive_sentiment', 'negative_sentiment',
+                'compound_sentiment')
+
+
+def is_corpus_db(path):
+    # whether a path is a SQLite corpus file (see DB_EXTENSIONS):
+    return path.lower().endswith(DB_EXTENSIONS)
+
+
+def _dump_extra(extra):
+    # extra attributes are stored as JSON text:
+    return json.dumps(extra) if extra else None
+
+
+class CorpusDB:
+    """
+    SQLite storage of a corpus of songs by any number of artists, with tables
+    of artists, albums, songs and songwriters (and the songwriters of each
+    song), indexed by artist, album, year and songwriter, so that songs can
+    be queried by their metadata without loading the whole corpus.
+    An album is identified by its title and the artist of its songs, and a
+    song by its album, title and track number: writing a song that is
+    already stored updates it (e.g. with its sentiments), so the same corpus
+    can be written by several scraping runs and analyses.
+    Attributes without a column (e.g. unknown keys of a JSON file) are stored
+    as JSON text, and the number of words is not stored (it is computed when
+    the songs are written to files).
+    """
+    def __init__(self, path):
+        """
+        :param path: (str) path to the SQLite file. It is created with the
+            corpus tables if it does not exist.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # readers do not block writers (e.g. a streaming analysis writing its
+        # results to the corpus it reads):
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.executescript(SCHEMA)
+        self._artist_ids = {}
+        self._songwriter_ids = {}
+        self._album_ids = {}  # (artist id, album title) -> album id
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def _name_id(self, table, ids, name):
+        # id of an artist or songwriter name, inserting it if new:
+        if name is None:
+            return None
+        if name not in ids:
+            cursor = self.connection.execute(
+                'SELECT id FROM {} WHERE name = ?'.format(table), (name,))
+            row = cursor.fetchone()
+            if row is None:
+                cursor = self.connection.execute(
+                    'INSERT INTO {} (name) VALUES (?)'.format(table), (name,))
+                ids[name] = cursor.lastrowid
+            else:
+                ids[name] = row[0]
+        return ids[name]
+
+    def _album_id(self, artist_id, album):
+        # id of an album, inserting or updating it:
+        values = (album.year, album.number, album.album_type,
+                  _dump_extra(album.extra))
+        key = (artist_id, album.title)
+        if key not in self._album_ids:
+            row = self.connection.execute(
+                'SELECT id FROM albums WHERE artist_id IS ? AND title = ?',
+                key).fetchone()
+            if row is None:
+                cursor = self.connection.execute(
+                    'INSERT INTO albums (artist_id, title, year, number, '
+                    'album_type, extra) VALUES (?, ?, ?, ?, ?, ?)',
+                    key + values)
+                self._album_ids[key] = cursor.lastrowid
+                return self._album_ids[key]
+            self._album_ids[key] = row[0]
+        self.connection.execute(
+            'UPDATE albums SET year = ?, number = ?, album_type = ?, '
+            'extra = ? WHERE id = ?', values + (self._album_ids[key],))
+        return self._album_ids[key]
+
+    def _write_song(self, song):
+        # insert or update a song and its songwriters:
+        artist_id = self._name_id('artists', self._artist_ids, song.artist)
+        album_id = self._album_id(artist_id, song.album)
+        values = [artist_id] + [getattr(song, name) for name in SONG_COLUMNS]
+        values.append(_dump_extra(song.extra))
+        row = self.connection.execute(
+            'SELECT id FROM songs WHERE album_id = ? AND title = ? AND '
+            'track_number IS ?',
+            (album_id, song.title, song.track_number)).fetchone()
+        if row is None:
+            song_id = self.connection.execute(
+                'INSERT INTO songs (title, album_id, artist_id, {}, extra) '
+                'VALUES (?, ?, ?, {}, ?)'
+                .format(', '.join(SONG_COLUMNS),
+                        ', '.join('?' * len(SONG_COLUMNS))),
+                [song.title, album_id] + values).lastrowid
+        else:
+            song_id = row[0]
+            self.connection.execute(
+                'UPDATE songs SET artist_id = ?, {}, extra = ? WHERE id = ?'
+                .format(', '.join(['{} = ?'.format(name)
+                                   for name in SONG_COLUMNS])),
+                values + [song_id])
+            self.connection.execute(
+                'DELETE FROM song_songwriters WHERE song_id = ?', (song_id,))
+        self.connection.executemany(
+            'INSERT OR IGNORE INTO song_songwriters (song_id, songwriter_id) '
+            'VALUES (?, ?)',
+            [(song_id, self._name_id('songwriters', self._songwriter_ids, sw))
+             for sw in song.songwriters])
+
+    def write_songs(self, songs, batch_size=10000):
+        """
+        Insert a set of songs in the corpus, or update them if they are
+        already stored. The songs are written in transactions of
+        "batch_size" songs: if writing a batch fails, none of its songs are
+        written.
+        :param songs: {str->Song object} dictionary in which the keys are song
+            titles and the values are the corresponding Song objects, or
+            iterable of Song objects.
+        :param batch_size: (int) number of songs per transaction.
+        """
+        if hasattr(songs, 'values'):
+            songs = songs.values()
+
+        songs = iter(songs)
+        while True:
+            with self.connection:
+                written = 0
+                for song in songs:
+                    self._write_song(song)
+                    written += 1
+                    if written == batch_size:
+                        break
+            if written < batch_size:
+                return
+
+    def artists(self):
+        # names of the artists in the corpus, sorted alphabetically:
+        return [row[0] for row in self.connection.execute(
+            'SELECT name FROM artists ORDER BY name')]
+
+    def songwriters(self):
+        # names of the songwriters in the corpus, sorted alphabetically:
+        return [row[0] for row in self.connection.execute(
+            'SELECT name FROM songwriters ORDER BY name')]
+
+    def iter_songs(self, fields=None, artist=None, album=None,
+                   songwriter=None, year_from=None, year_to=None,
+                   batch_size=1000):
+        """
+        Read the songs of the corpus that match some metadata, in the order
+        they were first stored. They are read in batches of "batch_size"
+        songs, so any number of songs can be read in bounded memory, and the
+        corpus can be written while they are read.
+        The albums are created when their first song is read and shared by
+        their songs, but their songs lists are left empty (see "iter_songs").
+        :param fields: (iterable(str)) if provided, only these song attributes
+            are read (besides the title, artist and album), e.g. {'lyrics'}.
+        :param artist: (str) if provided, only songs by this artist are read.
+        :param album: (str) if provided, only songs of albums with this title
+            are read.
+        :param songwriter: (str) if provided, only songs written by this
+            songwriter are read.
+        :param year_from: (int) if provided, only songs of albums released in
+            this year or later are read.
+        :param year_to: (int) if provided, only songs of albums released in
+            this year or earlier are read.
+        :param batch_size: (int) number of songs read at a time.
+        :return songs: generator of Song objects.
+        """
+        if fields is not None:
+            fields = set(fields)
+        columns = [name for name in SONG_COLUMNS
+                   if fields is None or name in fields]
+
+        conditions, parameters = ['songs.id > ?'], []
+        if artist is not None:
+            conditions.append('artists.name = ?')
+            parameters.append(artist)
+        if album is not None:
+            conditions.append('albums.title = ?')
+            parameters.append(album)
+        if songwriter is not None:
+            conditions.append(
+                'songs.id IN (SELECT song_id FROM song_songwriters '
+                'JOIN songwriters ON songwriters.id = songwriter_id '
+                'WHERE songwriters.name = ?)')
+            parameters.append(songwriter)
+        if year_from is not None:
+            conditions.append('albums.year >= ?')
+            parameters.append(year_from)
+        if year_to is not None:
+            conditions.append('albums.year <= ?')
+            parameters.append(year_to)
+        query = ('SELECT songs.id, songs.title, artists.name, songs.album_id, '
+                 'songs.extra{} FROM songs '
+                 'JOIN albums ON albums.id = songs.album_id '
+                 'LEFT JOIN artists ON artists.id = songs.artist_id '
+                 'WHERE {} ORDER BY songs.id LIMIT ?'
+                 .format(''.join([', songs.' + name for name in columns]),
+                         ' AND '.join(conditions)))
+
+        albums = {}  # album id -> Album object
+        last_id = 0
+        while True:
+            rows = self.connection.execute(
+                query, [last_id] + parameters + [batch_size]).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            songwriters = {}
+            if fields is None or 'songwriters' in fields:
+                songwriters = self._songwriters_between(rows[0][0], last_id)
+            for row in rows:
+                if row[3] not in albums:
+                    albums[row[3]] = self._album(row[3])
+                yield self._song(row, columns, albums[row[3]],
+                                 songwriters.get(row[0], ()), fields)
+
+    def _songwriters_between(self, first_id, last_id):
+        # songwriters of the songs with ids in a range, by song id:
+        songwriters = {}
+        for song_id, name in self.connection.execute(
+                'SELECT song_id, songwriters.name FROM song_songwriters '
+                'JOIN songwriters ON songwriters.id = songwriter_id '
+                'WHERE song_id BETWEEN ? AND ?', (first_id, last_id)):
+            songwriters.setdefault(song_id, []).append(sys.intern(name))
+        return songwriters
+
+    def _album(self, album_id):
+        # Album object of a stored album, with an empty songs list:
+        title, year, number, album_type, extra = self.connection.execute(
+            'SELECT title, year, number, album_type, extra FROM albums '
+            'WHERE id = ?', (album_id,)).fetchone()
+        album = Album(title)
+        album.year = year
+        album.number = number
+        album.album_type = album_type
+        if extra is not None:
+            for key, value in json.loads(extra).items():
+                if key in ALBUM_ATTRIBUTES:
+                    setattr(album, key, value)
+                else:
+                    album.set_extra(key, value)
+        return album
+
+    @staticmethod
+    def _song(row, columns, album, songwriters, fields):
+        # Song object of a row of the songs query (see "iter_songs"):
+        song = Song(row[1])
+        song.artist = None if row[2] is None else sys.intern(row[2])
+        song.album = album
+        for name, value in zip(columns, row[5:]):
+            setattr(song, name, value)
+        if song.instrumental is not None:
+            song.instrumental = bool(song.instrumental)
+        song.songwriters = set(songwriters)
+        if row[4] is not None:
+            for key, value in json.loads(row[4]).items():
+                if fields is not None and key not in fields:
+                    continue
+                if key in SONG_ATTRIBUTES:
+                    setattr(song, key, value)
+                else:
+                    song.set_extra(key, value)
+        return song
+
+    def load_songs(self, **filters):
+        """
+        Load the Song and Album objects of the songs of the corpus that match
+        some metadata (see "iter_songs"), as "load_songs_json" does.
+        :return songs: {str->Song object} dictionary in which the keys are song
+            titles followed by their album titles, and the values are the
+            corresponding Song objects.
+        :return albums: {str->Album object} dictionary in which the keys are
+            album titles (followed by the artist if several artists have an
+            album with the same title) and the values are the corresponding
+            Album objects.
+        """
+        songs, albums = {}, {}
+        for song in self.iter_songs(**filters):
+            song_key = '{} - {}'.format(song.title, song.album.title)
+            if song_key in songs:
+                song_key = '{} ({})'.format(song_key, song.track_number)
+            songs[song_key] = song
+            if not song.album.songs:
+                album_key = song.album.title
+                if album_key in albums:
+                    album_key = '{} ({})'.format(album_key, song.artist)
+                albums[album_key] = song.album
+            song.album.add_song(song)
+
+        for album in albums.values():
+            album.sort_songs()
+
+        return songs, albums
+
+
+def write_songs_db(songs, db_path):
+    """
+    Insert (or update) a set of songs in a SQLite corpus file (see
+    "CorpusDB").
+    :param songs: {str->Song object} or iterable of Song objects.
+    :param db_path: (str) path to the SQLite file.
+    """
+    with CorpusDB(db_path) as corpus_db:
+        corpus_db.write_songs(songs)
+
+
+def iter_songs_db(db_path, fields=None, **filters):
+    """
+    Read the songs of a SQLite corpus file that match some metadata, one at a
+    time (see "CorpusDB.iter_songs").
+    :param db_path: (str) path to the SQLite file.
+    :param fields: (iterable(str)) if provided, only these song attributes are
+        read (besides the title, artist and album).
+    :return songs: generator of Song objects.
+    """
+    with CorpusDB(db_path) as corpus_db:
+        yield from corpus_db.iter_songs(fields=fields, **filters)
+
+
+def load_songs_db(db_path, **filters):
+    """
+    Load the Song and Album objects of the songs of a SQLite corpus file that
+    match some metadata (see "CorpusDB.load_songs").
+    :param db_path: (str) path to the SQLite file.
+    :return songs: {str->Song object}
+    :return albums: {str->Album object}
+    """
+    with CorpusDB(db_path) as corpus_db:
+        return corpus_db.load_songs(**filters)
+
+
+def load_songs(input_path):
+    """
+    Load the Song and Album objects of a JSON, CSV (compressed or not, see
+    "write_songs_json") or SQLite corpus file (depending on its extension).
+    :param input_path: (str) path to the input file.
+    :return songs: {str->Song object}
+    :return albums: {str->Album object}
+    """
+    if is_corpus_db(input_path):
+        return load_songs_db(input_path)
+    if uncompressed_path(input_path).lower().endswith('.csv'):
+        return load_songs_csv(input_path)
+    return load_songs_json(input_path)
+
+
+def write_songs(songs, output_path):
+    """
+    Write a set of songs to a JSON file, or store them in a SQLite corpus
+    file (depending on its extension).
+    :param songs: {str->Song object} dictionary in which the keys are song
+        titles and the values are the corresponding Song objects.
+    :param output_path: (str) path to the output file.
+    """
+    if is_corpus_db(output_path):
+        write_songs_db(songs, output_path)
+    else:
+        write_songs_json(songs, output_path)
+
+
+def write_songs_append(songs, output_path):
+    """
+    Same as "write_songs", but adding the songs to an existing JSON file.
+    :param songs: {str->Song object}
+    :param output_path: (str) path to the output file.
+    """
+    if is_corpus_db(output_path):
+        write_songs_db(songs, output_path)
+    else:
+        write_songs_json_append(songs, output_path)
+
+
+if __name__ == '__main__':
+    songs_path = r"C:\Users\pablo\ProjectsData\Lyrics\Various\concat.json"
+    db_path = r"C:\Users\pablo\ProjectsData\Lyrics\Various\concat.db"
+
+    songs, _ = load_songs_json(songs_path)
+    write_songs_db(songs, db_path)
+
+    with CorpusDB(db_path) as corpus:
+        print('{} artists, {} songwriters'.format(len(corpus.artists()),
+                                                  len(corpus.songwriters())))
+        for song in corpus.iter_songs(songwriter='David Bowie',
+                                      year_from=1970, year_to=1979,
+                                      fields={'songwriters'}):
+            print(song.album.year, song.album.title, '-', song.title)
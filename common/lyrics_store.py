@@ -0,0 +1,254 @@
+from common.songs_and_albums import Song, song_from_json, iter_songs, \
+    load_songs_json, write_songs_json_lines
+from array import array
+from os import replace
+import mmap
+import json
+import sys
+import time
+
+
+# extensions of the files of a stored corpus, added to its base path:
+SONGS_EXTENSION = '.songs.json'  # songs information without the lyrics
+LYRICS_EXTENSION = '.lyrics'  # lyrics of all songs, UTF-8 encoded
+INDEX_EXTENSION = '.lyrics.idx'  # (offset, length) of the lyrics of each song
+
+# length stored in the index for songs without lyrics (None):
+NO_LYRICS = -1
+
+# the index is stored as little-endian 64-bit integers:
+_SWAP_BYTES = sys.byteorder != 'little'
+
+
+def _map_file(path):
+    # read-only memory map of a whole file (empty files cannot be mapped):
+    with open(path, 'rb') as input_file:
+        input_file.seek(0, 2)
+        if input_file.tell() == 0:
+            return b''
+        return mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class LyricsStore:
+    """
+    Read-only store of the lyrics of a series of songs: the lyrics of all the
+    songs are in a single UTF-8 file, and an index file has the offset and
+    length in bytes of the lyrics of each song. Both files are memory mapped,
+    so opening a store does not read them, and the lyrics of a song are only
+    read from disk when they are requested. The files stay mapped until the
+    store is closed (on Windows, mapped files cannot be replaced or removed,
+    e.g. by "write_songs_store").
+    """
+    def __init__(self, base_path):
+        """
+        :param base_path: (str) path to the stored corpus, without extension.
+        """
+        self.base_path = base_path
+        self._lyrics = _map_file(base_path + LYRICS_EXTENSION)
+        index = _map_file(base_path + INDEX_EXTENSION)
+        if _SWAP_BYTES:
+            swapped_index = array('q')
+            swapped_index.frombytes(index)
+            swapped_index.byteswap()
+            if isinstance(index, mmap.mmap):
+                index.close()
+            index = swapped_index
+        self._index_map = index
+        self._index = memoryview(index).cast('B').cast('q')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        # release the memory maps of the files (the lyrics cannot be read
+        # afterwards):
+        self._index.release()
+        for mapping in (self._lyrics, self._index_map):
+            if isinstance(mapping, mmap.mmap):
+                mapping.close()
+
+    def __len__(self):
+        return len(self._index) // 2
+
+    def get(self, lyrics_id):
+        """
+        :param lyrics_id: (int) position of the song in the store.
+        :return lyrics: (str) lyrics of the song, or None if it has no lyrics.
+        """
+        offset = self._index[2 * lyrics_id]
+        length = self._index[2 * lyrics_id + 1]
+        if length == NO_LYRICS:
+            return None
+        return self._lyrics[offset:offset + length].decode('utf-8')
+
+
+# descriptor of the lyrics slot of Song objects:
+_song_lyrics = Song.lyrics
+
+
+class StoredLyricsSong(Song):
+    """
+    Song whose lyrics are read from a LyricsStore every time they are used,
+    instead of being kept in memory, unless they are set to other lyrics.
+    """
+    __slots__ = ('lyrics_store', 'lyrics_id')
+
+    def __init__(self, title, lyrics_store=None, lyrics_id=None):
+        super().__init__(title)
+        self.lyrics_store = lyrics_store
+        self.lyrics_id = lyrics_id
+        _song_lyrics.__delete__(self)
+
+    @property
+    def lyrics(self):
+        try:
+            return _song_lyrics.__get__(self)
+        except AttributeError:  # not set: read from the store
+            return self.lyrics_store.get(self.lyrics_id)
+
+    @lyrics.setter
+    def lyrics(self, lyrics):
+        _song_lyrics.__set__(self, lyrics)
+
+
+def write_songs_store(songs, base_path):
+    """
+    Write a set of songs to a stored corpus: their lyrics to a lyrics file and
+    its index, and the rest of their information to a JSON file (as
+    "write_songs_json" does, without the lyrics), in the same order.
+    :param songs: {str->Song object} or iterable of Song objects.
+    :param base_path: (str) path to the stored corpus, without extension.
+    """
+    if hasattr(songs, 'values'):
+        songs = songs.values()
+
+    index = array('q')
+    temporary_paths = [base_path + extension + '.tmp' for extension in
+                       (SONGS_EXTENSION, LYRICS_EXTENSION, INDEX_EXTENSION)]
+    with open(temporary_paths[0], 'w', encoding="utf-8") as songs_file, \
+            open(temporary_paths[1], 'wb') as lyrics_file:
+
+        def store_lyrics(songs):
+            # write the lyrics of each song before its information:
+            offset = 0
+            for song in songs:
+                if song.lyrics is None:
+                    index.extend((offset, NO_LYRICS))
+                else:
+                    data = song.lyrics.encode('utf-8')
+                    lyrics_file.write(data)
+                    index.extend((offset, len(data)))
+                    offset += len(data)
+                yield song
+
+        write_songs_json_lines(store_lyrics(songs), songs_file,
+                               with_lyrics=False)
+
+    if _SWAP_BYTES:
+        index.byteswap()
+    with open(temporary_paths[2], 'wb') as index_file:
+        index.tofile(index_file)
+
+    # the files replace the previous ones only once they are all written:
+    for temporary_path in temporary_paths:
+        replace(temporary_path, temporary_path[:-len('.tmp')])
+
+
+def iter_stored_songs(base_path, lyrics_store=None):
+    """
+    Read the songs of a stored corpus one at a time (see "iter_songs"). The
+    lyrics are not loaded: the songs are StoredLyricsSong objects, which read
+    them from the lyrics file when needed.
+    :param base_path: (str) path to the stored corpus, without extension.
+    :param lyrics_store: (LyricsStore object) open store of the corpus, which
+        the caller closes. By default, the store is opened here and closed
+        when the generator is exhausted or closed, so the lyrics of the songs
+        can only be read until then.
+    :return songs: generator of StoredLyricsSong objects.
+    """
+    close_store = lyrics_store is None
+    if close_store:
+        lyrics_store = LyricsStore(base_path)
+    albums = {}
+    songs_path = base_path + SONGS_EXTENSION
+    try:
+        with open(songs_path, 'r', encoding="utf-8") as songs_file:
+            for lyrics_id, line in enumerate(songs_file):
+                song = song_from_json(json.loads(line.rstrip()), albums,
+                                      song_class=StoredLyricsSong)
+                song.lyrics_store = lyrics_store
+                song.lyrics_id = lyrics_id
+                yield song
+    finally:
+        if close_store:
+            lyrics_store.close()
+
+
+def load_songs_store(base_path):
+    """
+    Load the Song and Album objects of a stored corpus, as "load_songs_json"
+    does, except for the lyrics (see "iter_stored_songs"). The songs share a
+    LyricsStore, which stays open while they are used: close it (e.g.
+    "song.lyrics_store.close()") before rewriting the stored corpus.
+    :param base_path: (str) path to the stored corpus, without extension.
+    :return songs: {str->Song object} dictionary in which the keys are song
+        titles and the values are the corresponding Song objects.
+    :return albums: {str->Album object} dictionary in which the keys are album
+        titles and the values are the corresponding Album objects.
+    """
+    songs, albums = {}, {}
+    lyrics_store = LyricsStore(base_path)
+    for song in iter_stored_songs(base_path, lyrics_store):
+        albums[song.album.title] = song.album
+        songs['{} - {}'.format(song.title, song.album.title)] = song
+
+    for song in songs.values():
+        song.album.add_song(song)
+    for album in albums.values():
+        album.sort_songs()
+
+    return songs, albums
+
+
+def json_to_store(input_path, base_path):
+    """
+    Convert a JSON file with songs (see "write_songs_json") to a stored corpus.
+    :param input_path: (str) path to the input JSON file.
+    :param base_path: (str) path to the stored corpus, without extension.
+    """
+    write_songs_store(iter_songs(input_path), base_path)
+
+
+def store_to_json(base_path, output_path):
+    """
+    Convert a stored corpus to a JSON file with songs, identical to the one it
+    was created from.
+    :param base_path: (str) path to the stored corpus, without extension.
+    :param output_path: (str) path to the output JSON file.
+    """
+    with LyricsStore(base_path) as lyrics_store, \
+            open(output_path, 'w', encoding="utf-8") as output_file:
+        write_songs_json_lines(iter_stored_songs(base_path, lyrics_store),
+                               output_file)
+
+
+if __name__ == '__main__':
+    songs_path = r"C:\Users\pablo\ProjectsData\Lyrics\Various\concat.json"
+    store_path = r"C:\Users\pablo\ProjectsData\Lyrics\Various\concat"
+
+    json_to_store(songs_path, store_path)
+
+    start = time.perf_counter()
+    with LyricsStore(store_path) as store:
+        print('Lyrics store of {} songs opened in {:.2f} ms'
+              .format(len(store), (time.perf_counter() - start) * 1000))
+    start = time.perf_counter()
+    load_songs_json(songs_path)
+    print('JSON file loaded in {:.2f} s'.format(time.perf_counter() - start))
+    start = time.perf_counter()
+    load_songs_store(store_path)
+    print('Stored corpus loaded in {:.2f} s'
+          .format(time.perf_counter() - start))
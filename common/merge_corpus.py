@@ -0,0 +1,161 @@
+from common.songs_and_albums import iter_songs, song_json_line
+from common.common import open_text, uncompressed_path, DEFAULT_COMPRESSLEVEL
+from common.corpus_db import is_corpus_db
+from tempfile import TemporaryDirectory
+from datetime import datetime
+from os.path import join
+from itertools import count
+from glob import glob
+import hashlib
+import heapq
+import json
+
+
+def lyrics_hash(lyrics):
+    """
+    :param lyrics: (str) lyrics of a song, or None.
+    :return hash: (str) stable hash of the lyrics (SHA-1 of their UTF-8
+        encoding, the same in every run and machine).
+    """
+    return hashlib.sha1((lyrics or '').encode('utf-8')).hexdigest()
+
+
+def _shard_records(shard_path, shard_index):
+    # sortable records of the songs of a shard file: [artist, album title,
+    # song title, lyrics hash, shard index, position in the shard, JSON line].
+    # JSON lines are kept as they are, the songs of other files are written
+    # as "write_songs_json" does:
+    shard_format = uncompressed_path(shard_path).lower()
+    if is_corpus_db(shard_path) or shard_format.endswith('.csv'):
+        for position, song in enumerate(iter_songs(shard_path)):
+            yield [song.artist or '', song.album.title, song.title,
+                   lyrics_hash(song.lyrics), shard_index, position,
+                   song_json_line(song)]
+    else:
+        for position, line in enumerate(open_text(shard_path)):
+            song_dict = json.loads(line)
+            yield [song_dict.get('artist') or '', song_dict['album']['title'],
+                   song_dict['title'], lyrics_hash(song_dict.get('lyrics')),
+                   shard_index, position, line.rstrip('\n') + '\n']
+
+
+def _write_run(records, run_path):
+    # write sorted records to a run file, one JSON list per line:
+    with open(run_path, 'w', encoding="utf-8") as run_file:
+        for record in records:
+            run_file.write('{}\n'.format(json.dumps(record)))
+
+
+def _read_run(run_path):
+    for line in open(run_path, 'r', encoding="utf-8"):
+        yield json.loads(line)
+
+
+def merge_corpus(shard_paths, output_path, manifest_path=None,
+                 run_size=10000, fan_in=64, temp_dir=None,
+                 compresslevel=DEFAULT_COMPRESSLEVEL):
+    """
+    Merge many corpus shard files (e.g. the JSON files of each artist, in any
+    format read by "iter_songs") into a single JSON file, without duplicated
+    songs. Two songs are duplicates if they have the same content key: same
+    artist, album title, song title and lyrics (compared by "lyrics_hash").
+    Of each group of duplicates, only the song of the first shard (in the
+    order of "shard_paths") is kept.
+    The merge is an external sort by content key, so memory is bounded no
+    matter the number and size of the shards:
+    1) the songs of each shard are sorted in runs of at most "run_size"
+       songs, written to temporary files.
+    2) the runs are merged "fan_in" at a time (k-way merge, with one song per
+       run in memory) until at most "fan_in" runs are left, so thousands of
+       shards never mean thousands of open files.
+    3) the last runs are merged into the output file, in which duplicates
+       are consecutive and are dropped.
+    The songs are written sorted by artist, album title and song title.
+    A manifest records, for each shard, how many songs it contributed to the
+    output and how many were dropped as duplicates.
+    :param shard_paths: ([str]) paths to the shard files.
+    :param output_path: (str) path to the output JSON file (compressed or not,
+        see "write_songs_json").
+    :param manifest_path: (str) path to the output manifest JSON file. By
+        default, the output path followed by '.manifest.json'.
+    :param run_size: (int) maximum number of songs sorted in memory at once.
+    :param fan_in: (int) maximum number of runs merged at once.
+    :param temp_dir: (str) directory in which the temporary runs are written.
+        By default, the system temporary directory.
+    :param compresslevel: (int) compression level of the output file.
+    :return manifest: (dict) contents of the manifest.
+    """
+    if manifest_path is None:
+        manifest_path = output_path + '.manifest.json'
+    fan_in = max(fan_in, 2)
+
+    shards = [{'path': path, 'songs': 0, 'kept': 0, 'duplicates': 0}
+              for path in shard_paths]
+    run_numbers = count()
+    with TemporaryDirectory(dir=temp_dir) as runs_dir:
+
+        def new_run_path():
+            return join(runs_dir, 'run_{}.jsonl'.format(next(run_numbers)))
+
+        # sorted runs of every shard:
+        run_paths = []
+        for shard_index, shard_path in enumerate(shard_paths):
+            records = []
+            for record in _shard_records(shard_path, shard_index):
+                records.append(record)
+                if len(records) == run_size:
+                    run_paths.append(new_run_path())
+                    _write_run(sorted(records), run_paths[-1])
+                    records = []
+            if records:
+                run_paths.append(new_run_path())
+                _write_run(sorted(records), run_paths[-1])
+        print('{}\t{} shards sorted in {} runs.'
+              .format(datetime.now(), len(shard_paths), len(run_paths)))
+
+        # merge the runs until they can be merged at once:
+        while len(run_paths) > fan_in:
+            merged_paths = []
+            for start in range(0, len(run_paths), fan_in):
+                group = run_paths[start:start + fan_in]
+                if len(group) == 1:
+                    merged_paths.append(group[0])
+                    continue
+                merged_paths.append(new_run_path())
+                _write_run(heapq.merge(*[_read_run(path) for path in group]),
+                           merged_paths[-1])
+            run_paths = merged_paths
+            print('{}\tRuns merged into {} runs.'
+                  .format(datetime.now(), len(run_paths)))
+
+        # merge the last runs into the output file, without duplicates:
+        last_key = None
+        with open_text(output_path, 'w', compresslevel) as output_file:
+            for record in heapq.merge(*[_read_run(path)
+                                        for path in run_paths]):
+                shard = shards[record[4]]
+                if record[:4] == last_key:
+                    shard['duplicates'] += 1
+                    continue
+                last_key = record[:4]
+                shard['kept'] += 1
+                output_file.write(record[6])
+
+    for shard in shards:
+        shard['songs'] = shard['kept'] + shard['duplicates']
+    manifest = {'output': output_path,
+                'songs': sum([shard['kept'] for shard in shards]),
+                'duplicates': sum([shard['duplicates'] for shard in shards]),
+                'shards': shards}
+    with open(manifest_path, 'w', encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    print('{}\t{} songs merged ({} duplicates dropped).'
+          .format(datetime.now(), manifest['songs'], manifest['duplicates']))
+    return manifest
+
+
+if __name__ == '__main__':
+    shards_dir = r"C:\Users\pablo\ProjectsData\Lyrics\Shards"
+    output_path = r"C:\Users\pablo\ProjectsData\Lyrics\Various\merged.json"
+
+    merge_corpus(sorted(glob(join(shards_dir, '*.json'))), output_path)
@@ -0,0 +1,320 @@
+from common.songs_and_albums import iter_songs
+from common.corpus_db import load_songs
+from common.words import get_words
+from datetime import datetime
+import hashlib
+import json
+
+
+# number of consecutive words of each shingle:
+SHINGLE_SIZE = 3
+
+# number of values of the MinHash signatures, and number of LSH bands they
+# are split into: songs are compared if all the values of any band are equal,
+# which happens for most pairs with a Jaccard similarity above
+# (1 / bands) ** (bands / num_hashes), about 0.42 with the defaults:
+NUM_HASHES = 128
+NUM_BANDS = 32
+
+# minimum estimated Jaccard similarity of the shingles of two songs for them
+# to be near-duplicates:
+SIMILARITY_THRESHOLD = 0.8
+
+_HASH_RANGE = 2 ** 64
+
+
+def lyrics_shingles(lyrics, size=SHINGLE_SIZE):
+    """
+    Hashes of the shingles of some lyrics: every sequence of "size"
+    consecutive words, ignoring case and punctuation. The hashes are stable
+    (the same in every run and machine).
+    :param lyrics: (str)
+    :param size: (int) number of words per shingle.
+    :return shingles: set(int) 64-bit hashes of the shingles (a single shingle
+        for lyrics shorter than "size" words, none for lyrics without words).
+    """
+    words = [word for word in get_words(lyrics.lower()) if word]
+    shingles = set([' '.join(words[i:i + size])
+                    for i in range(max(len(words) - size + 1, 1))])
+    shingles.discard('')
+    return set([int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'),
+                                               digest_size=8).digest(),
+                               'little')
+                for shingle in shingles])
+
+
+def minhash_signature(shingles, num_hashes=NUM_HASHES):
+    """
+    MinHash signature of a set of shingle hashes, computed with one
+    permutation: each hash is assigned to one of "num_hashes" bins, and each
+    bin keeps its minimum, so every shingle is hashed once instead of once
+    per value. Empty bins take the value of the next non-empty bin (plus an
+    offset, so that they do not match non-empty bins). The fraction of equal
+    values of two signatures estimates the Jaccard similarity of their sets.
+    :param shingles: set(int) see "lyrics_shingles".
+    :param num_hashes: (int) number of values of the signature.
+    :return signature: (tuple(int)) or None if there are no shingles.
+    """
+    if not shingles:
+        return None
+    bins = [None] * num_hashes
+    for shingle in shingles:
+        bin_index, value = shingle % num_hashes, shingle // num_hashes
+        if bins[bin_index] is None or value < bins[bin_index]:
+            bins[bin_index] = value
+
+    # densification of the empty bins:
+    signature = list(bins)
+    bin_range = _HASH_RANGE // num_hashes + 1
+    for i in range(num_hashes):
+        distance = 1
+        while signature[i] is None:
+            value = bins[(i + distance) % num_hashes]
+            if value is not None:
+                signature[i] = value + distance * bin_range
+            distance += 1
+    return tuple(signature)
+
+
+def signature_similarity(signature_1, signature_2):
+    # estimated Jaccard similarity of the sets of two MinHash signatures:
+    equal = sum([1 for value_1, value_2 in zip(signature_1, signature_2)
+                 if value_1 == value_2])
+    return equal / len(signature_1)
+
+
+def canonical_order(song):
+    """
+    Sorting key of the songs of a cluster of near-duplicates, the first one
+    being its canonical representative: songs of studio albums first, then
+    songs whose title has no qualifier in parentheses (e.g. "(Live)" or
+    "(Single Version)"), then the earliest album, album number and track.
+    :param song: (Song object)
+    :return key: (tuple)
+    """
+    album = song.album
+    return ((album.album_type or '').lower() != 'album',
+            '(' in song.title,
+            album.year is None, album.year or 0,
+            album.number is None, album.number or 0,
+            song.track_number is None, song.track_number or 0)
+
+
+class NearDuplicateIndex:
+    """
+    Index of the lyrics of a series of songs that finds the songs whose lyrics
+    are near-duplicates (e.g. the same song in a studio album, a live album
+    and a compilation) without comparing every pair of songs: each song is
+    only compared with the songs that share a band of its MinHash signature
+    (locality-sensitive hashing), and near-duplicates are grouped in clusters
+    (union-find). Only the signatures and the sorting keys of the songs are
+    kept, not their lyrics.
+    """
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, num_hashes=NUM_HASHES,
+                 num_bands=NUM_BANDS, shingle_size=SHINGLE_SIZE):
+        """
+        :param threshold: (float) minimum estimated Jaccard similarity of two
+            near-duplicates.
+        :param num_hashes: (int) number of values of the signatures.
+        :param num_bands: (int) number of LSH bands (a divisor of
+            "num_hashes").
+        :param shingle_size: (int) number of words per shingle.
+        """
+        if num_hashes % num_bands:
+            raise ValueError('The number of hashes ({}) is not a multiple of '
+                             'the number of bands ({})'
+                             .format(num_hashes, num_bands))
+        self.threshold = threshold
+        self.num_hashes = num_hashes
+        self.num_bands = num_bands
+        self.shingle_size = shingle_size
+        self._rows = num_hashes // num_bands
+        self._buckets = [{} for _ in range(num_bands)]
+        self._signatures = {}  # song key -> signature
+        self._orders = {}  # song key -> (canonical_order, insertion order)
+        self._parents = {}  # song key -> parent key in its cluster
+        self._keys = set()  # keys of all the songs added
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _find(self, key):
+        # root of the cluster of a song (with path halving):
+        parents = self._parents
+        while parents[key] != key:
+            parents[key] = parents[parents[key]]
+            key = parents[key]
+        return key
+
+    def add(self, key, song):
+        """
+        Add a song to the index, joining the clusters of the songs already
+        added whose lyrics are near-duplicates of its lyrics. Songs without
+        lyrics are ignored.
+        :param key: (str or int) key of the song, as in the songs
+            dictionaries, or its position in a stream of songs. Keys must be
+            unique: adding a key again raises a ValueError.
+        :param song: (Song object)
+        """
+        if key in self._keys:
+            raise ValueError('Song key added twice: {!r}'.format(key))
+        self._keys.add(key)
+        if not song.lyrics:
+            return
+        signature = minhash_signature(
+            lyrics_shingles(song.lyrics, size=self.shingle_size),
+            num_hashes=self.num_hashes)
+        if signature is None:
+            return
+        self._signatures[key] = signature
+        self._orders[key] = (canonical_order(song), len(self._orders))
+        self._parents[key] = key
+
+        for band, buckets in enumerate(self._buckets):
+            band_values = signature[band * self._rows:(band + 1) * self._rows]
+            bucket = buckets.setdefault(band_values, [])
+            for other_key in bucket:
+                root, other_root = self._find(key), self._find(other_key)
+                if root != other_root and signature_similarity(
+                        signature, self._signatures[other_key]) \
+                        >= self.threshold:
+                    self._parents[root] = other_root
+            bucket.append(key)
+
+    def clusters(self):
+        """
+        :return clusters: {str->[str]} relates the key of the canonical
+            representative of each cluster of near-duplicates (see
+            "canonical_order") to the keys of its other songs, in canonical
+            order. Songs without near-duplicates are not included.
+        """
+        members = {}
+        for key in self._signatures:
+            members.setdefault(self._find(key), []).append(key)
+        clusters = {}
+        for keys in members.values():
+            if len(keys) > 1:
+                keys.sort(key=self._orders.get)
+                clusters[keys[0]] = keys[1:]
+        return clusters
+
+
+def find_near_duplicates(songs, **options):
+    """
+    Find the clusters of songs with near-duplicate lyrics in a set of songs
+    (see "NearDuplicateIndex").
+    :param songs: {str->Song object} dictionary in which the keys are song
+        titles and the values are the corresponding Song objects, or iterable
+        of (key, Song object) pairs.
+    :param options: see "NearDuplicateIndex".
+    :return clusters: {str->[str]} see "NearDuplicateIndex.clusters".
+    """
+    if hasattr(songs, 'items'):
+        songs = songs.items()
+    index = NearDuplicateIndex(**options)
+    for key, song in songs:
+        index.add(key, song)
+    return index.clusters()
+
+
+def remove_near_duplicates(songs, albums=None, **options):
+    """
+    Remove from a set of songs (and from the songs of their albums) the songs
+    that are near-duplicates of other songs, keeping only the canonical
+    representative of each cluster (see "find_near_duplicates"). Albums left
+    without songs are removed from the albums dictionary.
+    :param songs: {str->Song object}
+    :param albums: {str->Album object} albums of the songs, if any.
+    :param options: see "NearDuplicateIndex".
+    :return clusters: {str->[str]} see "NearDuplicateIndex.clusters".
+    """
+    clusters = find_near_duplicates(songs, **options)
+    for duplicate_keys in clusters.values():
+        for key in duplicate_keys:
+            song = songs.pop(key)
+            if song in song.album.songs:
+                song.album.remove_song(song)
+
+    if albums is not None:
+        for album_title in [title for title, album in albums.items()
+                            if not album.songs]:
+            del albums[album_title]
+
+    print('{}\t{} near-duplicate songs removed ({} clusters).'
+          .format(datetime.now(),
+                  sum([len(keys) for keys in clusters.values()]),
+                  len(clusters)))
+    return clusters
+
+
+def duplicate_song_positions(input_path, **options):
+    """
+    Find the songs of an input file that are near-duplicates of other songs,
+    reading it one song at a time (see "iter_songs"), so that only the
+    signatures of the songs are kept in memory. The songs are identified by
+    their position in the file: titles and albums are not unique (e.g. two
+    artists with an "Intro" song in a "Greatest Hits" album).
+    :param input_path: (str) path to the input file with the songs.
+    :param options: see "NearDuplicateIndex".
+    :return duplicate_positions: set(int) positions (in the order in which
+        "iter_songs" reads them) of the songs that are not the canonical
+        representative of their cluster.
+    """
+    index = NearDuplicateIndex(**options)
+    for position, song in enumerate(
+            iter_songs(input_path, fields={'lyrics', 'track_number'})):
+        index.add(position, song)
+    return set([position for duplicate_positions in index.clusters().values()
+                for position in duplicate_positions])
+
+
+def iter_canonical_songs(input_path, fields=None, chunk_size=None,
+                         **options):
+    """
+    Read the songs of an input file one at a time (see "iter_songs"),
+    skipping the songs that are near-duplicates of other songs (see
+    "duplicate_song_positions"). The file is read twice: once to find the
+    near-duplicates and once to read the songs.
+    :param input_path: (str) path to the input file with the songs.
+    :param fields: (iterable(str)) see "iter_songs".
+    :param chunk_size: (int) if provided, the songs are yielded in
+        dictionaries of up to this number of songs, whose keys are the
+        positions of the songs in the file.
+    :param options: see "NearDuplicateIndex".
+    :return songs: generator of Song objects, or of {int->Song object}
+        dictionaries if "chunk_size" is provided.
+    """
+    duplicate_positions = duplicate_song_positions(input_path, **options)
+    chunk = {}
+    for position, song in enumerate(iter_songs(input_path, fields=fields)):
+        if position in duplicate_positions:
+            continue
+        if chunk_size is None:
+            yield song
+            continue
+        chunk[position] = song
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = {}
+    if chunk:
+        yield chunk
+
+
+def write_duplicate_clusters(clusters, output_path):
+    """
+    Write the clusters of near-duplicate songs to a JSON file.
+    :param clusters: {str->[str]} see "NearDuplicateIndex.clusters".
+    :param output_path: (str) path to the output JSON file.
+    """
+    with open(output_path, 'w', encoding="utf-8") as output_file:
+        json.dump([{'canonical': canonical, 'duplicates': duplicate_keys}
+                   for canonical, duplicate_keys in clusters.items()],
+                  output_file, indent=2)
+
+
+if __name__ == '__main__':
+    songs_path = r"C:\Users\pablo\ProjectsData\Lyrics\David Bowie\lyrics.json"
+    output_path = r"C:\Users\pablo\ProjectsData\Lyrics\David Bowie\dups.json"
+
+    songs, _ = load_songs(songs_path)
+    write_duplicate_clusters(find_near_duplicates(songs), output_path)
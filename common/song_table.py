@@ -0,0 +1,308 @@
+from common.songs_and_albums import Song, Album, SONG_ATTRIBUTES, \
+    ALBUM_ATTRIBUTES
+from common.common import open_text
+from array import array
+import json
+import math
+import sys
+
+
+# value stored in the integer columns for missing numbers:
+MISSING_INT = -2 ** 31
+
+
+class StringPool:
+    """
+    Strings stored once and referred to by integer ids (e.g. artist or
+    songwriter names repeated in many songs).
+    """
+    def __init__(self):
+        self.strings = []
+        self._ids = {}
+
+    def __len__(self):
+        return len(self.strings)
+
+    def id(self, string):
+        # id of a string, adding it to the pool if needed (-1 for None):
+        if string is None:
+            return -1
+        try:
+            return self._ids[string]
+        except KeyError:
+            string = sys.intern(string)
+            self._ids[string] = len(self.strings)
+            self.strings.append(string)
+            return self._ids[string]
+
+    def get(self, string_id):
+        return None if string_id < 0 else self.strings[string_id]
+
+
+def _to_int(value):
+    return MISSING_INT if value is None else value
+
+
+def _from_int(value):
+    return None if value == MISSING_INT else value
+
+
+def _to_float(value):
+    return math.nan if value is None else value
+
+
+def _from_float(value):
+    return None if math.isnan(value) else value
+
+
+class SongTable:
+    """
+    Columnar, memory-lean storage of the songs of a large catalog: every song
+    attribute is a column (typed arrays for numbers, lists for free texts),
+    artist and songwriter names are stored once in string pools and referred
+    to by ids, the songwriters of all songs are stored in a single array of
+    ids, and albums are stored once as Album objects (with an empty songs
+    list).
+    No Song object is kept: "values", "items" and "__getitem__" hand out
+    SongView objects, which read (and write) the columns of a row and can be
+    used wherever a Song object is read, e.g. by "write_songs_json".
+    """
+    def __init__(self):
+        self.keys_list = []
+        self.titles = []
+        self.artist_ids = array('i')
+        self.track_numbers = array('i')
+        self.album_ids = array('i')
+        self.lyrics_urls = []
+        self.lyrics = []
+        self.instrumentals = array('b')  # -1 for missing, 0 or 1
+        self.positive_sentiments = array('d')  # nan for missing
+        self.negative_sentiments = array('d')
+        self.compound_sentiments = array('d')
+        # songwriter ids of row i: songwriter_ids[songwriter_starts[i]:
+        # songwriter_starts[i+1]]
+        self.songwriter_starts = array('L', [0])
+        self.songwriter_ids = array('i')
+        self.extras = {}  # row -> attributes without a column
+        self.artists = StringPool()
+        self.songwriters = StringPool()
+        self.albums = []
+        self._album_ids = {}  # album title -> album id
+        self._rows = None  # song key -> row, built when first needed
+
+    def __len__(self):
+        return len(self.keys_list)
+
+    def __contains__(self, key):
+        return key in self._row_index()
+
+    def __getitem__(self, key):
+        return SongView(self, self._row_index()[key])
+
+    def _row_index(self):
+        if self._rows is None or len(self._rows) != len(self.keys_list):
+            self._rows = {key: row for row, key in enumerate(self.keys_list)}
+        return self._rows
+
+    def keys(self):
+        return iter(self.keys_list)
+
+    def values(self):
+        return (SongView(self, row) for row in range(len(self)))
+
+    def items(self):
+        return ((key, SongView(self, row))
+                for row, key in enumerate(self.keys_list))
+
+    def _album_id(self, album):
+        # id of an album (by title), storing a copy without songs if new:
+        if album.title not in self._album_ids:
+            stored_album = Album(album.title)
+            stored_album.year = album.year
+            stored_album.number = album.number
+            stored_album.album_type = album.album_type
+            stored_album.extra = album.extra
+            self._album_ids[album.title] = len(self.albums)
+            self.albums.append(stored_album)
+        return self._album_ids[album.title]
+
+    def append(self, key, song):
+        """
+        Add a song (any object with the Song attributes) as a new row.
+        :param key: (str) key of the song, as in the songs dictionaries.
+        :param song: (Song or SongView object)
+        :return row: (int) row of the song.
+        """
+        row = len(self.keys_list)
+        self.keys_list.append(key)
+        self.titles.append(song.title)
+        self.artist_ids.append(self.artists.id(song.artist))
+        self.track_numbers.append(_to_int(song.track_number))
+        self.album_ids.append(self._album_id(song.album))
+        self.lyrics_urls.append(song.lyrics_url)
+        self.lyrics.append(song.lyrics)
+        self.instrumentals.append(-1 if song.instrumental is None
+                                  else int(song.instrumental))
+        self.positive_sentiments.append(_to_float(song.positive_sentiment))
+        self.negative_sentiments.append(_to_float(song.negative_sentiment))
+        self.compound_sentiments.append(_to_float(song.compound_sentiment))
+        for sw in song.songwriters:
+            self.songwriter_ids.append(self.songwriters.id(sw))
+        self.songwriter_starts.append(len(self.songwriter_ids))
+        if song.extra:
+            self.extras[row] = dict(song.extra)
+        return row
+
+    @classmethod
+    def from_songs(cls, songs):
+        """
+        :param songs: {str->Song object} dictionary in which the keys are song
+            titles and the values are the corresponding Song objects.
+        :return table: (SongTable object)
+        """
+        table = cls()
+        for key, song in songs.items():
+            table.append(key, song)
+        return table
+
+    @classmethod
+    def load_json(cls, input_path):
+        """
+        Load the songs written in a JSON input file (see "load_songs_json")
+        directly into a table, without creating Song objects.
+        :param input_path: (str) path to the input JSON file.
+        :return table: (SongTable object)
+        """
+        table = cls()
+        for line in open_text(input_path):
+            json_dict = json.loads(line.rstrip())
+            song = Song(json_dict['title'])
+            for key, value in json_dict.items():
+                if key in SONG_ATTRIBUTES:
+                    setattr(song, key, value)
+                else:
+                    song.set_extra(key, value)
+            album = Album(json_dict['album']['title'])
+            for key, value in json_dict['album'].items():
+                if key in ALBUM_ATTRIBUTES:
+                    setattr(album, key, value)
+                else:
+                    album.set_extra(key, value)
+            song.album = album
+            table.append('{} - {}'.format(song.title, album.title), song)
+        return table
+
+    def song(self, row):
+        """
+        Create the Song object of a row (its album is the Album object stored
+        in the table).
+        :param row: (int)
+        :return song: (Song object)
+        """
+        view = SongView(self, row)
+        song = Song(view.title)
+        for name in SONG_ATTRIBUTES:
+            try:
+                setattr(song, name, getattr(view, name))
+            except AttributeError:  # number of words not stored
+                pass
+        if row in self.extras:
+            song.extra = dict(self.extras[row])
+        return song
+
+    def to_songs(self):
+        """
+        Create Song and Album objects for all the rows, as "load_songs_json"
+        does.
+        :return songs: {str->Song object} dictionary in which the keys are song
+            titles and the values are the corresponding Song objects.
+        :return albums: {str->Album object} dictionary in which the keys are
+            album titles and the values are the corresponding Album objects.
+        """
+        songs, albums = {}, {}
+        for row, key in enumerate(self.keys_list):
+            song = self.song(row)
+            if song.album.title not in albums:
+                album = Album(song.album.title)
+                for name in ALBUM_ATTRIBUTES:
+                    setattr(album, name, getattr(song.album, name))
+                album.extra = song.album.extra
+                album.songs = []
+                albums[album.title] = album
+            song.album = albums[song.album.title]
+            song.album.add_song(song)
+            songs[key] = song
+        for album in albums.values():
+            album.sort_songs()
+        return songs, albums
+
+
+def _column_property(column, to_column=None, from_column=None):
+    # property reading (and writing) the value of a row in a table column:
+    def get(view):
+        value = getattr(view.table, column)[view.row]
+        return value if from_column is None else from_column(value)
+
+    def set_value(view, value):
+        getattr(view.table, column)[view.row] = \
+            value if to_column is None else to_column(value)
+
+    return property(get, set_value)
+
+
+class SongView:
+    """
+    Song-like view of a row of a SongTable: it has the same attributes as a
+    Song object, read from the table columns. The title, lyrics and sentiment
+    attributes can be set (e.g. by the sentiment analysis); the songwriters
+    attribute is a new set every time it is read.
+    """
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    title = _column_property('titles')
+    lyrics_url = _column_property('lyrics_urls')
+    lyrics = _column_property('lyrics')
+    track_number = _column_property('track_numbers', _to_int, _from_int)
+    positive_sentiment = _column_property('positive_sentiments', _to_float,
+                                          _from_float)
+    negative_sentiment = _column_property('negative_sentiments', _to_float,
+                                          _from_float)
+    compound_sentiment = _column_property('compound_sentiments', _to_float,
+                                          _from_float)
+
+    @property
+    def artist(self):
+        return self.table.artists.get(self.table.artist_ids[self.row])
+
+    @property
+    def album(self):
+        return self.table.albums[self.table.album_ids[self.row]]
+
+    @property
+    def instrumental(self):
+        value = self.table.instrumentals[self.row]
+        return None if value < 0 else bool(value)
+
+    @property
+    def songwriters(self):
+        start = self.table.songwriter_starts[self.row]
+        end = self.table.songwriter_starts[self.row + 1]
+        return set([self.table.songwriters.strings[sw_id] for sw_id in
+                    self.table.songwriter_ids[start:end]])
+
+    @property
+    def extra(self):
+        return self.table.extras.get(self.row)
+
+    def __getattr__(self, name):
+        # attributes without a column:
+        extra = self.table.extras.get(self.row)
+        if extra is not None and name in extra:
+            return extra[name]
+        raise AttributeError(name)
+
+    as_dict = Song.as_dict
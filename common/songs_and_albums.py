@@ -1,10 +1,21 @@
-from common.words import get_num_words, get_num_unique_words
+from common.words import get_word_stats
+from common.common import open_text, uncompressed_path, DEFAULT_COMPRESSLEVEL
 import csv
 import json
-from copy import deepcopy
+import re
+import sys
 
 
 class Song:
+    # the attributes are stored in slots instead of a dictionary per song, to
+    # keep large catalogs in memory. Attributes other than these ones (e.g.
+    # unknown keys of a JSON file) are kept in the "extra" dictionary, which
+    # is only created when needed, and can be read as usual attributes:
+    __slots__ = ('title', 'artist', 'track_number', 'album', 'lyrics_url',
+                 'lyrics', 'instrumental', 'songwriters', 'positive_sentiment',
+                 'negative_sentiment', 'compound_sentiment', 'num_words',
+                 'num_unique_words', 'extra')
+
     def __init__(self, title):
         self.title = title
         self.artist = None
@@ -17,26 +28,94 @@ class Song:
         self.positive_sentiment = None
         self.negative_sentiment = None
         self.compound_sentiment = None
+        self.extra = None
+
+    def __getattr__(self, name):
+        # only called for attributes missing in the slots (including "extra"
+        # itself while an object is being copied or unpickled):
+        if name != 'extra' and self.extra is not None and name in self.extra:
+            return self.extra[name]
+        raise AttributeError(name)
+
+    def set_extra(self, name, value):
+        # set an attribute that has no slot:
+        if self.extra is None:
+            self.extra = {}
+        self.extra[name] = value
+
+    def as_dict(self):
+        # dictionary with all the attributes set, in the order they are
+        # written to output files:
+        song_dict = {}
+        for name in Song.__slots__[:-1]:
+            try:
+                song_dict[name] = getattr(self, name)
+            except AttributeError:  # number of words not computed
+                pass
+        if self.extra:
+            song_dict.update(self.extra)
+        return song_dict
 
 
 class Album:
+    # see Song. "_track_index" caches the songs sorted by track number:
+    __slots__ = ('title', 'year', 'number', 'album_type', 'songs', 'extra',
+                 '_track_index')
+    FIELDS = __slots__[:5]
+
     def __init__(self, title):
         self.title = title
         self.year = None
         self.number = None
         self.album_type = None
         self.songs = []
+        self.extra = None
+        self._track_index = None
+
+    __getattr__ = Song.__getattr__
+    set_extra = Song.set_extra
+
+    def as_dict(self):
+        # dictionary with all the attributes, in the order they are written to
+        # output files:
+        album_dict = {name: getattr(self, name) for name in Album.FIELDS}
+        if self.extra:
+            album_dict.update(self.extra)
+        return album_dict
+
+    def add_song(self, song):
+        # add a song to the album (the track index is rebuilt when needed):
+        self.songs.append(song)
+        self._track_index = None
+
+    def remove_song(self, song):
+        # remove a song from the album (the track index is rebuilt when
+        # needed):
+        self.songs.remove(song)
+        self._track_index = None
+
+    def _tracks(self):
+        # songs sorted by track number (songs without track number last, and
+        # songs with the same track number in the order they were added), and
+        # songs by track number. Rebuilt only if songs were added or removed
+        # since the last call, with "add_song" and "remove_song" or directly
+        # in the songs list:
+        index = self._track_index
+        if index is None or index[0] is not self.songs or \
+                index[1] != len(self.songs):
+            sorted_songs = sorted(self.songs, key=_track_order)
+            by_track = {song.track_number: song for song in sorted_songs}
+            index = (self.songs, len(self.songs), sorted_songs, by_track)
+            self._track_index = index
+        return index[2], index[3]
 
     def sort_songs(self):
         # sort the album songs attribute by track number:
-        song_name_to_obj = {song.title: song for song in self.songs}
-        self.songs = [song_name_to_obj[num_song_tuple[1]] for num_song_tuple in
-                      sorted(self.tracklist().items(), key=lambda x: x[0])]
+        self.songs[:] = self._tracks()[0]
 
     def lyrics_list(self):
         # list in which each element contains a string with lyrics from a song:
-        self.sort_songs()
-        return [song.lyrics for song in self.songs]
+        return [song.lyrics for song in self._tracks()[0]]
 
     def joined_lyrics(self, delimiter=' '):
         # string with lyrics of all album songs, joined by space by default:
@@ -44,16 +123,16 @@ class Album:
 
     def tracklist(self):
         # dictionary relating each track number with the song title:
-        return {song.track_number: song.title for song in self.songs}
+        return {track_number: song.title
+                for track_number, song in self._tracks()[1].items()}
 
     def song_title(self, track_number):
         # Obtain the title of the song given the track number:
-        return self.tracklist()[track_number]
+        return self._tracks()[1][track_number].title
 
     def song_titles(self):
         # List with song titles sorted by track number:
-        self.sort_songs()
-        return [t[1] for t in self.tracklist().items()]
+        return [song.title for song in self._tracks()[0]]
 
     def songwriters(self):
         # set with all songwriters appearing in at least one song of the album:
@@ -70,30 +149,90 @@ class Album:
         return songwriters_dict
 
 
-def write_songs_json(songs, output_path):
+def _track_order(song):
+    # sorting key of the songs of an album:
+    return song.track_number is None, song.track_number or 0
+
+
+# attributes of the songs and albums that can be set directly:
+SONG_ATTRIBUTES = frozenset(Song.__slots__[:-1])
+ALBUM_ATTRIBUTES = frozenset(Album.FIELDS)
+
+
+def write_songs_json(songs, output_path, compresslevel=DEFAULT_COMPRESSLEVEL):
     """
     Write a set of songs' information in a JSON output file.
     :param songs: {str->Song object} dictionary in which the keys are song
-        titles and the values are the corresponding Song objects to write.
+        titles and the values are the corresponding Song objects to write, or
+        iterable of Song objects (e.g. a generator, so that the songs do not
+        need to be in memory at the same time).
     :param output_path: (str): path to which the output file will be written.
+        If its extension is '.gz', '.bz2' or '.xz', the file is compressed
+        (see "open_text").
+    :param compresslevel: (int) compression level, from 1 to 9.
+    """
+    with open_text(output_path, 'w', compresslevel) as output_file:
+        write_songs_json_lines(songs, output_file)
+
+
+def write_songs_json_append(songs, output_path,
+                            compresslevel=DEFAULT_COMPRESSLEVEL):
+    """
+    Add a set of songs' information to an existing JSON output file.
+    :param songs: {str->Song object} dictionary in which the keys are song
+        titles and the values are the corresponding Song objects to write, or
+        iterable of Song objects.
+    :param output_path: (str): path to which the output file will be written
+        (compressed or not, see "write_songs_json").
+    :param compresslevel: (int) compression level, from 1 to 9.
+    """
+    with open_text(output_path, 'a', compresslevel) as output_file:
+        write_songs_json_lines(songs, output_file)
+
+
+def write_songs_json_lines(songs, output_file, with_lyrics=True):
+    """
+    Write one JSON line per song to an open file, one song at a time and
+    without modifying the songs: the dictionary written is built from the
+    attributes of each song, and the number of words and unique words are
+    counted splitting the lyrics once.
+    :param songs: {str->Song object} or iterable of Song objects.
+    :param output_file: (file object) text file open for writing.
+    :param with_lyrics: (boolean) if False, the lyrics are not written (the
+        numbers of words are), e.g. when they are stored elsewhere.
+    """
+    if hasattr(songs, 'values'):
+        songs = songs.values()
+
+    for song in songs:
+        output_file.write(song_json_line(song, with_lyrics=with_lyrics))
+
+
+def song_json_line(song, with_lyrics=True):
+    """
+    :param song: (Song object)
+    :param with_lyrics: (boolean) see "write_songs_json_lines".
+    :return line: (str) JSON line of the song, as written to JSON files.
     """
-    with open(output_path, 'w', encoding="utf-8") as output_file:
-        for song in deepcopy(songs).values():
-            song.album.songs = []
-            song.album = vars(song.album)
-            song.songwriters = list(song.songwriters)
-            song_dict = vars(song)
-            song_dict['num_words'] = get_num_words(song.lyrics)
-            song_dict['num_unique_words'] = get_num_unique_words(song.lyrics)
-            output_file.write('{}\n'.format(json.dumps(song_dict)))
+    song_dict = song.as_dict()
+    song_dict['album'] = song.album.as_dict()
+    song_dict['album']['songs'] = []
+    # the songwriters are listed in the order of a copy of the set, built
+    # from its elements, as the deep copy of the songs used to be:
+    song_dict['songwriters'] = list(set(list(song.songwriters)))
+    song_dict['num_words'], song_dict['num_unique_words'] = \
+        get_word_stats(song.lyrics)
+    if not with_lyrics:
+        del song_dict['lyrics']
+    return '{}\n'.format(json.dumps(song_dict))
 
 
 def load_songs_json(input_path):
     """
     Load Song and Album objects and as many of their attributes as possible
     from the information written in a JSON input file.
-    :param input_path: (str) path to the input CSV file containing the songs'
-        information.
+    :param input_path: (str) path to the input JSON file containing the songs'
+        information (compressed or not, see "write_songs_json").
     :return songs: {str->Song object} dictionary in which the keys are song
         titles and the values are the corresponding Song objects.
     :return albums: {str->Album object} dictionary in which the keys are album
@@ -101,38 +240,15 @@ def load_songs_json(input_path):
     """
     songs, albums = {}, {}
 
-    for line in open(input_path, 'r', encoding="utf-8"):
-
-        # Load JSON dictionary:
-        json_dict = json.loads(line.rstrip())
-
-        # SONG:
-        # Initialise song:
-        song = Song(json_dict['title'])
-        # Add all song attributes:
-        for key, value in json_dict.items():
-            setattr(song, key, value)
-        # Songwriters attribute appears as a list in JSON file, turn to set:
-        song.songwriters = set(song.songwriters)
+    for line in open_text(input_path):
+        song = song_from_json(json.loads(line.rstrip()), albums)
         # Create song key and add to songs dictionary:
-        song_key = '{} - {}'.format(song.title, song.album['title'])
+        song_key = '{} - {}'.format(song.title, song.album.title)
         songs[song_key] = song
 
-        # If the album does not exist yet, create it & add to albums dict:
-        album_title = json_dict['album']['title']
-        if album_title not in albums:
-            album = Album(album_title)
-            albums[album_title] = album
-            for key, value in song.album.items():
-                setattr(album, key, value)
-
-        # Now change the album attribute of the song, which is currently a
-        # dictionary, and replace it by the actual album object:
-        song.album = albums[album_title]
-
     # Add song objects to list of songs attribute of each album:
     for song in songs.values():
-        song.album.songs.append(song)
+        song.album.add_song(song)
 
     # Sort songs list in the attribute of each album by track number:
     for album in albums.values():
@@ -141,53 +257,252 @@ def load_songs_json(input_path):
     return songs, albums
 
 
-def write_songs_csv_append(songs, output_path):
+def song_from_json(json_dict, albums, fields=None, song_class=Song):
+    """
+    Create the Song object of a song read from a JSON file. Its album is
+    taken from the given albums, or created and added to them if it is new
+    (the song is not added to the songs of the album).
+    :param json_dict: (dict) song information, as written by
+        "write_songs_json".
+    :param albums: {str->Album object} albums by title.
+    :param fields: (set(str)) if provided, only these song attributes are set
+        (besides the title and album).
+    :param song_class: (class) Song or a subclass of it.
+    :return song: (Song object)
+    """
+    # SONG:
+    # Initialise song:
+    song = song_class(json_dict['title'])
+    # Add all song attributes (the album dictionary and the songwriters
+    # list are replaced below):
+    for key, value in json_dict.items():
+        if fields is not None and key not in fields:
+            continue
+        if key in SONG_ATTRIBUTES:
+            setattr(song, key, value)
+        else:
+            song.set_extra(key, value)
+    # The same artist and songwriter names appear in many songs, share a
+    # single string for each of them. Songwriters attribute appears as a
+    # list in JSON file, turn to set:
+    if song.artist is not None:
+        song.artist = sys.intern(song.artist)
+    song.songwriters = set([sys.intern(sw) for sw in song.songwriters])
+
+    # If the album does not exist yet, create it & add to albums dict:
+    album_dict = json_dict['album']
+    album_title = album_dict['title']
+    if album_title not in albums:
+        album = Album(album_title)
+        albums[album_title] = album
+        for key, value in album_dict.items():
+            if key in ALBUM_ATTRIBUTES:
+                setattr(album, key, value)
+            else:
+                album.set_extra(key, value)
+        album.songs = []
+
+    # Now change the album attribute of the song, which is currently a
+    # dictionary, and replace it by the actual album object:
+    song.album = albums[album_title]
+
+    return song
+
+
+# maximum number of escaped quotes skipped in the lyrics of a JSON line before
+# decoding the whole line instead (see "_without_json_lyrics"):
+MAX_SKIPPED_QUOTES = 16
+
+
+def _without_json_lyrics(line):
+    """
+    JSON line of a song (see "song_json_line") with null lyrics, so that they
+    are not decoded when they are not needed. The end of the lyrics string is
+    found searching its closing quote, which is faster than decoding it, unless
+    the lyrics have many escaped quotes.
+    :param line: (str) JSON line of a song.
+    :return line: (str) the same line with null lyrics, or the original line
+        if its lyrics are not found or have too many escaped quotes.
+    """
+    # the lyrics are written after the lyrics URL, and so after the album:
+    start = line.find('"lyrics": "', max(line.find('"lyrics_url": '), 0))
+    if start < 0:
+        return line
+    start += len('"lyrics": ')
+    position = start + 1
+    for _ in range(MAX_SKIPPED_QUOTES):
+        end = line.find('"', position)
+        if end < 0:
+            return line
+        # the quote is escaped if preceded by an odd number of backslashes:
+        backslash = end
+        while line[backslash - 1] == '\\':
+            backslash -= 1
+        if (end - backslash) % 2 == 0:
+            return line[:start] + 'null' + line[end + 1:]
+        position = end + 1
+    return line
+
+
+def iter_songs(input_path, fields=None, chunk_size=None):
+    """
+    Read the songs of a JSON, CSV or SQLite (see "CorpusDB") input file
+    (depending on its extension) one at a time, without keeping them in
+    memory: only one song (or one chunk of songs) is loaded at a time, so
+    files of any size can be processed in bounded memory.
+    The albums are created when their first song is read and shared by their
+    songs, but their songs lists are left empty.
+    :param input_path: (str) path to the input JSON, CSV or SQLite file (JSON
+        and CSV files can be compressed, see "write_songs_json").
+    :param fields: (iterable(str)) if provided, only these song attributes are
+        read (besides the title and album), e.g. {'lyrics'}. The other columns
+        are not read from SQLite files, and the lyrics of JSON files are not
+        decoded if they are not needed. CSV rows are still parsed whole (a
+        quoted field has to be read to find the next one), so for CSV files
+        only the memory of the songs is reduced.
+    :param chunk_size: (int) if provided, the songs are yielded in
+        dictionaries of up to this number of songs, with the same keys as
+        "load_songs_json" (with the track number appended to repeated keys).
+    :return songs: generator of Song objects, or of {str->Song object}
+        dictionaries if "chunk_size" is provided.
+    """
+    # imported here, as the corpus module is built on this one:
+    from common.corpus_db import is_corpus_db, iter_songs_db
+
+    if fields is not None:
+        fields = set(fields)
+
+    def read_songs():
+        albums = {}
+        if is_corpus_db(input_path):
+            yield from iter_songs_db(input_path, fields=fields)
+        elif uncompressed_path(input_path).lower().endswith('.csv'):
+            for line in csv.DictReader(open_text(input_path, newline=''),
+                                       delimiter='|'):
+                yield song_from_csv(line, albums, fields=fields)
+        else:
+            skip_lyrics = fields is not None and 'lyrics' not in fields
+            for line in open_text(input_path):
+                line = line.rstrip()
+                if skip_lyrics:
+                    line = _without_json_lyrics(line)
+                yield song_from_json(json.loads(line), albums, fields=fields)
+
+    if chunk_size is None:
+        yield from read_songs()
+        return
+
+    chunk = {}
+    for song in read_songs():
+        song_key = '{} - {}'.format(song.title, song.album.title)
+        if song_key in chunk:
+            song_key = '{} ({})'.format(song_key, song.track_number)
+        chunk[song_key] = song
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = {}
+    if chunk:
+        yield chunk
+
+
+# size of the write buffer of the CSV files, so that many rows are written to
+# disk at once:
+CSV_BUFFER_SIZE = 2 ** 20
+
+# columns of the CSV files:
+CSV_HEADER = ['title', 'artist', 'track_number', 'album', 'year',
+              'album_number', 'instrumental', 'songwriters', 'lyrics', 'words',
+              'unique_words', 'pos', 'neg', 'compound']
+
+# tokens of the songwriters CSV field: escaped character, separator or text:
+_SONGWRITERS_TOKEN = re.compile(r'\\(.)|(,)|([^,\\]+|\\$)', re.DOTALL)
+
+
+def _join_songwriters(songwriters):
+    # songwriters CSV field: the names separated by commas, with the commas
+    # and backslashes in the names escaped by a backslash:
+    return ','.join([sw.replace('\\', '\\\\').replace(',', '\\,')
+                     for sw in sorted(songwriters)])
+
+
+def _split_songwriters(value):
+    # songwriters of a CSV field written by "_join_songwriters" (or by older
+    # versions, which did not escape the names):
+    songwriters, name = set(), []
+    for escaped, separator, text in _SONGWRITERS_TOKEN.findall(value):
+        if separator:
+            songwriters.add(''.join(name))
+            name = []
+        else:
+            name.append(escaped or text)
+    songwriters.add(''.join(name))
+    return songwriters
+
+
+def write_songs_csv_append(songs, output_path,
+                           compresslevel=DEFAULT_COMPRESSLEVEL):
     """
     Add a set of songs' information to an existing CSV output file.
     :param songs: {str->Song object} dictionary in which the keys are song
-        titles and the values are the corresponding Song objects to write.
-    :param output_path: (str): path to which the output file will be written.
+        titles and the values are the corresponding Song objects to write, or
+        iterable of Song objects.
+    :param output_path: (str): path to which the output file will be written
+        (compressed or not, see "write_songs_json").
+    :param compresslevel: (int) compression level, from 1 to 9.
     """
-    with open(output_path, 'a', encoding="utf-8") as output_file:
-        for song in songs.values():
-
-            lyrics = song.lyrics
-            while '\n' in lyrics:
-                lyrics = lyrics.replace('\n', '  ')
-
-            output_file.write(
-                '{}|{}|{}|{}|{}|{}|{}|{}|"{}"|{}|{}|{}|{}|{}\n'
-                .format(song.title,
-                        song.artist,
-                        song.track_number,
-                        song.album.title,
-                        song.album.year,
-                        song.album.number,
-                        song.instrumental,
-                        ','.join(sorted(list(song.songwriters))),
-                        lyrics,
-                        get_num_words(song.lyrics),
-                        get_num_unique_words(song.lyrics),
-                        song.positive_sentiment,
-                        song.negative_sentiment,
-                        song.compound_sentiment
-                        )
-                              )
-
-
-def write_songs_csv(songs, output_path):
+    with open_text(output_path, 'a', compresslevel, newline='',
+                   buffering=CSV_BUFFER_SIZE) as output_file:
+        write_songs_csv_rows(songs, output_file)
+
+
+def write_songs_csv(songs, output_path, compresslevel=DEFAULT_COMPRESSLEVEL):
     """
     Write a set of songs' information in a CSV output file.
     :param songs: {str->Song object} dictionary in which the keys are song
-        titles and the values are the corresponding Song objects to write.
-    :param output_path: (str): path to which the output file will be written.
+        titles and the values are the corresponding Song objects to write, or
+        iterable of Song objects.
+    :param output_path: (str): path to which the output file will be written
+        (compressed or not, see "write_songs_json").
+    :param compresslevel: (int) compression level, from 1 to 9.
     """
-    with open(output_path, 'w', encoding="utf-8") as output_file:
-        output_file.write('title|artist|track_number|album|year|album_number|' +
-                          'instrumental|songwriters|lyrics|' +
-                          'words|unique_words|pos|neg|compound\n')
+    with open_text(output_path, 'w', compresslevel, newline='',
+                   buffering=CSV_BUFFER_SIZE) as output_file:
+        csv.writer(output_file, delimiter='|').writerow(CSV_HEADER)
+        write_songs_csv_rows(songs, output_file)
+
 
-    write_songs_csv_append(songs, output_path)
+def write_songs_csv_rows(songs, output_file):
+    """
+    Write one CSV row per song to an open file. Fields containing the
+    delimiter, quotes or line breaks (e.g. the lyrics) are quoted, so the
+    lyrics are written as they are, and missing values (None) are written as
+    empty fields.
+    :param songs: {str->Song object} or iterable of Song objects.
+    :param output_file: (file object) text file open for writing, with
+        newline=''.
+    """
+    if hasattr(songs, 'values'):
+        songs = songs.values()
+
+    def song_rows():
+        for song in songs:
+            num_words, num_unique_words = get_word_stats(song.lyrics)
+            yield (song.title,
+                   song.artist,
+                   song.track_number,
+                   song.album.title,
+                   song.album.year,
+                   song.album.number,
+                   song.instrumental,
+                   _join_songwriters(song.songwriters),
+                   song.lyrics,
+                   num_words,
+                   num_unique_words,
+                   song.positive_sentiment,
+                   song.negative_sentiment,
+                   song.compound_sentiment)
+
+    csv.writer(output_file, delimiter='|').writerows(song_rows())
 
 
 def load_songs_csv(input_path):
@@ -195,7 +510,7 @@ def load_songs_csv(input_path):
     Load Song and Album objects and as many of their attributes as possible
     from the information written in a CSV input file.
     :param input_path: (str) path to the input CSV file containing the songs'
-        information.
+        information (compressed or not, see "write_songs_json").
     :return songs: {str->Song object} dictionary in which the keys are song
         titles and the values are the corresponding Song objects.
     :return albums: {str->Album object} dictionary in which the keys are album
@@ -203,68 +518,10 @@ def load_songs_csv(input_path):
     """
     songs, albums = {}, {}
 
-    for line in csv.DictReader(open(input_path, encoding="utf-8"),
+    for line in csv.DictReader(open_text(input_path, newline=''),
                                delimiter='|'):
 
-        # initialise song:
-        song = Song(line['title'])
-
-        # initialise album if it does not exist already:
-        if line['album'] not in albums:
-            album = Album(line['album'])
-            new_album = True
-        else:
-            album = albums[line['album']]
-            new_album = False
-
-        # SONG
-
-        # add artist attribute to song:
-        try:
-            song.artist = line['artist']
-        except KeyError:
-            pass
-
-        # add track number attribute to song:
-        try:
-            song.track_number = int(line['track_number'])
-        except (ValueError, KeyError):
-            pass
-
-        # add album attribute to song:
-        song.album = album
-
-        # add instrumental attribute to song:
-        if line['instrumental'] == 'True':
-            song.instrumental = True
-        elif line['instrumental'] == 'False':
-            song.instrumental = False
-        else:
-            song.instrumental = None
-
-        # add songwriters attribute to song:
-        try:
-            if line['songwriters']:
-                song.songwriters = set(line['songwriters'].split(','))
-        except ValueError:
-            pass
-
-        # add lyrics attribute to song:
-        song.lyrics = line['lyrics']
-
-        # add positive, negative and compound sentiment attributes to song:
-        try:
-            song.positive_sentiment = float(line['pos'])
-        except (ValueError, KeyError):
-            pass
-        try:
-            song.negative_sentiment = float(line['neg'])
-        except (ValueError, KeyError):
-            pass
-        try:
-            song.compound_sentiment = float(line['compound'])
-        except (ValueError, KeyError):
-            pass
+        song = song_from_csv(line, albums)
 
         # add song object to dictionary:
         if line['title'] in songs:
@@ -276,31 +533,86 @@ def load_songs_csv(input_path):
             key = line['title']
         songs[key] = song
 
-        # ALBUM
-
-        # initialise album:
-        if new_album:
-
-            # add year attribute to album:
-            try:
-                album.year = int(line['year'])
-            except (ValueError, KeyError):
-                pass
-
-            # add number attribute to album:
-            try:
-                album.number = int(line['album_number'])
-            except(ValueError, KeyError):
-                pass
-
-            # add album object to dictionary:
-            albums[line['album']] = album
-
         # add song to album songs:
-        album.songs.append(song)
+        song.album.add_song(song)
 
     # sort album songs list by track number:
     for album in albums.values():
         album.sort_songs()
 
     return songs, albums
+
+
+def _csv_int(value):
+    # integer of a CSV field, None for empty fields (or 'None', as written by
+    # older versions):
+    return None if value is None or value in ('', 'None') else int(value)
+
+
+def _csv_float(value):
+    # see "_csv_int":
+    return None if value is None or value in ('', 'None') else float(value)
+
+
+def _csv_text(value):
+    # see "_csv_int":
+    return None if value == '' else value
+
+
+# instrumental attribute for each value of the instrumental CSV field:
+_CSV_BOOLEANS = {'True': True, 'False': False}
+
+
+def song_from_csv(line, albums, fields=None):
+    """
+    Create the Song object of a song read from a CSV file. Its album is taken
+    from the given albums, or created and added to them if it is new (the song
+    is not added to the songs of the album).
+    :param line: {str->str} CSV row, as read by a csv.DictReader. Missing
+        columns are ignored.
+    :param albums: {str->Album object} albums by title.
+    :param fields: (set(str)) if provided, only these song attributes are set
+        (besides the title and album).
+    :return song: (Song object)
+    """
+    def wanted(name):
+        return fields is None or name in fields
+
+    # initialise song:
+    song = Song(line['title'])
+
+    # initialise album if it does not exist already:
+    if line['album'] not in albums:
+        album = Album(line['album'])
+        album.year = _csv_int(line.get('year'))
+        album.number = _csv_int(line.get('album_number'))
+        albums[line['album']] = album
+
+    # add album attribute to song:
+    song.album = albums[line['album']]
+
+    # add artist, track number and instrumental attributes to song:
+    if wanted('artist'):
+        song.artist = _csv_text(line.get('artist', ''))
+    if wanted('track_number'):
+        song.track_number = _csv_int(line.get('track_number'))
+    if wanted('instrumental'):
+        song.instrumental = _CSV_BOOLEANS.get(line.get('instrumental'))
+
+    # add songwriters attribute to song:
+    if wanted('songwriters') and line.get('songwriters'):
+        song.songwriters = _split_songwriters(line['songwriters'])
+
+    # add lyrics attribute to song:
+    if wanted('lyrics'):
+        song.lyrics = line.get('lyrics')
+
+    # add positive, negative and compound sentiment attributes to song:
+    if wanted('positive_sentiment'):
+        song.positive_sentiment = _csv_float(line.get('pos'))
+    if wanted('negative_sentiment'):
+        song.negative_sentiment = _csv_float(line.get('neg'))
+    if wanted('compound_sentiment'):
+        song.compound_sentiment = _csv_float(line.get('compound'))
+
+    return song
@@ -0,0 +1,168 @@
+from common.clean_lyrics import pos_tag_lyrics, pos_tag_lyrics_many, \
+    tagger_version
+import hashlib
+import sqlite3
+import json
+
+
+# default maximum size of the stored tags (JSON text), in bytes:
+DEFAULT_MAX_BYTES = 2 ** 28
+
+# default name of the cache file:
+TAG_CACHE_FILE = 'pos_tags.sqlite'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tags (
+    key TEXT PRIMARY KEY,
+    tagged TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tags_last_used ON tags (last_used);
+'''
+
+
+class TagCache:
+    """
+    Persistent cache of the part-of-speech tags of lyrics (see
+    "pos_tag_lyrics"), stored in a SQLite file, so that the same lyrics are
+    only tokenised and tagged once, even across runs. The tags of some lyrics
+    are stored under the SHA-256 hash of the tagger version and the lyrics:
+    tags of other NLTK versions are not reused, and are eventually evicted.
+    When the stored tags exceed "max_bytes", the least recently used ones are
+    evicted.
+    """
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, version=None,
+                 commit_every=1000):
+        """
+        :param path: (str) path to the SQLite file. It is created if it does
+            not exist.
+        :param max_bytes: (int) maximum size of the stored tags, in bytes.
+        :param version: (str) tagger version, by default "tagger_version".
+        :param commit_every: (int) number of writes per transaction.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = tagger_version() if version is None else version
+        self.commit_every = commit_every
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.executescript(SCHEMA)
+        size, clock = self.connection.execute(
+            'SELECT TOTAL(size), MAX(last_used) FROM tags').fetchone()
+        self._size = int(size)
+        self._clock = clock or 0  # last use of the most recent tags
+        self._writes = 0  # writes since the last commit
+        self.hits = 0
+        self.misses = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def key(self, lyrics):
+        # key of the tags of some lyrics:
+        text = '{}\n{}'.format(self.version, lyrics)
+        return hashlib.sha256(text.encode('utf-8', 'surrogatepass')) \
+            .hexdigest()
+
+    def _written(self):
+        # commit every "commit_every" writes:
+        self._writes += 1
+        if self._writes >= self.commit_every:
+            self.connection.commit()
+            self._writes = 0
+
+    def get(self, lyrics):
+        """
+        :param lyrics: (str)
+        :return tagged: ([[str, str]]) stored (token, tag) pairs of the
+            lyrics, or None if they are not stored.
+        """
+        key = self.key(lyrics)
+        row = self.connection.execute(
+            'SELECT tagged FROM tags WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        self._clock += 1
+        self.connection.execute(
+            'UPDATE tags SET last_used = ? WHERE key = ?', (self._clock, key))
+        self._written()
+        return json.loads(row[0])
+
+    def put(self, lyrics, tagged):
+        """
+        Store the tags of some lyrics, evicting the least recently used tags
+        if the cache gets too large.
+        :param lyrics: (str)
+        :param tagged: ([(str, str)]) (token, tag) pairs.
+        """
+        data = json.dumps(tagged, separators=(',', ':'))
+        self._clock += 1
+        cursor = self.connection.execute(
+            'INSERT OR IGNORE INTO tags (key, tagged, size, last_used) '
+            'VALUES (?, ?, ?, ?)',
+            (self.key(lyrics), data, len(data), self._clock))
+        self._size += len(data) * cursor.rowcount
+        self._written()
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        # remove the least recently used tags until the cache is not too
+        # large:
+        keys = []
+        for key, size in self.connection.execute(
+                'SELECT key, size FROM tags ORDER BY last_used'):
+            if self._size <= self.max_bytes:
+                break
+            keys.append((key,))
+            self._size -= size
+        self.connection.executemany('DELETE FROM tags WHERE key = ?', keys)
+        self._written()
+
+    def tag(self, lyrics):
+        """
+        Part-of-speech tags of some lyrics: the stored ones, or those of
+        "pos_tag_lyrics", which are then stored.
+        :param lyrics: (str)
+        :return tagged: ([(str, str)]) (token, tag) pairs.
+        """
+        tagged = self.get(lyrics)
+        if tagged is None:
+            self.misses += 1
+            tagged = pos_tag_lyrics(lyrics)
+            self.put(lyrics, tagged)
+        else:
+            self.hits += 1
+        return tagged
+
+    def tag_many(self, lyrics_list):
+        """
+        Same as "tag", for the lyrics of many songs: the lyrics that are not
+        stored are tagged together (see "pos_tag_lyrics_many").
+        :param lyrics_list: ([str])
+        :return tagged_list: ([[(str, str)]]) tags of each lyrics, in the
+            same order.
+        """
+        tagged_list = [self.get(lyrics) for lyrics in lyrics_list]
+        missing = {}  # lyrics not stored -> their positions in the list
+        for i, tagged in enumerate(tagged_list):
+            if tagged is None:
+                missing.setdefault(lyrics_list[i], []).append(i)
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        for lyrics, tagged in zip(missing,
+                                  pos_tag_lyrics_many(list(missing))):
+            self.put(lyrics, tagged)
+            for i in missing[lyrics]:
+                tagged_list[i] = tagged
+        return tagged_list
@@ -1,28 +1,60 @@
+from collections import OrderedDict
+from functools import lru_cache
+import re
 
 
-def get_words(lyrics, split_chars=(' ', ',', '.', ';', ':', '/', '_', '\n',
-                                   '(', ')', '[', ']', '?', '!')):
+# characters by which texts are split in words:
+SPLIT_CHARS = (' ', ',', '.', ';', ':', '/', '_', '\n', '(', ')', '[', ']',
+               '?', '!')
+
+# number of texts whose word counts are kept by "get_word_stats", enough for
+# the songs of a large catalog to be written to several files (e.g. JSON and
+# CSV) one after the other, splitting their lyrics only once:
+WORD_STATS_CACHE_SIZE = 2 ** 16
+
+# hash of a text -> (length of the text, number of words, number of unique
+# words), least recently used first. Only the counts are kept, not the texts
+# (e.g. lyrics read from a "LyricsStore"):
+_word_stats_cache = OrderedDict()
+
+
+@lru_cache(maxsize=32)
+def _split_pattern(split_chars):
+    # regular expression matching runs of split characters:
+    return re.compile('[{}]+'.format(''.join([re.escape(ch)
+                                              for ch in split_chars])))
+
+
+def get_words(lyrics, split_chars=SPLIT_CHARS):
     """
     Split text in words, splitting by a set of characters.
     :param lyrics: (str)
     :param split_chars: ([str])
     :return words: ([str])
     """
-    for ch in split_chars:
-        lyrics = lyrics.replace(ch, ' ')
-
-    while '  ' in lyrics:
-        lyrics = lyrics.replace('  ', ' ')
+    if tuple(split_chars) == SPLIT_CHARS:
+        return list(get_tokens(lyrics))
+    return _split_words(lyrics, tuple(split_chars))
 
-    if lyrics.startswith(' '):
-        lyrics = lyrics[1:]
 
-    if lyrics.endswith(' '):
-        lyrics = lyrics[:-1]
+def _split_words(lyrics, split_chars):
+    # runs of split characters separate words, and the text is not split at
+    # its beginning or end (so a text without words is a single empty word):
+    words = _split_pattern(split_chars).split(lyrics)
+    if len(words) > 1 and not words[0]:
+        del words[0]
+    if len(words) > 1 and not words[-1]:
+        del words[-1]
+    return words
 
-    words = lyrics.split(' ')
 
-    return words
+def get_tokens(lyrics):
+    """
+    Words of a text (see "get_words").
+    :param lyrics: (str)
+    :return words: (tuple(str))
+    """
+    return tuple(_split_words(lyrics, SPLIT_CHARS))
 
 
 def get_num_words(lyrics):
@@ -31,8 +63,7 @@ def get_num_words(lyrics):
     :param lyrics: (str)
     :return num_words: (int)
     """
-    words = get_words(lyrics)
-    num_words = len(words)
+    num_words, _num_unique_words = get_word_stats(lyrics)
     return num_words
 
 
@@ -42,7 +73,7 @@ def get_unique_words(lyrics):
     :param lyrics: (str)
     :return unique_words: (set(str))
     """
-    words = get_words(lyrics)
+    words = get_tokens(lyrics)
     unique_words = set(words)
     return unique_words
 
@@ -53,6 +84,30 @@ def get_num_unique_words(lyrics):
     :param lyrics: (str)
     :return num_unique_words: (int)
     """
-    unique_words = get_unique_words(lyrics)
-    num_unique_words = len(unique_words)
+    _num_words, num_unique_words = get_word_stats(lyrics)
     return num_unique_words
+
+
+def get_word_stats(lyrics):
+    """
+    Count the number of words and of unique words in a provided text,
+    splitting it only once (see "get_tokens"). The counts of the last
+    "WORD_STATS_CACHE_SIZE" texts are cached by their hash and length, so the
+    same lyrics (e.g. of a song written to several files, or stored in
+    several copies) are split only once.
+    :param lyrics: (str)
+    :return num_words: (int)
+    :return num_unique_words: (int)
+    """
+    key = hash(lyrics)
+    stats = _word_stats_cache.get(key)
+    if stats is not None and stats[0] == len(lyrics):
+        _word_stats_cache.move_to_end(key)
+        return stats[1], stats[2]
+
+    words = get_tokens(lyrics)
+    stats = (len(lyrics), len(words), len(set(words)))
+    _word_stats_cache[key] = stats
+    if len(_word_stats_cache) > WORD_STATS_CACHE_SIZE:
+        _word_stats_cache.popitem(last=False)
+    return stats[1], stats[2]
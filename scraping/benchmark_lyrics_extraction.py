@@ -0,0 +1,60 @@
+from scraping.scrape_lyrics_azlyrics import parse_lyrics_html
+from os import listdir
+from os.path import join
+import time
+import gzip
+
+
+def load_saved_pages(pages_dir):
+    """
+    Read the lyrics webpages saved in a directory, either as plain HTML files
+    ('.html') or gzipped, as stored by the page cache ('.html.gz').
+    :param pages_dir: (str) directory with the saved webpages.
+    :return pages: {str->str} relates file names to HTML sources.
+    """
+    pages = {}
+    for file_name in sorted(listdir(pages_dir)):
+        path = join(pages_dir, file_name)
+        if file_name.endswith('.html.gz'):
+            with gzip.open(path, 'rt', encoding="utf-8") as page_file:
+                pages[file_name] = page_file.read()
+        elif file_name.endswith('.html'):
+            with open(path, 'r', encoding="utf-8") as page_file:
+                pages[file_name] = page_file.read()
+    return pages
+
+
+def benchmark_lyrics_extraction(pages_dir, repeat=20):
+    """
+    Time the extraction of lyrics and songwriters from saved lyrics webpages,
+    printing the time per page. Pages without lyrics (e.g. the discography
+    and search pages of a page cache directory) are skipped.
+    :param pages_dir: (str) directory with the saved webpages.
+    :param repeat: (int) number of times each page is parsed.
+    :return ms_per_page: (float) average milliseconds to extract the lyrics
+        and songwriters of a page.
+    """
+    timings = []
+    for file_name, html in load_saved_pages(pages_dir).items():
+        try:
+            parse_lyrics_html(html)
+        except ValueError:
+            continue
+        start = time.perf_counter()
+        for _ in range(repeat):
+            parse_lyrics_html(html)
+        timings.append((time.perf_counter() - start) / repeat * 1000)
+
+    if not timings:
+        print('No lyrics webpages found in {}'.format(pages_dir))
+        return None
+
+    ms_per_page = sum(timings) / len(timings)
+    print('{} pages: {:.2f} ms per page on average (min {:.2f} ms, max {:.2f} '
+          'ms)'.format(len(timings), ms_per_page, min(timings), max(timings)))
+    return ms_per_page
+
+
+if __name__ == '__main__':
+    saved_pages_dir = r"C:\Users\pablo\ProjectsData\Lyrics\page_cache"
+    benchmark_lyrics_extraction(saved_pages_dir)
@@ -0,0 +1,153 @@
+from scraping.songwriter_index import clean_sw, unify_songwriters_indexed
+from itertools import product
+from random import Random
+import time
+
+
+FIRST_NAMES = ['john', 'paul', 'george', 'richard', 'david', 'mick', 'keith',
+               'bob', 'joni', 'robert', 'jimmy', 'freddie', 'brian', 'roger',
+               'stevie', 'elton', 'bernie', 'carole', 'gerry', 'neil', 'james',
+               'michael', 'mary', 'patti', 'lou', 'iggy', 'tom', 'chris',
+               'johnny', 'peter', 'ray', 'dave', 'pete', 'kate', 'annie']
+
+
+def unify_songwriters_pairwise(raw_songwriters):
+    """
+    Reference implementation of "unify_songwriters" before the songwriter
+    index was introduced: every pair of names is compared again after every
+    merge. Kept to check that both implementations give the same
+    equivalences, and to compare their running times.
+    :param raw_songwriters: set(str) songwriter names. The discarded names are
+        removed from it.
+    :return equivalences: {str->str}
+    """
+    change_in_songwriters = True
+    equivalences = {}
+
+    while change_in_songwriters:
+
+        change_in_songwriters = False
+
+        for sw_1, sw_2 in product(raw_songwriters, raw_songwriters):
+
+            if sw_1 == sw_2:
+                continue
+
+            words_1 = clean_sw(sw_1).split(' ')
+            words_2 = clean_sw(sw_2).split(' ')
+
+            change_in_words = True
+            while change_in_words:
+                change_in_words = False
+                for w_1 in list(words_1):
+                    if w_1 in words_2:
+                        words_1.remove(w_1)
+                        words_2.remove(w_1)
+                        change_in_words = True
+                        break
+
+            change_in_words = True
+            while change_in_words:
+                change_in_words = False
+                for w_1 in list(words_1):
+                    for i in range(len(w_1)):
+                        if w_1[:i+1] in words_2:
+                            words_1.remove(w_1)
+                            words_2.remove(w_1[:i+1])
+                            change_in_words = True
+                            break
+                    if change_in_words:
+                        break
+
+            if not words_1 or not words_2:
+                if len(sw_1) < len(sw_2):
+                    equivalences[sw_2] = sw_1
+                    raw_songwriters.remove(sw_2)
+                else:
+                    equivalences[sw_1] = sw_2
+                    raw_songwriters.remove(sw_1)
+                change_in_songwriters = True
+                break
+
+    change = True
+    while change:
+        change = False
+        for sw, eq in equivalences.items():
+            if eq in equivalences:
+                equivalences[sw] = equivalences[eq]
+                change = True
+                break
+
+    return equivalences
+
+
+def random_songwriters(num_names, seed=0):
+    """
+    Generate a set of synthetic songwriter names, with variants of the same
+    person written in different ways ("John W. Lennon", "Lennon John",
+    "J. Lennon"...).
+    :param num_names: (int) number of names to generate.
+    :param seed: (int) random seed.
+    :return songwriters: set(str)
+    """
+    rand = Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    # about one surname for every three names, as in real corpora:
+    surnames = [''.join(rand.choice(letters) for _ in range(rand.randint(4, 9)))
+                for _ in range(max(1, num_names // 3))]
+
+    songwriters = set()
+    while len(songwriters) < num_names:
+        first = rand.choice(FIRST_NAMES).capitalize()
+        last = rand.choice(surnames).capitalize()
+        variant = rand.randint(0, 5)
+        if variant == 0:
+            name = '{} {}'.format(first, last)
+        elif variant == 1:
+            name = '{} {}. {}'.format(first, rand.choice(letters).upper(), last)
+        elif variant == 2:
+            name = '{}. {}'.format(first[0], last)
+        elif variant == 3:
+            name = '{} {}'.format(last, first)
+        elif variant == 4:
+            name = '{}-{} {}'.format(first, rand.choice(FIRST_NAMES), last)
+        else:
+            name = last
+        songwriters.add(name)
+    return songwriters
+
+
+def benchmark_songwriters(sizes=(100, 1000, 5000, 20000, 50000),
+                          max_pairwise_size=500):
+    """
+    Time "unify_songwriters_indexed" on sets of synthetic songwriter names of
+    increasing size. For the smallest sizes, the reference pairwise
+    implementation is timed too, and both equivalences are checked to be the
+    same.
+    :param sizes: ([int]) numbers of songwriter names.
+    :param max_pairwise_size: (int) largest size for which the pairwise
+        implementation is run.
+    """
+    for size in sizes:
+        songwriters = random_songwriters(size)
+
+        start = time.perf_counter()
+        equivalences = unify_songwriters_indexed(set(songwriters))
+        indexed_seconds = time.perf_counter() - start
+        line = '{:>6} names: indexed {:8.3f} s ({} merged)'.format(
+            size, indexed_seconds, len(equivalences))
+
+        if size <= max_pairwise_size:
+            start = time.perf_counter()
+            pairwise_equivalences = unify_songwriters_pairwise(
+                set(songwriters))
+            pairwise_seconds = time.perf_counter() - start
+            assert pairwise_equivalences == equivalences
+            line += ', pairwise {:8.3f} s (same equivalences)'.format(
+                pairwise_seconds)
+
+        print(line)
+
+
+if __name__ == '__main__':
+    benchmark_songwriters()
@@ -0,0 +1,99 @@
+from os.path import exists
+from os import fsync
+import threading
+import json
+
+
+class ScrapeCheckpoint:
+    """
+    Append-only file where the lyrics and songwriters of every song are saved
+    as soon as they are scraped, so that an interrupted scraping run can be
+    resumed without scraping the same songs again.
+    Each line is a JSON dictionary with the artist name and discography URL it
+    belongs to, so a checkpoint file is only reused by runs of the same artist
+    and discography.
+    """
+    def __init__(self, path, artist, discography_url):
+        """
+        :param path: (str) path to the checkpoint file.
+        :param artist: (str) artist name.
+        :param discography_url: (str) URL to the artist discography webpage.
+        """
+        self.path = path
+        self.artist = artist
+        self.discography_url = discography_url
+        self._lock = threading.Lock()
+        self._checked_end = False
+
+    def load(self):
+        """
+        Read the songs already scraped for this artist and discography.
+        Lines left incomplete by a crash are ignored.
+        :return done: {str->(str, set(str))} relates song keys to their lyrics
+            and songwriters.
+        """
+        done = {}
+        if not exists(self.path):
+            return done
+
+        for line in open(self.path, 'r', encoding="utf-8"):
+            try:
+                entry = json.loads(line)
+            except ValueError:  # incomplete line
+                continue
+            if entry['artist'] != self.artist or \
+                    entry['discography_url'] != self.discography_url:
+                continue
+            done[entry['song_key']] = \
+                (entry['lyrics'], set(entry['songwriters']))
+
+        return done
+
+    def restore(self, songs):
+        """
+        Set the lyrics and songwriters attributes of the songs already scraped
+        according to the checkpoint file.
+        :param songs: {str->Song object} dictionary in which the keys are song
+            titles and the values are the corresponding Song objects.
+        :return restored_keys: set(str) keys of the songs restored.
+        """
+        restored_keys = set()
+        for song_key, (lyrics, songwriters) in self.load().items():
+            if song_key in songs:
+                songs[song_key].lyrics = lyrics
+                songs[song_key].songwriters = songwriters
+                restored_keys.add(song_key)
+        return restored_keys
+
+    def record(self, song_key, song):
+        """
+        Append the lyrics and songwriters of a scraped song to the checkpoint
+        file, making sure they are written to disk before returning.
+        :param song_key: (str) key of the song in the songs dictionary.
+        :param song: (Song object)
+        """
+        line = json.dumps({'artist': self.artist,
+                           'discography_url': self.discography_url,
+                           'song_key': song_key,
+                           'lyrics': song.lyrics,
+                           'songwriters': sorted(song.songwriters)})
+        with self._lock:
+            if not self._checked_end:
+                # terminate a line left incomplete by a previous crash:
+                if exists(self.path) and not _ends_with_newline(self.path):
+                    line = '\n' + line
+                self._checked_end = True
+            with open(self.path, 'a', encoding="utf-8") as checkpoint_file:
+                checkpoint_file.write('{}\n'.format(line))
+                checkpoint_file.flush()
+                fsync(checkpoint_file.fileno())
+
+
+def _ends_with_newline(path):
+    # whether a non-empty file ends with a line break (empty files do):
+    with open(path, 'rb') as input_file:
+        input_file.seek(0, 2)
+        if input_file.tell() == 0:
+            return True
+        input_file.seek(-1, 2)
+        return input_file.read(1) == b'\n'
@@ -0,0 +1,149 @@
+from contextlib import contextmanager
+from datetime import datetime
+from queue import Queue, Empty
+import threading
+
+
+class DriverPool:
+    """
+    Pool of warm chromedriver sessions shared by the scraping functions.
+    Sessions are started lazily, leased one at a time and returned to the pool
+    once the caller is done with them, so that the (slow) browser start-up is
+    paid only once per session instead of once per page.
+    A session is recycled (closed and replaced by a new one on the next lease)
+    after it has loaded "max_pages" pages, or as soon as the page it was
+    loading raised an error.
+    Selenium is only imported when the first session is started, so that the
+    HTTP page backend can be used without it.
+    """
+    def __init__(self, chromedriver_path, headless=True, size=1,
+                 max_pages=50):
+        """
+        :param chromedriver_path: (str) path to the chromedriver executable.
+        :param headless: (boolean) if set as False the browser windows will be
+            shown, otherwise, they will not.
+        :param size: (int) maximum number of sessions alive at the same time.
+        :param max_pages: (int) number of pages after which a session is
+            recycled.
+        """
+        self.chromedriver_path = chromedriver_path
+        self.headless = headless
+        self.size = size
+        self.max_pages = max_pages
+        self._idle = Queue()
+        self._pages = {}  # driver -> number of pages loaded
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def _start_driver(self):
+        # initialise a new chromedriver session:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        options = Options()
+        if self.headless:
+            options.add_argument("--headless")  # to not see browser window
+        driver = webdriver.Chrome(self.chromedriver_path, options=options)
+        with self._lock:
+            self._pages[driver] = 0
+        print('{}\tStarted new browser session ({} alive)'
+              .format(datetime.now(), len(self._pages)))
+        return driver
+
+    def _quit_driver(self, driver):
+        # shut down a session, ignoring errors of already crashed browsers:
+        with self._lock:
+            self._pages.pop(driver, None)
+        try:
+            driver.quit()
+        except BaseException:
+            pass
+
+    def acquire(self):
+        """
+        Lease a session from the pool, starting a new one if no idle session
+        is available. Blocks while "size" sessions are already leased.
+        :return driver: (WebDriver object)
+        """
+        if self._closed:
+            raise RuntimeError('Driver pool has already been shut down.')
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+        try:
+            return self._start_driver()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, driver, failed=False):
+        """
+        Return a leased session to the pool. The session is shut down instead
+        if it failed, if it reached the maximum number of pages, or if the pool
+        has been shut down in the meantime.
+        :param driver: (WebDriver object) session obtained with "acquire".
+        :param failed: (boolean) whether an error occurred using the session.
+        """
+        with self._lock:
+            self._pages[driver] = self._pages.get(driver, 0) + 1
+            exhausted = self._pages[driver] >= self.max_pages
+        if failed or exhausted or self._closed:
+            self._quit_driver(driver)
+        else:
+            self._idle.put(driver)
+        self._slots.release()
+
+    @contextmanager
+    def lease(self):
+        """
+        Context manager version of "acquire"/"release": the session is returned
+        to the pool on exit, and recycled if an exception was raised.
+        """
+        driver = self.acquire()
+        try:
+            yield driver
+        except BaseException:
+            self.release(driver, failed=True)
+            raise
+        self.release(driver)
+
+    def shutdown(self):
+        """
+        Shut down all the sessions of the pool. Sessions currently leased are
+        shut down when they are released.
+        """
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except Empty:
+                break
+            self._quit_driver(driver)
+
+
+@contextmanager
+def driver_session(driver_pool, chromedriver_path, headless=True):
+    """
+    Lease a session from the given pool or, if no pool is provided, from a
+    temporary one-session pool that is shut down on exit.
+    :param driver_pool: (DriverPool object or None)
+    :param chromedriver_path: (str) path to the chromedriver executable file.
+    :param headless: (boolean) if set as False the browser window will be shown,
+        otherwise, it will not.
+    """
+    if driver_pool is not None:
+        with driver_pool.lease() as driver:
+            yield driver
+        return
+
+    with DriverPool(chromedriver_path, headless=headless) as temporary_pool:
+        with temporary_pool.lease() as driver:
+            yield driver
@@ -1,9 +1,33 @@
-from selenium import webdriver
 from datetime import datetime
-from selenium.webdriver.chrome.options import Options
+from urllib.parse import quote_plus
+from scraping.driver_pool import driver_session
+from scraping.html_tree import parse_html
 
 
-def find_artist_url(artist, chromedriver_path, headless=True):
+AZLYRICS_SEARCH_URL = 'https://search.azlyrics.com/search.php?q={}'
+
+
+def parse_artist_results(results_panels):
+    """
+    Obtain the name and discography URL of the first artist in the results
+    panels of an azlyrics search webpage.
+    :param results_panels: iterable of "panel" elements (selenium WebElement or
+        HtmlNode objects) of the search results webpage.
+    :return artist_name: (str) the actual artist name in azlyrics site.
+    :return artist_discography_url: (str) URL to the artist discography webpage
+        in azlyrics site.
+    """
+    for panel in results_panels:
+        if panel.text.startswith('Artist results:'):
+            a_elements = panel.find_elements_by_tag_name("a")
+            a = a_elements[0]  # first result
+            artist_name = ' '.join(a.text.split(' ')[1:])
+            artist_discography_url = a.get_attribute('href')
+            return artist_name, artist_discography_url
+
+
+def find_artist_url(artist, chromedriver_path, headless=True,
+                    driver_pool=None, backend=None):
     """
     Given the name of an artist, this function loads the azlyrics main webpage,
     introduces this name in the search box and loads the results, returning
@@ -12,37 +36,41 @@ def find_artist_url(artist, chromedriver_path, headless=True):
     :param chromedriver_path: (str) path to the chromedriver executable file.
     :param headless: (boolean) if set as False the browser window will be shown,
         otherwise, it will not.
+    :param driver_pool: (DriverPool object) pool to lease the browser session
+        from. If not provided, a temporary session is started and shut down.
+    :param backend: (HttpBackend, SeleniumBackend or CachedBackend object) if
+        provided, the search results webpage is fetched with it and parsed
+        in-process, instead of typing the artist in the search box.
     :return artist_name: (str) the actual artist name in azlyrics site.
     :return artist_discography_url: (str) URL to the artist discography webpage
         in azlyrics site.
     """
     azlyrics_url = r'https://www.azlyrics.com/'
 
+    if backend is not None:
+        search_url = AZLYRICS_SEARCH_URL.format(quote_plus(artist))
+        document = parse_html(backend.fetch(search_url), base_url=search_url)
+        print('{}\tLoaded search results for \"{}\"'
+              .format(datetime.now(), artist))
+        return parse_artist_results(document.find_all('div', class_='panel'))
+
     # Enter site:
-    options = Options()
-    if headless:
-        options.add_argument("--headless")  # to not see browser window
-    driver = webdriver.Chrome(chromedriver_path, options=options)
-    driver.get(azlyrics_url)
-    print('{}\tEntered \"{}\" site successfully'
-          .format(datetime.now(), driver.title))
-
-    # Find search textbox and type in artist name:
-    search_textbox = driver.find_element_by_xpath(
-        "//input[@class='form-control']")
-    search_textbox.send_keys(artist)
-
-    # Find search button and click:
-    search_button = driver.find_element_by_xpath(
-        "//button[@class='btn btn-primary']")
-    search_button.click()
-
-    # Results webpage loaded:
-    results_panels = driver.find_elements_by_xpath("//div[@class='panel']")
-    for panel in results_panels:
-        if panel.text.startswith('Artist results:'):
-            a_elements = panel.find_elements_by_tag_name("a")
-            a = a_elements[0]  # first result
-            artist_name = ' '.join(a.text.split(' ')[1:])
-            artist_discography_url = a.get_attribute('href')
-            return artist_name, artist_discography_url
+    with driver_session(driver_pool, chromedriver_path,
+                        headless=headless) as driver:
+        driver.get(azlyrics_url)
+        print('{}\tEntered \"{}\" site successfully'
+              .format(datetime.now(), driver.title))
+
+        # Find search textbox and type in artist name:
+        search_textbox = driver.find_element_by_xpath(
+            "//input[@class='form-control']")
+        search_textbox.send_keys(artist)
+
+        # Find search button and click:
+        search_button = driver.find_element_by_xpath(
+            "//button[@class='btn btn-primary']")
+        search_button.click()
+
+        # Results webpage loaded:
+        results_panels = driver.find_elements_by_xpath("//div[@class='panel']")
+        return parse_artist_results(results_panels)
@@ -0,0 +1,158 @@
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+import re
+
+
+# elements that never have children nor closing tag:
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+             'link', 'meta', 'param', 'source', 'track', 'wbr'}
+
+# elements whose content is not rendered as text:
+HIDDEN_TAGS = {'head', 'script', 'style', 'noscript', 'template', 'iframe'}
+
+# elements rendered on their own line(s):
+BLOCK_TAGS = {'address', 'article', 'aside', 'blockquote', 'body', 'center',
+              'dd', 'div', 'dl', 'dt', 'fieldset', 'figure', 'footer', 'form',
+              'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'html', 'li',
+              'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'tr', 'ul'}
+
+_BLOCK_MARK = '\x00'
+
+
+class HtmlNode:
+    """
+    Element of a parsed HTML document. It exposes the small part of the
+    selenium WebElement interface used by the scraping functions ("tag_name",
+    "text" and "get_attribute"), so that the same parsing code can walk both
+    live browser pages and HTML parsed in-process.
+    """
+    def __init__(self, tag_name, attrs=None, parent=None):
+        self.tag_name = tag_name
+        self.attrs = dict(attrs) if attrs else {}
+        self.parent = parent
+        self.children = []  # HtmlNode objects and text strings
+        self.base_url = parent.base_url if parent is not None else None
+
+    def get_attribute(self, name):
+        # like selenium, links are resolved to absolute URLs:
+        value = self.attrs.get(name)
+        if value is not None and name in ('href', 'src') and self.base_url:
+            value = urljoin(self.base_url, value)
+        return value
+
+    def iter_descendants(self):
+        # all descendant elements in document order (XPath ".//*"):
+        stack = [child for child in reversed(self.children)
+                 if isinstance(child, HtmlNode)]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(child for child in reversed(node.children)
+                         if isinstance(child, HtmlNode))
+
+    def find_all(self, tag_name, **attrs):
+        """
+        Descendant elements with the given tag name whose attributes have
+        exactly the given values.
+        :param tag_name: (str) e.g. 'div'.
+        :param attrs: attribute name -> value. Use "class_" for 'class'.
+        :return nodes: ([HtmlNode])
+        """
+        attrs = {key.rstrip('_'): value for key, value in attrs.items()}
+        return [node for node in self.iter_descendants()
+                if node.tag_name == tag_name and
+                all(node.attrs.get(k) == v for k, v in attrs.items())]
+
+    def find(self, tag_name, **attrs):
+        # first descendant element matching "find_all" criteria, or None:
+        nodes = self.find_all(tag_name, **attrs)
+        return nodes[0] if nodes else None
+
+    def find_elements_by_tag_name(self, tag_name):
+        # same as the selenium WebElement method:
+        return self.find_all(tag_name)
+
+    def find_element_by_tag_name(self, tag_name):
+        # same as the selenium WebElement method:
+        node = self.find(tag_name)
+        if node is None:
+            raise ValueError('No "{}" element found under "{}" element'
+                             .format(tag_name, self.tag_name))
+        return node
+
+    @property
+    def text(self):
+        """
+        Approximation of the text rendered by a browser for this element:
+        whitespace is collapsed, "br" elements become line breaks and block
+        elements start on a new line.
+        """
+        pieces = []
+        self._render(pieces)
+        parts = [re.sub(r' *\n *', '\n', part).strip(' ')
+                 for part in ''.join(pieces).split(_BLOCK_MARK)]
+        text = ''
+        for part in parts:
+            if not part:
+                continue
+            if text and not text.endswith('\n') and not part.startswith('\n'):
+                text += '\n'
+            text += part
+        return text.strip()
+
+    def _render(self, pieces):
+        for child in self.children:
+            if isinstance(child, str):
+                pieces.append(re.sub(r'\s+', ' ', child))
+            elif child.tag_name == 'br':
+                pieces.append('\n')
+            elif child.tag_name in HIDDEN_TAGS:
+                continue
+            elif child.tag_name in BLOCK_TAGS:
+                pieces.append(_BLOCK_MARK)
+                child._render(pieces)
+                pieces.append(_BLOCK_MARK)
+            else:
+                child._render(pieces)
+
+
+class _TreeBuilder(HTMLParser):
+    # builds a tree of HtmlNode objects, tolerating unclosed elements:
+    def __init__(self, root):
+        super().__init__(convert_charrefs=True)
+        self.stack = [root]
+
+    def handle_starttag(self, tag, attrs):
+        node = HtmlNode(tag, attrs, parent=self.stack[-1])
+        self.stack[-1].children.append(node)
+        if tag not in VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        node = HtmlNode(tag, attrs, parent=self.stack[-1])
+        self.stack[-1].children.append(node)
+
+    def handle_endtag(self, tag):
+        # close the innermost open element with this tag, if any:
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag_name == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1].children.append(data)
+
+
+def parse_html(html, base_url=None):
+    """
+    Parse an HTML document into a tree of HtmlNode objects.
+    :param html: (str) HTML source of the webpage.
+    :param base_url: (str) URL of the webpage, used to resolve relative links.
+    :return root: (HtmlNode object) document root.
+    """
+    root = HtmlNode('#document')
+    root.base_url = base_url
+    builder = _TreeBuilder(root)
+    builder.feed(html)
+    builder.close()
+    return root
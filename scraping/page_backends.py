@@ -0,0 +1,229 @@
+from http.client import HTTPConnection, HTTPSConnection, HTTPException
+from urllib.parse import urlsplit, urljoin
+import threading
+import zlib
+
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+                  'AppleWebKit/537.36 (KHTML, like Gecko) '
+                  'Chrome/96.0.4664.110 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,'
+              '*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+
+class PageFetchError(Exception):
+    """
+    Raised when a webpage could not be fetched (HTTP error status or too many
+    redirects).
+    """
+    def __init__(self, url, status, reason=''):
+        super().__init__('Could not fetch {}: {} {}'.format(url, status, reason))
+        self.url = url
+        self.status = status
+
+
+class ThrottledError(Exception):
+    """
+    Raised when the website answered with an access-denied or captcha page
+    instead of the requested content.
+    """
+
+
+# markup of the pages returned by the website when it throttles a client:
+THROTTLE_MARKERS = ('g-recaptcha', 'unusual activity from your ip')
+
+# HTTP status codes returned by the website when it throttles a client:
+THROTTLE_STATUS_CODES = {403, 429, 503}
+
+
+def check_throttled(html):
+    """
+    Raise a ThrottledError if the given HTML source is an access-denied or
+    captcha page.
+    :param html: (str) HTML source of a webpage.
+    """
+    lowered_html = html.lower()
+    for marker in THROTTLE_MARKERS:
+        if marker in lowered_html:
+            raise ThrottledError('Access denied by website ("{}" found in '
+                                 'webpage)'.format(marker))
+
+
+def is_throttling_error(error):
+    """
+    Whether an error raised while fetching or parsing a webpage means that
+    the website is throttling the client.
+    :param error: (Exception object)
+    :return throttling: (boolean)
+    """
+    if isinstance(error, ThrottledError):
+        return True
+    return isinstance(error, PageFetchError) and \
+        error.status in THROTTLE_STATUS_CODES
+
+
+class HttpBackend:
+    """
+    Page backend that fetches the raw HTML of webpages over plain HTTP(S),
+    without a browser. Connections are kept alive and reused between requests
+    to the same host.
+    """
+    def __init__(self, timeout=30, headers=None, max_redirects=5):
+        """
+        :param timeout: (int) seconds to wait for the server before failing.
+        :param headers: ({str->str}) headers to send instead of the defaults.
+        :param max_redirects: (int) maximum number of redirects to follow.
+        """
+        self.timeout = timeout
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self.max_redirects = max_redirects
+        self._idle = {}  # (scheme, host) -> [idle connections]
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_connection(self, scheme, host):
+        # reuse an idle keep-alive connection to the host if there is one:
+        with self._lock:
+            idle = self._idle.get((scheme, host))
+            if idle:
+                return idle.pop(), True
+        connection_class = HTTPSConnection if scheme == 'https' \
+            else HTTPConnection
+        return connection_class(host, timeout=self.timeout), False
+
+    def _put_connection(self, scheme, host, connection):
+        with self._lock:
+            self._idle.setdefault((scheme, host), []).append(connection)
+
+    def _request(self, url):
+        # send a GET request for the URL and read the whole response:
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        connection, reused = self._get_connection(parts.scheme, parts.netloc)
+        try:
+            connection.request('GET', path, headers=self.headers)
+            response = connection.getresponse()
+            body = response.read()
+        except (HTTPException, OSError):
+            connection.close()
+            if not reused:
+                raise
+            # the server closed the idle connection, retry with a new one:
+            connection, _ = self._get_connection(parts.scheme, parts.netloc)
+            connection.request('GET', path, headers=self.headers)
+            response = connection.getresponse()
+            body = response.read()
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._put_connection(parts.scheme, parts.netloc, connection)
+
+        return response, body
+
+    def fetch(self, url):
+        """
+        Fetch the HTML source of a webpage, following redirects.
+        :param url: (str) URL of the webpage.
+        :return html: (str) HTML source of the webpage.
+        """
+        for _redirect in range(self.max_redirects + 1):
+            response, body = self._request(url)
+            if response.status in (301, 302, 303, 307, 308):
+                url = urljoin(url, response.getheader('Location'))
+                continue
+            if response.status >= 400:
+                raise PageFetchError(url, response.status, response.reason)
+            return decode_body(response, body)
+        raise PageFetchError(url, response.status, 'too many redirects')
+
+    def is_cached(self, url):
+        # every fetch is a request to the website:
+        return False
+
+    def close(self):
+        # close all the idle connections:
+        with self._lock:
+            for connections in self._idle.values():
+                for connection in connections:
+                    connection.close()
+            self._idle = {}
+
+
+class SeleniumBackend:
+    """
+    Page backend that loads webpages in the browser sessions of a driver pool
+    and returns their HTML source. Slower than "HttpBackend", but it renders
+    the pages like a real browser does.
+    """
+    def __init__(self, driver_pool):
+        """
+        :param driver_pool: (DriverPool object) pool to lease sessions from.
+        """
+        self.driver_pool = driver_pool
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def fetch(self, url):
+        """
+        Load a webpage in a browser session and return its HTML source.
+        :param url: (str) URL of the webpage.
+        :return html: (str) HTML source of the webpage.
+        """
+        with self.driver_pool.lease() as driver:
+            driver.get(url)
+            return driver.page_source
+
+    def is_cached(self, url):
+        # every fetch is a request to the website:
+        return False
+
+    def close(self):
+        # the driver pool is shared, its owner shuts it down:
+        pass
+
+
+def decode_body(response, body):
+    """
+    Decompress (if needed) and decode the body of an HTTP response.
+    :param response: (HTTPResponse object)
+    :param body: (bytes) raw body of the response.
+    :return text: (str)
+    """
+    encoding = (response.getheader('Content-Encoding') or '').lower()
+    if encoding == 'gzip':
+        body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    elif encoding == 'deflate':
+        try:
+            body = zlib.decompress(body)
+        except zlib.error:  # raw deflate stream, without zlib header
+            body = zlib.decompress(body, -zlib.MAX_WBITS)
+
+    charset = 'utf-8'
+    content_type = response.getheader('Content-Type') or ''
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.strip().partition('=')
+        if key.lower() == 'charset' and value:
+            charset = value.strip('"\'')
+
+    try:
+        return body.decode(charset, errors='replace')
+    except LookupError:  # unknown charset
+        return body.decode('utf-8', errors='replace')
@@ -0,0 +1,205 @@
+from os.path import join, exists
+from os import makedirs, remove, replace
+from hashlib import sha256
+from datetime import datetime
+from scraping.page_backends import check_throttled, ThrottledError
+import threading
+import time
+import gzip
+import json
+
+
+class PageCache:
+    """
+    On-disk cache of webpages, keyed by URL. Each page is stored gzipped in its
+    own file, named after the hash of its URL, and an index file keeps the URL,
+    fetch time, time to live, size and last access time of every entry.
+    Expired entries are dropped when read, and the least recently used entries
+    are evicted whenever the total size of the cache exceeds its budget.
+    """
+    def __init__(self, directory, ttl=30 * 24 * 3600, max_bytes=512 * 2 ** 20,
+                 bypass=False, compresslevel=6):
+        """
+        :param directory: (str) directory where the cache is stored.
+        :param ttl: (int) default seconds after which an entry expires.
+        :param max_bytes: (int) maximum size of the cached (compressed) pages.
+        :param bypass: (boolean) if True, the cache is never read from (every
+            page is fetched again), but fetched pages are still stored.
+        :param compresslevel: (int) gzip compression level, from 1 to 9.
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.compresslevel = compresslevel
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._unsaved = 0  # pages stored since the index was last saved
+        self._index_path = join(directory, 'index.json')
+
+        makedirs(directory, exist_ok=True)
+        self._index = {}  # key -> entry dictionary
+        if exists(self._index_path):
+            with open(self._index_path, 'r', encoding="utf-8") as index_file:
+                self._index = json.load(index_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def key(url):
+        # name of the cache entry of a URL:
+        return sha256(url.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return join(self.directory, '{}.html.gz'.format(key))
+
+    def _drop(self, key):
+        # remove an entry from the index and from disk (lock already held):
+        self._index.pop(key, None)
+        if exists(self._path(key)):
+            remove(self._path(key))
+
+    def contains(self, url):
+        # whether "get" would return a cached page for the URL:
+        with self._lock:
+            entry = self._index.get(self.key(url))
+            return not self.bypass and entry is not None and \
+                time.time() - entry['fetched'] <= entry['ttl']
+
+    def get(self, url):
+        """
+        Obtain the cached HTML source of a webpage.
+        :param url: (str) URL of the webpage.
+        :return html: (str) cached HTML source, or None if the page is not
+            cached, has expired or the cache is bypassed.
+        """
+        key = self.key(url)
+        with self._lock:
+            entry = self._index.get(key)
+            if self.bypass or entry is None:
+                self.misses += 1
+                return None
+            if time.time() - entry['fetched'] > entry['ttl'] or \
+                    not exists(self._path(key)):
+                self._drop(key)
+                self.misses += 1
+                return None
+            entry['accessed'] = time.time()
+            self.hits += 1
+            # read while the lock is held, so that a "put" of another thread
+            # cannot evict the entry and remove its file in between:
+            with open(self._path(key), 'rb') as page_file:
+                data = page_file.read()
+
+        return gzip.decompress(data).decode('utf-8')
+
+    def put(self, url, html, ttl=None):
+        """
+        Store the HTML source of a webpage, evicting the least recently used
+        entries if the cache exceeds its size budget.
+        :param url: (str) URL of the webpage.
+        :param html: (str) HTML source of the webpage.
+        :param ttl: (int) seconds after which the entry expires. By default,
+            the cache TTL.
+        """
+        key = self.key(url)
+        data = gzip.compress(html.encode('utf-8'), self.compresslevel)
+        now = time.time()
+        with self._lock:
+            temporary_path = self._path(key) + '.tmp'
+            with open(temporary_path, 'wb') as page_file:
+                page_file.write(data)
+            replace(temporary_path, self._path(key))
+            self._index[key] = {'url': url,
+                                'fetched': now,
+                                'accessed': now,
+                                'ttl': self.ttl if ttl is None else ttl,
+                                'size': len(data)}
+            self._evict()
+            # the index is saved every few pages and when the cache is closed:
+            self._unsaved += 1
+            if self._unsaved >= 20:
+                self._save_index()
+
+    def _evict(self):
+        # drop least recently used entries until the size budget is met:
+        total_bytes = sum(entry['size'] for entry in self._index.values())
+        if total_bytes <= self.max_bytes:
+            return
+        by_last_access = sorted(self._index,
+                                key=lambda k: self._index[k]['accessed'])
+        for key in by_last_access:
+            total_bytes -= self._index[key]['size']
+            self._drop(key)
+            if total_bytes <= self.max_bytes:
+                break
+
+    def _save_index(self):
+        # write the index atomically, so a crash never leaves it corrupted:
+        temporary_path = self._index_path + '.tmp'
+        with open(temporary_path, 'w', encoding="utf-8") as index_file:
+            json.dump(self._index, index_file)
+        replace(temporary_path, self._index_path)
+        self._unsaved = 0
+
+    def close(self):
+        # save last access times and report the cache usage:
+        with self._lock:
+            self._save_index()
+        print('{}\tPage cache: {} hits, {} misses, {} entries'
+              .format(datetime.now(), self.hits, self.misses,
+                      len(self._index)))
+
+
+class CachedBackend:
+    """
+    Page backend that serves webpages from a PageCache, fetching them with
+    another backend only when they are not cached. Access-denied and captcha
+    pages are never cached.
+    """
+    def __init__(self, backend, cache):
+        """
+        :param backend: (HttpBackend or SeleniumBackend object) backend used to
+            fetch the pages missing in the cache.
+        :param cache: (PageCache object)
+        """
+        self.backend = backend
+        self.cache = cache
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def fetch(self, url):
+        """
+        Obtain the HTML source of a webpage from the cache or, if it is not
+        cached, from the wrapped backend, caching it.
+        :param url: (str) URL of the webpage.
+        :return html: (str) HTML source of the webpage.
+        """
+        html = self.cache.get(url)
+        if html is not None:
+            return html
+
+        html = self.backend.fetch(url)
+        try:
+            check_throttled(html)
+        except ThrottledError:
+            return html  # the parser will report it
+        self.cache.put(url, html)
+        return html
+
+    def is_cached(self, url):
+        # whether the page is served without a request to the website:
+        return self.cache.contains(url)
+
+    def close(self):
+        self.backend.close()
+        self.cache.close()
@@ -0,0 +1,176 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from datetime import datetime
+from urllib.parse import urlsplit
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter: tokens are refilled at "rate" tokens per second
+    up to "burst" tokens, and every request consumes one token. Thread-safe.
+    """
+    def __init__(self, rate, burst=1):
+        """
+        :param rate: (float) requests per second allowed in the long run.
+        :param burst: (int) maximum number of requests allowed at once.
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token and return the number of seconds the caller has to wait
+        before making its request.
+        :return delay: (float)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens +
+                               (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        # wait until a token is available:
+        time.sleep(self.reserve())
+
+
+class AdaptiveRateLimiter:
+    """
+    Rate limiter with one token bucket per host. The rate of a host is halved
+    every time a throttling signal is received from it (error page, captcha,
+    or several failures in a row), and it grows back step by step towards the
+    configured rate while requests succeed.
+    """
+    def __init__(self, rate, burst=1, min_rate=None, recovery_step=0.1,
+                 max_consecutive_failures=3):
+        """
+        :param rate: (float) maximum requests per second per host. If None,
+            requests are not limited.
+        :param burst: (int) maximum number of requests at once per host.
+        :param min_rate: (float) rate below which it is never reduced. By
+            default a tenth of "rate".
+        :param recovery_step: (float) fraction of "rate" recovered after every
+            successful request.
+        :param max_consecutive_failures: (int) failures in a row considered as
+            a throttling signal.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate if min_rate is not None or rate is None \
+            else rate / 10
+        self.recovery_step = recovery_step
+        self.max_consecutive_failures = max_consecutive_failures
+        self._buckets = {}  # host -> TokenBucket
+        self._failures = {}  # host -> consecutive failures
+        self._lock = threading.Lock()
+
+    def _bucket(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.burst)
+                self._failures[host] = 0
+            return host, self._buckets[host]
+
+    def host_rate(self, url):
+        # current requests per second allowed for the host of the URL:
+        if self.rate is None:
+            return None
+        return self._bucket(url)[1].rate
+
+    def reserve(self, url):
+        # take a token of the URL host and return the seconds to wait:
+        if self.rate is None:
+            return 0.
+        return self._bucket(url)[1].reserve()
+
+    def acquire(self, url):
+        # wait until a request to the URL host is allowed:
+        time.sleep(self.reserve(url))
+
+    def succeeded(self, url):
+        # a request succeeded: speed the host back up towards the max rate:
+        if self.rate is None:
+            return
+        host, bucket = self._bucket(url)
+        with self._lock:
+            self._failures[host] = 0
+            bucket.rate = min(self.rate,
+                              bucket.rate + self.rate * self.recovery_step)
+
+    def failed(self, url, throttled=False):
+        """
+        A request failed: slow the host down if the failure is a throttling
+        signal or if too many requests failed in a row.
+        :param url: (str) URL of the failed request.
+        :param throttled: (boolean) whether the server signalled throttling.
+        """
+        if self.rate is None:
+            return
+        host, bucket = self._bucket(url)
+        with self._lock:
+            self._failures[host] += 1
+            if throttled or \
+                    self._failures[host] >= self.max_consecutive_failures:
+                bucket.rate = max(self.min_rate, bucket.rate / 2)
+                self._failures[host] = 0
+                print('{}\tThrottling detected on {}, slowing down to {:.3f} '
+                      'requests/s'.format(datetime.now(), host, bucket.rate))
+
+
+class ThroughputMeter:
+    """
+    Live throughput of completed tasks, measured over the last "window"
+    seconds.
+    """
+    def __init__(self, window=60):
+        self.window = window
+        self.count = 0
+        self._start = time.monotonic()
+        self._times = deque()
+
+    def add(self):
+        now = time.monotonic()
+        self.count += 1
+        self._times.append(now)
+        while self._times and now - self._times[0] > self.window:
+            self._times.popleft()
+
+    def per_minute(self):
+        elapsed = min(self.window, max(1., time.monotonic() - self._start))
+        return 60. * len(self._times) / elapsed
+
+
+def run_concurrently(items, function, workers=1, describe=str):
+    """
+    Apply a function to every item using a pool of worker threads, printing
+    the live throughput as the tasks complete. If a task raises an error, the
+    pending tasks are cancelled and the error is raised.
+    :param items: iterable of items to process.
+    :param function: function taking an item as only argument.
+    :param workers: (int) number of items processed at the same time.
+    :param describe: function returning the text printed for a finished item.
+    """
+    meter = ThroughputMeter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(function, item): item for item in items}
+        try:
+            for future in as_completed(futures):
+                future.result()
+                meter.add()
+                print('{} ({} done, {:.1f}/min)'
+                      .format(describe(futures[future]), meter.count,
+                              meter.per_minute()))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
@@ -1,7 +1,8 @@
-from selenium import webdriver
 from datetime import datetime
-from selenium.webdriver.chrome.options import Options
 import re
+from scraping.driver_pool import driver_session
+from scraping.html_tree import parse_html
+from scraping.page_backends import check_throttled
 from common.songs_and_albums import Song, Album
 
 
@@ -48,45 +49,42 @@ def parse_album_text(album_text):
     return title, year, album_type
 
 
-def load_artist_discography(artist_lyrics_url, chromedriver_path,
-                            headless=True):
+# script run in the browser to extract the whole list of albums and songs of
+# a discography webpage in a single call, as [class, text, link] entries, or
+# null if the webpage has no list (e.g. a captcha page):
+DISCOGRAPHY_SCRIPT = """
+var listAlbum = document.querySelector("div#listAlbum");
+if (listAlbum === null) {
+    return null;
+}
+return Array.prototype.map.call(
+    listAlbum.querySelectorAll("div"),
+    function (el) {
+        var a = el.querySelector("a");
+        return [el.getAttribute("class"), el.innerText, a ? a.href : null];
+    });
+"""
+
+
+def parse_discography_entries(albums_and_songs_entries):
     """
-    Browse the artist's lyrics website, iterate over all albums and songs
-    and save the links to each song's lyrics webpage.
-    :param artist_lyrics_url: (str) link to the azlyrics artist webpage.
-    :param chromedriver_path: (str) path to the chromedriver executable.
-    :param headless: (boolean) if set as False the browser window will be shown,
-        otherwise, it will not.
+    Iterate over the entries of the list of albums and songs of an artist's
+    discography webpage and create the corresponding Album and Song objects.
+    :param albums_and_songs_entries: iterable of (class, text, link) tuples,
+        one per "div" element of the list, in order of appearance in the
+        webpage. The link is the URL of the first "a" element in the "div"
+        element, or None.
     :return parsed_songs: {str->Song object} dictionary in which the keys are
-        song titles and the values are the corresponding Song objects, with the
-        attributes 'title', 'track_number', 'album' and 'instrumental' set.
+        song titles and the values are the corresponding Song objects.
     :return parsed_albums: {str->Album object} dictionary in which the keys are
-        album titles and the values are the corresponding Album objects, with
-        the attributes 'title', 'year', 'number' and 'album_type' set.
+        album titles and the values are the corresponding Album objects.
     """
-    # Enter site:
-    options = Options()
-    if headless:
-        options.add_argument("--headless")  # to not see browser window
-    driver = webdriver.Chrome(chromedriver_path, options=options)
-    driver.get(artist_lyrics_url)
-    print('{}\tEntered \"{}\" site successfully'
-          .format(datetime.now(), driver.title))
-
-    # Reach list of all albums and songs from website:
-    albums_and_songs_parent = \
-        driver.find_element_by_xpath("//div[@id='listAlbum']")
-    albums_and_songs_list = \
-        albums_and_songs_parent.find_elements_by_tag_name('div')
-
-    # Iterate over list and save albums and songs information:
     parsed_albums, parsed_songs = {}, {}
     album_number = 1
 
-    for el in albums_and_songs_list:
+    for el_type, el_text, el_link in albums_and_songs_entries:
 
-        el_type = el.get_attribute("class")
-        el_text = el.text.rstrip()
+        el_text = el_text.rstrip()
 
         if el_type == 'album':  # album
             album_title, year, album_type = parse_album_text(el_text)
@@ -114,11 +112,80 @@ def load_artist_discography(artist_lyrics_url, chromedriver_path,
             song.instrumental = instrumental
 
             if not song.instrumental:
-                song.lyrics_url = \
-                    el.find_element_by_tag_name('a').get_attribute('href')
+                song.lyrics_url = el_link
             parsed_songs[song_key] = song
             current_track_number += 1
 
-    driver.close()
-
     return parsed_songs, parsed_albums
+
+
+def parse_discography_html(html, artist_lyrics_url):
+    """
+    Parse the HTML source of an artist's discography webpage in azlyrics.
+    :param html: (str) HTML source of the webpage.
+    :param artist_lyrics_url: (str) URL of the webpage, used to build the
+        absolute URLs of the songs' lyrics.
+    :return parsed_songs: {str->Song object} see "parse_discography_entries".
+    :return parsed_albums: {str->Album object} see "parse_discography_entries".
+    """
+    document = parse_html(html, base_url=artist_lyrics_url)
+    albums_and_songs_parent = document.find('div', id='listAlbum')
+    if albums_and_songs_parent is None:
+        check_throttled(html)
+        raise ValueError('No discography found in webpage {}'
+                         .format(artist_lyrics_url))
+
+    entries = []
+    for el in albums_and_songs_parent.find_all('div'):
+        a = el.find('a')
+        entries.append((el.get_attribute('class'), el.text,
+                        a.get_attribute('href') if a is not None else None))
+
+    return parse_discography_entries(entries)
+
+
+def load_artist_discography(artist_lyrics_url, chromedriver_path,
+                            headless=True, driver_pool=None, backend=None):
+    """
+    Browse the artist's lyrics website, iterate over all albums and songs
+    and save the links to each song's lyrics webpage.
+    The whole list of albums and songs is extracted from the browser in a
+    single call, and the Album and Song objects are built from it locally.
+    :param artist_lyrics_url: (str) link to the azlyrics artist webpage.
+    :param chromedriver_path: (str) path to the chromedriver executable.
+    :param headless: (boolean) if set as False the browser window will be shown,
+        otherwise, it will not.
+    :param driver_pool: (DriverPool object) pool to lease the browser session
+        from. If not provided, a temporary session is started and shut down.
+    :param backend: (HttpBackend or SeleniumBackend object) if provided, the
+        HTML source of the webpage is fetched with it and parsed in-process,
+        instead of being read in a browser session.
+    :return parsed_songs: {str->Song object} dictionary in which the keys are
+        song titles and the values are the corresponding Song objects, with the
+        attributes 'title', 'track_number', 'album' and 'instrumental' set.
+    :return parsed_albums: {str->Album object} dictionary in which the keys are
+        album titles and the values are the corresponding Album objects, with
+        the attributes 'title', 'year', 'number' and 'album_type' set.
+    """
+    if backend is not None:
+        html = backend.fetch(artist_lyrics_url)
+        print('{}\tLoaded discography webpage {}'
+              .format(datetime.now(), artist_lyrics_url))
+        return parse_discography_html(html, artist_lyrics_url)
+
+    # Enter site:
+    with driver_session(driver_pool, chromedriver_path,
+                        headless=headless) as driver:
+        driver.get(artist_lyrics_url)
+        print('{}\tEntered \"{}\" site successfully'
+              .format(datetime.now(), driver.title))
+
+        # Extract list of all albums and songs from website at once:
+        albums_and_songs_entries = driver.execute_script(DISCOGRAPHY_SCRIPT)
+        if albums_and_songs_entries is None:
+            check_throttled(driver.page_source)
+            raise ValueError('No discography found in webpage {}'
+                             .format(artist_lyrics_url))
+
+    # Iterate over list and save albums and songs information:
+    return parse_discography_entries(albums_and_songs_entries)
@@ -1,8 +1,10 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+from scraping.driver_pool import DriverPool, driver_session
+from scraping.html_tree import parse_html
+from scraping.page_backends import check_throttled, is_throttling_error
+from scraping.scheduler import AdaptiveRateLimiter, run_concurrently
+from scraping.songwriter_index import unify_songwriters_indexed
 import time
-from random import random
-from itertools import product
+from collections import namedtuple
 from copy import deepcopy
 
 
@@ -38,29 +40,6 @@ def parse_songwriters(text):
     return songwriters
 
 
-def clean_sw(sw):
-    """
-    Clean songwriter name: apply lowercase, replace '.' and '-' by spaces,
-    remove double spaces and spaces at the start and/or end of name.
-    :param sw: (str) songwriter name.
-    :return sw: (str) cleaned songwriter name.
-    """
-    sw = sw.lower()
-
-    sw = sw.replace('.', ' ').replace('-', ' ')
-
-    while '  ' in sw:
-        sw = sw.replace('  ', ' ')
-
-    if sw[0] == ' ':
-        sw = sw[1:]
-
-    if sw[-1] == ' ':
-        sw = sw[:-1]
-
-    return sw
-
-
 def unify_songwriters(raw_songwriters):
     """
     Given a list of full names ("raw_songwriters"), this function aims to
@@ -81,90 +60,16 @@ def unify_songwriters(raw_songwriters):
       same:
       e.g. "johnny lennon" / "lennon john"
       e.g. "j w lennon" / "john lennon"
+    The comparisons are done by "unify_songwriters_indexed", which only
+    compares each name with the names that may match it.
     :param raw_songwriters: ([str]) iterable containing names of songwriters.
     :return equivalences: {str->str} relates old songwriter names to discard
         to the songwriter name it should be replaced by.
     """
-    change_in_songwriters = True
-    equivalences = {}
-
-    while change_in_songwriters:
-
-        change_in_songwriters = False
-
-        # analyse all combinations of songwriters to compare with each other:
-        for sw_1, sw_2 in product(raw_songwriters, raw_songwriters):
-
-            # skip comparison of songwriter with itself:
-            if sw_1 == sw_2:
-                continue
-
-            # compare words in both songwriters in all lowercase, skipping
-            # stops ('.') and replacing dashes ('-') by spaces:
-            words_1 = clean_sw(sw_1).split(' ')
-            words_2 = clean_sw(sw_2).split(' ')
-
-            # for each word in words 1, check if it is contained in words 2
-            # and if it is, then discard word from words 1 and words 2 lists:
-            change_in_words = True
-            while change_in_words:
-                change_in_words = False
-                for w_1 in list(words_1):
-                    if w_1 in words_2:  # "john" <-> "john"
-                        # word 1 is contained in words 2 list: remove both from
-                        # their respect. lists and go back to beginning of loop:
-                        words_1.remove(w_1)
-                        words_2.remove(w_1)
-                        change_in_words = True
-                        break
-
-            # for each word in words 1, check if its initial characters are
-            # contained in words 2, and they are, then discard the word from
-            # words 1 list and the initials from words 2 list:
-            change_in_words = True
-            while change_in_words:
-                change_in_words = False
-                for w_1 in list(words_1):
-                    # check if initial sequence of word is contained in words 2:
-                    for i in range(len(w_1)):  # initial seq of any length
-                        if w_1[:i+1] in words_2:  # "john" <-> "johnny"
-                            # word 1 start is contained in word 2: remove both
-                            # from lists and go back to beginning of loop:
-                            words_1.remove(w_1)
-                            words_2.remove(w_1[:i+1])
-                            change_in_words = True
-                            break
-                    if change_in_words:
-                        break
-
-            # if now at least one words list is empty, then the conditions have
-            # been matched, and we consider that both songwriter names refer
-            # to the same person:
-            if not words_1 or not words_2:
-                # keep the shortest songwriter name:
-                if len(sw_1) < len(sw_2):
-                    equivalences[sw_2] = sw_1
-                    raw_songwriters.remove(sw_2)
-                else:
-                    equivalences[sw_1] = sw_2
-                    raw_songwriters.remove(sw_1)
-                # a songwriter has been discarded, back to beginning of loop:
-                change_in_songwriters = True
-                break
-
-    change = True
-    while change:
-        change = False
-        for sw, eq in equivalences.items():
-            if eq in equivalences:
-                equivalences[sw] = equivalences[eq]
-                change = True
-                break
-
-    return equivalences
-
-
-def unify_songs_songwriters(songs):
+    return unify_songwriters_indexed(raw_songwriters)
+
+
+def unify_songs_songwriters(songs, registry=None):
     """
     Given a set of songs with their songwriters attributes, this function
     iterates over all the songwriters of all the songs and creates a set of
@@ -176,6 +81,9 @@ def unify_songs_songwriters(songs):
     simplified set of songwriter names.
     :param songs: {str->Song object} dictionary in which the keys are song
         titles and the values are the corresponding Song objects.
+    :param registry: (SongwriterRegistry object) if provided, the songwriter
+        names are unified with its canonical names too, and the new names are
+        registered in it.
     """
     # Load all different songwriter strings in all songs:
     raw_songwriters = set()
@@ -185,7 +93,10 @@ def unify_songs_songwriters(songs):
 
     # find out repetitions of songwriters and obtain equivalences dictionary
     # to unify all names that refer to the same person:
-    equivalences = unify_songwriters(raw_songwriters)
+    if registry is None:
+        equivalences = unify_songwriters(raw_songwriters)
+    else:
+        equivalences = registry.unify(raw_songwriters)
     print('Raw songwriters: {}'.format(raw_songwriters))
     print('Songwriter equivalences found: {}'.format(equivalences))
 
@@ -201,8 +112,87 @@ def unify_songs_songwriters(songs):
             song.songwriters.add(eq_sw)
 
 
+# script run in the browser to extract all the elements under the main frame
+# of a lyrics webpage in a single call, as [tag name, text] entries (the text
+# is only needed for "div" elements):
+LYRICS_SCRIPT = """
+var mainFrame = document.evaluate(
+    "//div[@class='col-xs-12 col-lg-8 text-center']", document, null,
+    XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+if (mainFrame === null) {
+    return null;
+}
+return Array.prototype.map.call(
+    mainFrame.getElementsByTagName("*"),
+    function (el) {
+        var tagName = el.tagName.toLowerCase();
+        return [tagName, tagName === "div" ? el.innerText : ""];
+    });
+"""
+
+# element of a webpage extracted with a script, with the same "tag_name" and
+# "text" attributes as selenium WebElement objects:
+PageElement = namedtuple('PageElement', ['tag_name', 'text'])
+
+
+def parse_lyrics_elements(main_frame_elements):
+    """
+    Iterate over the elements of the main frame of an azlyrics lyrics webpage
+    and extract the lyrics and the songwriters from them. The lyrics are in
+    the first "div" element after two "br" elements, and the songwriters in a
+    later "div" element starting with 'Writer(s):'.
+    :param main_frame_elements: iterable of elements (PageElement, selenium
+        WebElement or HtmlNode objects) under the main frame, in order of
+        appearance.
+    :return lyrics: (str) lyrics of the song.
+    :return songwriters: set(str) each element of the set is a songwriter.
+    """
+    next_element_are_lyrics = False
+    prev_element_was_br = False
+    lyrics_found = False
+    lyrics = None
+    songwriters = set()
+
+    for el in main_frame_elements:
+
+        if lyrics_found:  # lyrics already found, here we look for writers
+            if el.tag_name == 'div' and el.text.startswith('Writer(s):'):
+                songwriters = parse_songwriters(el.text)
+            continue
+
+        if next_element_are_lyrics and el.tag_name == 'div':  # lyrics here
+            lyrics = el.text
+            lyrics_found = True
+
+        if el.tag_name == 'br':
+            if prev_element_was_br:  # element before lyrics located
+                next_element_are_lyrics = True
+            prev_element_was_br = True
+
+    if not lyrics_found:
+        raise ValueError('No lyrics found in webpage.')
+
+    return lyrics, songwriters
+
+
+def parse_lyrics_html(html):
+    """
+    Parse the HTML source of an azlyrics lyrics webpage.
+    :param html: (str) HTML source of the webpage.
+    :return lyrics: (str) lyrics of the song.
+    :return songwriters: set(str) each element of the set is a songwriter.
+    """
+    document = parse_html(html)
+    main_frame = document.find('div', class_='col-xs-12 col-lg-8 text-center')
+    if main_frame is None:
+        check_throttled(html)
+        raise ValueError('No main frame found in webpage.')
+    return parse_lyrics_elements(main_frame.iter_descendants())
+
+
 def scrape_lyrics_azlyrics(lyrics_url, chromedriver_path, headless=True,
-                           error_count=0):
+                           error_count=0, driver_pool=None, backend=None,
+                           rate_limiter=None):
     """
     Given a URL to the lyrics of a song in azlyrics, this function parses the
     lyrics from it and the songwriters if available, and returns both values.
@@ -213,49 +203,49 @@ def scrape_lyrics_azlyrics(lyrics_url, chromedriver_path, headless=True,
     :param error_count: (integer) starts at 0. If an error occurs, it is escaped
         and the scraping is retried (the function is recalled). The process is
         retried a maximum of 5 times, then the error is raised.
+    :param driver_pool: (DriverPool object) pool to lease the browser session
+        from. If not provided, a temporary session is started and shut down.
+        A session that fails is recycled, so retries use a fresh one.
+    :param backend: (HttpBackend or SeleniumBackend object) if provided, the
+        HTML source of the webpage is fetched with it and parsed in-process,
+        instead of walking the page elements in a browser session.
+    :param rate_limiter: (AdaptiveRateLimiter object) if provided, every
+        attempt waits for its turn in it, and reports its success or failure
+        to it.
     :return lyrics: (str) lyrics of the song.
     :return songwriters: set(str) each element of the set is a songwriter.
     """
+    cached = False  # known before any error that reaches the rate limiter
     try:
-        # initialise chromedriver and load song lyrics webpage:
-        options = Options()
-        if headless:
-            options.add_argument("--headless")  # to not see browser window
-        driver = webdriver.Chrome(chromedriver_path, options=options)
-        driver.get(lyrics_url)
-
-        # search for main frame of webpage:
-        main_frame = driver.find_element_by_xpath(
-            "//div[@class='col-xs-12 col-lg-8 text-center']")
-        main_frame_elements = main_frame.find_elements_by_xpath(".//*")
-
-        # search for lyrics element in main frame:
-        next_element_are_lyrics = False
-        prev_element_was_br = False
-        lyrics_found = False
-        songwriters = set()
-
-        for el in main_frame_elements:
-
-            if lyrics_found:  # lyrics already found, here we look for writers
-                if el.tag_name == 'div' and el.text.startswith('Writer(s):'):
-                    songwriters = parse_songwriters(el.text)
-                continue
-
-            if next_element_are_lyrics and el.tag_name == 'div':  # lyrics here
-                lyrics = el.text
-                lyrics_found = True
-
-            if el.tag_name == 'br':
-                if prev_element_was_br:  # element before lyrics located
-                    next_element_are_lyrics = True
-                prev_element_was_br = True
-
-        # close chromedriver:
-        driver.close()
+        # cached pages do not need to wait for their turn:
+        cached = backend is not None and backend.is_cached(lyrics_url)
+        if rate_limiter is not None and not cached:
+            rate_limiter.acquire(lyrics_url)
+
+        if backend is not None:
+            lyrics, songwriters = parse_lyrics_html(backend.fetch(lyrics_url))
+        else:
+            # lease chromedriver session and load song lyrics webpage:
+            with driver_session(driver_pool, chromedriver_path,
+                                headless=headless) as driver:
+                driver.get(lyrics_url)
+
+                # extract all the elements of the main frame of the webpage at
+                # once, and parse them:
+                entries = driver.execute_script(LYRICS_SCRIPT)
+                if entries is None:
+                    check_throttled(driver.page_source)
+                    raise ValueError('No main frame found in webpage.')
+                lyrics, songwriters = parse_lyrics_elements(
+                    [PageElement(*entry) for entry in entries])
+
+        if rate_limiter is not None and not cached:
+            rate_limiter.succeeded(lyrics_url)
 
     # escape errors and retry a maximum of 5 times:
     except BaseException as e:
+        if rate_limiter is not None and not cached:
+            rate_limiter.failed(lyrics_url, throttled=is_throttling_error(e))
         if error_count > 5:  # max number of errors reached: raise error
             print('Error when scraping song. Max errors escaped reached.')
             raise e
@@ -265,18 +255,37 @@ def scrape_lyrics_azlyrics(lyrics_url, chromedriver_path, headless=True,
         print('Retrying...')
         lyrics, songwriters = \
             scrape_lyrics_azlyrics(lyrics_url, chromedriver_path,
-                                   headless=headless, error_count=error_count+1)
+                                   headless=headless, error_count=error_count+1,
+                                   driver_pool=driver_pool, backend=backend,
+                                   rate_limiter=rate_limiter)
 
     return lyrics, songwriters
 
 
+def default_rate_limiter(wait_seconds=15):
+    """
+    Rate limiter of the lyrics requests used when none is provided: one
+    request every "wait_seconds / 2" seconds on average per host, like random
+    waits between 0 and "wait_seconds" did.
+    :param wait_seconds: (int) see "scrape_lyrics_songs_azlyrics".
+    :return rate_limiter: (AdaptiveRateLimiter object)
+    """
+    rate = 2. / wait_seconds if wait_seconds else None
+    return AdaptiveRateLimiter(rate)
+
+
 def scrape_lyrics_songs_azlyrics(songs, chromedriver_path, headless=True,
-                                 wait_seconds=15):
+                                 wait_seconds=15, driver_pool=None,
+                                 backend=None, workers=1, rate_limiter=None,
+                                 checkpoint=None, registry=None):
     """
     Iterate over a series of songs and launch "scrape_lyrics_azlyrics" function
     for each of them in order to find their lyrics and songwriters from their
     respective azlyrics websites. Add resulting lyrics and songwriters to the
     songs' attributes.
+    The songs are scraped by a number of concurrent workers, and the requests
+    to the website are spaced by a rate limiter that slows down when the
+    website throttles the requests and speeds back up when it stops.
     :param songs: {str->Song object} dictionary in which the keys are song
         titles and the values are the corresponding Song objects.
     :param chromedriver_path: (str) path to the chromedriver executable file.
@@ -284,27 +293,71 @@ def scrape_lyrics_songs_azlyrics(songs, chromedriver_path, headless=True,
         otherwise, it will not.
     :param wait_seconds: (int) number of max seconds to wait between consecutive
         lyrics searches in order to avoid being denied access to website. The
-        actual number of seconds waited between searches is a random number
-        between 0 and this value.
+        default rate limiter allows one request every "wait_seconds / 2"
+        seconds on average, like random waits between 0 and this value did.
+    :param driver_pool: (DriverPool object) pool to lease the browser sessions
+        from. If not provided, a pool with one session per worker is created
+        for this call and shut down when all songs have been scraped.
+    :param backend: (HttpBackend or SeleniumBackend object) if provided, the
+        lyrics webpages are fetched with it and parsed in-process.
+    :param workers: (int) number of songs scraped at the same time.
+    :param rate_limiter: (AdaptiveRateLimiter object) rate limiter to use
+        instead of the default one built from "wait_seconds".
+    :param checkpoint: (ScrapeCheckpoint object) if provided, the songs already
+        saved in it are not scraped again, and every newly scraped song is
+        saved to it.
+    :param registry: (SongwriterRegistry object) if provided, the songwriters
+        are unified with the canonical songwriter names of previous runs.
     """
-    for song in songs.values():
+    if driver_pool is None and backend is None:
+        with DriverPool(chromedriver_path, headless=headless,
+                        size=workers) as driver_pool:
+            scrape_lyrics_songs_azlyrics(songs, chromedriver_path,
+                                         headless=headless,
+                                         wait_seconds=wait_seconds,
+                                         driver_pool=driver_pool,
+                                         workers=workers,
+                                         rate_limiter=rate_limiter,
+                                         checkpoint=checkpoint,
+                                         registry=registry)
+        return
+
+    if rate_limiter is None:
+        rate_limiter = default_rate_limiter(wait_seconds)
+
+    # restore the songs scraped by a previous, interrupted run:
+    done_keys = set()
+    if checkpoint is not None:
+        done_keys = checkpoint.restore(songs)
+        if done_keys:
+            print('{} songs restored from checkpoint.'.format(len(done_keys)))
+
+    songs_to_scrape = []
+    for song_key, song in songs.items():
 
         # skip instrumental songs (no lyrics):
         if song.instrumental:
             song.lyrics = ''
             continue
 
-        # wait random time to avoid being denied access to website:
-        time.sleep(wait_seconds * random())
+        if song_key not in done_keys:
+            songs_to_scrape.append((song_key, song))
 
+    def scrape_song(key_and_song):
+        song_key, song = key_and_song
         # scrape lyrics and save them to 'lyrics' attribute of song object
         # if found, do the same with songwriters:
         song.lyrics, song.songwriters = \
             scrape_lyrics_azlyrics(song.lyrics_url, chromedriver_path,
-                                   headless=headless)
+                                   headless=headless, driver_pool=driver_pool,
+                                   backend=backend, rate_limiter=rate_limiter)
+        if checkpoint is not None:
+            checkpoint.record(song_key, song)
 
-        print('lyrics scraped for song: "{}"'.format(song.title))
+    run_concurrently(songs_to_scrape, scrape_song, workers=workers,
+                     describe=lambda key_and_song: 'lyrics scraped for song: '
+                     '"{}"'.format(key_and_song[1].title))
 
     # unify songwriters who may appear under different names
     # e.g. John Lennon / Lennon John W. / J W Lennon / ...
-    unify_songs_songwriters(songs)
+    unify_songs_songwriters(songs, registry=registry)
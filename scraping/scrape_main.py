@@ -2,15 +2,27 @@ from datetime import datetime
 from scraping.scrape_discography_azlyrics import load_artist_discography
 from scraping.scrape_lyrics_azlyrics import scrape_lyrics_songs_azlyrics
 from scraping.find_artist_url import find_artist_url
-from common.songs_and_albums import write_songs_json
+from scraping.driver_pool import DriverPool
+from scraping.page_backends import HttpBackend, SeleniumBackend
+from scraping.page_cache import PageCache, CachedBackend
+from scraping.scheduler import AdaptiveRateLimiter
+from scraping.checkpoint import ScrapeCheckpoint
+from scraping.songwriter_registry import SongwriterRegistry
+from common.corpus_db import write_songs
 import configparser
 from configparser import NoOptionError
-from os.path import join
+from os.path import join, exists
+from os import remove
 from common.common import string_for_path
 
 
 def lyrics_scraping_main(artist, chromedriver_path, output_path, headless=True,
-                         specific_songs=None):
+                         specific_songs=None, max_pages_per_session=50,
+                         page_backend='selenium', workers=1,
+                         requests_per_second=None, burst=1,
+                         checkpoint_path=None, cache_dir=None,
+                         cache_ttl_days=30, refresh_cache=False,
+                         registry_path=None):
     """
     Given the name of an artist, this function performs the following tasks:
     1) Calls "find_artist_url" function, which introduces the provided artist
@@ -25,24 +37,197 @@ def lyrics_scraping_main(artist, chromedriver_path, output_path, headless=True,
        to their corresponding Song object attribute.
     4) Calls "write_songs" function, which writes the obtained information of
        all songs to an output file.
+    Every scraped song is saved to a checkpoint file as soon as it is scraped.
+    If the process is interrupted, launching it again with the same arguments
+    resumes it from there. The checkpoint file is deleted at the end.
+    All the steps share the browser sessions of a single driver pool, which is
+    shut down when the process ends, whether it succeeds or fails.
     :param artist: (str) name of the artist
     :param chromedriver_path: (str) path to the chromedriver executable file.
     :param output_path: (str) path to which the output file will be created.
+        If it is a SQLite corpus file (e.g. '.db', see "CorpusDB"), the songs
+        are added to it instead.
     :param headless: (boolean) if set as False the browser window will be shown,
         otherwise, it will not.
     :param specific_songs: ([str]) if a list of song titles is provided, only
         the lyrics of the songs by the artist with titles contained in this
         list will be scraped.
+    :param max_pages_per_session: (int) number of pages after which a browser
+        session is recycled.
+    :param page_backend: (str) 'selenium' to read the discography and lyrics
+        webpages in browser sessions, or 'http' to fetch their HTML source
+        over plain HTTP and parse it in-process (much faster).
+    :param workers: (int) number of lyrics webpages scraped at the same time.
+    :param requests_per_second: (float) maximum rate of lyrics requests to the
+        website. If not provided, the default rate of
+        "scrape_lyrics_songs_azlyrics" is used.
+    :param burst: (int) maximum number of lyrics requests sent at once.
+    :param checkpoint_path: (str) path to the checkpoint file. By default, the
+        output path followed by '.checkpoint'.
+    :param cache_dir: (str) if provided, the search, discography and lyrics
+        webpages are cached in this directory, and read from it in later runs
+        instead of being fetched again.
+    :param cache_ttl_days: (float) days after which cached webpages expire.
+    :param refresh_cache: (boolean) if True, cached webpages are not read, but
+        fetched again (and cached again).
+    :param registry_path: (str) if provided, the songwriters are unified with
+        the canonical songwriter names registered in this file by previous
+        runs, and the new names are registered in it.
+    """
+    if checkpoint_path is None:
+        checkpoint_path = output_path + '.checkpoint'
+
+    rate_limiter = None
+    if requests_per_second is not None:
+        rate_limiter = AdaptiveRateLimiter(requests_per_second, burst=burst)
+
+    registry = None
+    if registry_path is not None:
+        registry = SongwriterRegistry(registry_path)
+
+    with DriverPool(chromedriver_path, headless=headless, size=workers,
+                    max_pages=max_pages_per_session) as driver_pool:
+        backend = open_page_backend(page_backend, driver_pool,
+                                    cache_dir=cache_dir,
+                                    cache_ttl_days=cache_ttl_days,
+                                    refresh_cache=refresh_cache)
+        try:
+            songs = scrape_artist_songs(artist, chromedriver_path, driver_pool,
+                                        headless=headless,
+                                        specific_songs=specific_songs,
+                                        backend=backend, workers=workers,
+                                        rate_limiter=rate_limiter,
+                                        checkpoint_path=checkpoint_path,
+                                        registry=registry)
+        finally:
+            if backend is not None:
+                backend.close()
+
+    if registry is not None:
+        registry.save()
+
+    # Write results in output file:
+    write_songs(songs, output_path)
+    print('{}\tAll lyrics written to output file.'.format(datetime.now()))
+
+    # The run is complete, the next one has to start from scratch:
+    if exists(checkpoint_path):
+        remove(checkpoint_path)
+
+
+def open_page_backend(page_backend, driver_pool, cache_dir=None,
+                      cache_ttl_days=30, refresh_cache=False):
+    """
+    Create the page backend used to read the azlyrics webpages.
+    :param page_backend: (str) 'selenium' or 'http', see "lyrics_scraping_main".
+    :param driver_pool: (DriverPool object) pool of browser sessions.
+    :param cache_dir: (str) if provided, webpages are cached in this directory.
+    :param cache_ttl_days: (float) days after which cached webpages expire.
+    :param refresh_cache: (boolean) if True, cached webpages are fetched again.
+    :return backend: (HttpBackend, SeleniumBackend or CachedBackend object) or
+        None if the webpages have to be read element by element in browser
+        sessions.
+    """
+    if page_backend == 'http':
+        backend = HttpBackend()
+    elif page_backend == 'selenium':
+        # the cache needs the HTML source of the pages:
+        backend = None if cache_dir is None else SeleniumBackend(driver_pool)
+    else:
+        raise ValueError('Unknown page backend: {}'.format(page_backend))
+
+    if cache_dir is not None:
+        cache = PageCache(cache_dir, ttl=cache_ttl_days * 24 * 3600,
+                          bypass=refresh_cache)
+        backend = CachedBackend(backend, cache)
+
+    return backend
+
+
+def scrape_artist_songs(artist, chromedriver_path, driver_pool, headless=True,
+                        specific_songs=None, backend=None, workers=1,
+                        rate_limiter=None, checkpoint_path=None,
+                        registry=None):
+    """
+    Find the artist, load its discography and scrape the lyrics of its songs
+    (steps 1 to 3 of "lyrics_scraping_main") using the sessions of the given
+    driver pool.
+    :param artist: (str) name of the artist
+    :param chromedriver_path: (str) path to the chromedriver executable file.
+    :param driver_pool: (DriverPool object) pool to lease browser sessions from.
+    :param headless: (boolean) if set as False the browser window will be shown,
+        otherwise, it will not.
+    :param specific_songs: ([str]) if a list of song titles is provided, only
+        the lyrics of the songs by the artist with titles contained in this
+        list will be scraped.
+    :param backend: (HttpBackend or SeleniumBackend object) if provided, the
+        discography and lyrics webpages are fetched with it and parsed
+        in-process.
+    :param workers: (int) number of lyrics webpages scraped at the same time.
+    :param rate_limiter: (AdaptiveRateLimiter object) rate limiter of the
+        lyrics requests. If not provided, the default one is used.
+    :param checkpoint_path: (str) path to the checkpoint file from which the
+        songs already scraped are restored and to which the new ones are
+        saved. If not provided, no checkpoint is used.
+    :param registry: (SongwriterRegistry object) if provided, the songwriters
+        are unified with its canonical songwriter names.
+    :return songs: {str->Song object} dictionary in which the keys are song
+        titles and the values are the corresponding Song objects.
+    """
+    artist, artist_discography_url, songs = \
+        load_artist_songs(artist, chromedriver_path, driver_pool,
+                          headless=headless, specific_songs=specific_songs,
+                          backend=backend)
+
+    checkpoint = None
+    if checkpoint_path is not None:
+        checkpoint = ScrapeCheckpoint(checkpoint_path, artist,
+                                      artist_discography_url)
+
+    # Iterate over songs and access their lyrics URLs to scrape their lyrics:
+    scrape_lyrics_songs_azlyrics(songs, chromedriver_path, headless=headless,
+                                 driver_pool=driver_pool, backend=backend,
+                                 workers=workers, rate_limiter=rate_limiter,
+                                 checkpoint=checkpoint,
+                                 registry=registry)
+    print('{}\tLyrics scraping finished successfully.'.format(datetime.now()))
+
+    return songs
+
+
+def load_artist_songs(artist, chromedriver_path, driver_pool, headless=True,
+                      specific_songs=None, backend=None):
+    """
+    Find the artist and load its discography (steps 1 and 2 of
+    "lyrics_scraping_main"), without scraping any lyrics.
+    :param artist: (str) name of the artist
+    :param chromedriver_path: (str) path to the chromedriver executable file.
+    :param driver_pool: (DriverPool object) pool to lease browser sessions from.
+    :param headless: (boolean) if set as False the browser window will be shown,
+        otherwise, it will not.
+    :param specific_songs: ([str]) if a list of song titles is provided, only
+        the songs by the artist with titles contained in this list are kept.
+    :param backend: (HttpBackend or SeleniumBackend object) if provided, the
+        search and discography webpages are fetched with it and parsed
+        in-process.
+    :return artist: (str) name of the artist found.
+    :return artist_discography_url: (str) URL to the artist discography.
+    :return songs: {str->Song object} dictionary in which the keys are song
+        titles and the values are the corresponding Song objects.
     """
     # Load the artist's discography azlyrics webpage
     artist, artist_discography_url = find_artist_url(artist, chromedriver_path,
-                                                     headless=headless)
+                                                     headless=headless,
+                                                     driver_pool=driver_pool,
+                                                     backend=backend)
 
     # Load all the songs and albums, and the URLs to the song lyrics,
     # from artist webpage in azlyrics:
     songs, albums = load_artist_discography(artist_discography_url,
                                             chromedriver_path,
-                                            headless=headless)
+                                            headless=headless,
+                                            driver_pool=driver_pool,
+                                            backend=backend)
     print('{}\tFound {} albums and {} songs.'
           .format(datetime.now(), len(albums), len(songs)))
 
@@ -56,13 +241,7 @@ def lyrics_scraping_main(artist, chromedriver_path, output_path, headless=True,
         songs = \
             {k: v for k, v in songs.items() if k.lower() in low_specific_songs}
 
-    # Iterate over songs and access their lyrics URLs to scrape their lyrics:
-    scrape_lyrics_songs_azlyrics(songs, chromedriver_path, headless=headless)
-    print('{}\tLyrics scraping finished successfully.'.format(datetime.now()))
-
-    # Write results in output file:
-    write_songs_json(songs, output_path)
-    print('{}\tAll lyrics written to output file.'.format(datetime.now()))
+    return artist, artist_discography_url, songs
 
 
 if __name__ == '__main__':
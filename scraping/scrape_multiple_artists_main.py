@@ -1,10 +1,17 @@
-from scraping.scrape_main import lyrics_scraping_main
-from common.common import string_for_path
+from scraping.scrape_main import scrape_artist_songs, open_page_backend
+from scraping.driver_pool import DriverPool
+from scraping.scheduler import AdaptiveRateLimiter
+from scraping.scrape_lyrics_azlyrics import default_rate_limiter
+from scraping.songwriter_registry import SongwriterRegistry
+from common.corpus_db import write_songs_append, is_corpus_db
+from datetime import datetime
 
 
 def concatenate_files(input_paths, output_path):
     """
     Reads a list of files and concatenates their lines to an output file.
+    Duplicated songs are kept; see "merge_corpus" to merge the song files of
+    many artists without duplicates.
     :param input_paths: ([str]) list of paths to input files.
     :param output_path: (str) path to output concatenated file.
     """
@@ -21,23 +28,112 @@ def concatenate_files(input_paths, output_path):
                 first_header = False
 
 
+def group_songs_by_artist(artist_songs):
+    """
+    Group a list of (artist, song title) pairs by artist, ignoring case and
+    surrounding spaces in the artist names, and keeping the order in which the
+    artists first appear.
+    :param artist_songs: ([(str, str)]) list of (artist, song title) pairs.
+    :return artist_to_songs: {str->[str]} relates each artist (as first
+        written) to the titles of its songs.
+    """
+    artist_to_songs, names = {}, {}
+    for artist, song in artist_songs:
+        artist_id = artist.strip().lower()
+        if artist_id not in names:
+            names[artist_id] = artist.strip()
+            artist_to_songs[names[artist_id]] = []
+        artist_to_songs[names[artist_id]].append(song)
+    return artist_to_songs
+
+
+def scrape_multiple_artists_main(artist_songs, chromedriver_path, output_path,
+                                 headless=True, page_backend='selenium',
+                                 workers=1, cache_dir=None,
+                                 registry_path=None, requests_per_second=None,
+                                 burst=1):
+    """
+    Scrape the lyrics of a list of songs by different artists and write them
+    all to a single JSON output file, or add them to a SQLite corpus file
+    (see "CorpusDB").
+    The songs are grouped by artist, so that each artist is searched and its
+    discography is loaded only once, no matter how many of its songs are
+    requested. The songs of each artist are appended to the output file as
+    soon as they are scraped.
+    If the songs of an artist cannot be scraped, the error is printed and the
+    process goes on with the next artist.
+    :param artist_songs: ([(str, str)]) list of (artist, song title) pairs.
+    :param chromedriver_path: (str) path to the chromedriver executable file.
+    :param output_path: (str) path to which the output file will be created.
+    :param headless: (boolean) if set as False the browser window will be shown,
+        otherwise, it will not.
+    :param page_backend: (str) 'selenium' or 'http', see "lyrics_scraping_main".
+    :param workers: (int) number of lyrics webpages scraped at the same time.
+    :param cache_dir: (str) if provided, webpages are cached in this directory.
+    :param registry_path: (str) if provided, the songwriters of all artists
+        are unified with the canonical songwriter names registered in this
+        file, and the new names are registered in it.
+    :param requests_per_second: (float) maximum rate of lyrics requests to the
+        website, see "lyrics_scraping_main". A single rate limiter is shared
+        by all the artists, so the throttling learned from the website while
+        scraping an artist is kept for the next ones.
+    :param burst: (int) maximum number of lyrics requests sent at once.
+    """
+    artist_to_songs = group_songs_by_artist(artist_songs)
+    print('{}\t{} songs by {} artists to scrape.'
+          .format(datetime.now(), len(artist_songs), len(artist_to_songs)))
+
+    if not is_corpus_db(output_path):
+        with open(output_path, 'w', encoding="utf-8"):
+            pass
+
+    registry = None
+    if registry_path is not None:
+        registry = SongwriterRegistry(registry_path)
+
+    if requests_per_second is not None:
+        rate_limiter = AdaptiveRateLimiter(requests_per_second, burst=burst)
+    else:
+        rate_limiter = default_rate_limiter()
+
+    with DriverPool(chromedriver_path, headless=headless,
+                    size=workers) as driver_pool:
+        backend = open_page_backend(page_backend, driver_pool,
+                                    cache_dir=cache_dir)
+        try:
+            for artist, titles in artist_to_songs.items():
+                try:
+                    songs = scrape_artist_songs(artist, chromedriver_path,
+                                                driver_pool, headless=headless,
+                                                specific_songs=titles,
+                                                backend=backend,
+                                                workers=workers,
+                                                rate_limiter=rate_limiter,
+                                                registry=registry)
+                except BaseException as e:
+                    print(artist, '-', titles, e)
+                    continue
+
+                # report requested songs missing in the discography:
+                found_titles = set([k.lower() for k in songs])
+                for title in titles:
+                    if title.lower() not in found_titles:
+                        print(artist, '-', title, 'not found in discography')
+
+                write_songs_append(songs, output_path)
+        finally:
+            if backend is not None:
+                backend.close()
+            if registry is not None:
+                registry.save()
+
+    print('{}\tAll lyrics written to output file.'.format(datetime.now()))
+
+
 if __name__ == '__main__':
     ch_path = r'C:\Users\pablo\PycharmProjects\chromedriver.exe'
-    output_path = r"C:\Users\pablo\ProjectsData\Lyrics\Various\concat.csv"
+    output_path = r"C:\Users\pablo\ProjectsData\Lyrics\Various\concat.json"
     songs_path = r""
     songs = [line.rstrip().split('|') for line in open(songs_path)]
 
-    out_paths = []
-
-    for artist, song in songs:
-        out_path = \
-            r"C:\Users\pablo\ProjectsData\Lyrics\Various\{}_{}_lyrics.csv"\
-            .format(string_for_path(artist), string_for_path(song))
-        try:
-            lyrics_scraping_main(artist, ch_path, out_path, headless=True,
-                                 specific_songs=[song])
-            out_paths.append(out_path)
-        except BaseException as e:
-            print(artist, '-', song, e)
-
-    concatenate_files(out_paths, output_path)
+    scrape_multiple_artists_main(songs, ch_path, output_path, headless=True)
@@ -0,0 +1,269 @@
+from scraping.scrape_main import load_artist_songs, open_page_backend
+from scraping.scrape_lyrics_azlyrics import parse_lyrics_html, \
+    unify_songs_songwriters
+from scraping.driver_pool import DriverPool
+from scraping.page_backends import SeleniumBackend, check_throttled, \
+    is_throttling_error
+from scraping.scheduler import AdaptiveRateLimiter, ThroughputMeter
+from scraping.checkpoint import ScrapeCheckpoint
+from scraping.songwriter_registry import SongwriterRegistry
+from common.corpus_db import write_songs
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from os.path import exists
+from os import remove
+import asyncio
+
+
+# number of times the scraping of a song is retried before failing:
+MAX_RETRIES = 5
+
+
+def lyrics_scraping_pipeline_main(artist, chromedriver_path, output_path,
+                                  headless=True, specific_songs=None,
+                                  page_backend='http', fetchers=4, parsers=2,
+                                  queue_size=16, wait_seconds=15,
+                                  requests_per_second=None, burst=1,
+                                  checkpoint_path=None, cache_dir=None,
+                                  cache_ttl_days=30, refresh_cache=False,
+                                  registry_path=None):
+    """
+    Same as "lyrics_scraping_main", but the lyrics webpages are scraped by an
+    asyncio pipeline in which the three stages of the scraping of a song run
+    at the same time for different songs:
+    1) fetch: "fetchers" tasks download the lyrics webpages (in threads),
+       spaced by the rate limiter.
+    2) parse: "parsers" tasks extract the lyrics and songwriters of the
+       downloaded webpages, in a pool of processes so that parsing never
+       blocks the event loop nor the downloads.
+    3) write: a single task saves every scraped song to the checkpoint file as
+       soon as it is parsed.
+    The stages are connected by queues of at most "queue_size" songs, so a
+    slow stage holds back the previous ones instead of letting pages pile up
+    in memory. Once all the songs are scraped, their songwriters are unified
+    and they are written to the output file (or SQLite corpus file) with
+    "write_songs", as in "lyrics_scraping_main".
+    :param artist: (str) name of the artist
+    :param chromedriver_path: (str) path to the chromedriver executable file.
+    :param output_path: (str) path to which the output file will be created,
+        or SQLite corpus file to which the songs will be added.
+    :param headless: (boolean) if set as False the browser window will be shown,
+        otherwise, it will not.
+    :param specific_songs: ([str]) if a list of song titles is provided, only
+        the lyrics of the songs by the artist with titles contained in this
+        list will be scraped.
+    :param page_backend: (str) 'http' or 'selenium', see
+        "lyrics_scraping_main". With 'selenium', only the HTML source of the
+        webpages is read from the browser sessions.
+    :param fetchers: (int) number of webpages downloaded at the same time.
+    :param parsers: (int) number of webpages parsed at the same time.
+    :param queue_size: (int) maximum number of songs waiting between two
+        stages of the pipeline.
+    :param wait_seconds: (int) see "scrape_lyrics_songs_azlyrics", used if
+        "requests_per_second" is not provided.
+    :param requests_per_second: (float) maximum rate of lyrics requests to the
+        website.
+    :param burst: (int) maximum number of lyrics requests sent at once.
+    :param checkpoint_path: (str) path to the checkpoint file. By default, the
+        output path followed by '.checkpoint'.
+    :param cache_dir: (str) if provided, webpages are cached in this directory.
+    :param cache_ttl_days: (float) days after which cached webpages expire.
+    :param refresh_cache: (boolean) if True, cached webpages are fetched again.
+    :param registry_path: (str) if provided, the songwriters are unified with
+        the canonical songwriter names registered in this file.
+    """
+    if checkpoint_path is None:
+        checkpoint_path = output_path + '.checkpoint'
+
+    if requests_per_second is None:
+        requests_per_second = 2. / wait_seconds if wait_seconds else None
+    rate_limiter = AdaptiveRateLimiter(requests_per_second, burst=burst)
+
+    registry = None
+    if registry_path is not None:
+        registry = SongwriterRegistry(registry_path)
+
+    with DriverPool(chromedriver_path, headless=headless,
+                    size=fetchers) as driver_pool:
+        backend = open_page_backend(page_backend, driver_pool,
+                                    cache_dir=cache_dir,
+                                    cache_ttl_days=cache_ttl_days,
+                                    refresh_cache=refresh_cache)
+        if backend is None:
+            # the pipeline parses the HTML source of the webpages:
+            backend = SeleniumBackend(driver_pool)
+        try:
+            artist, artist_discography_url, songs = \
+                load_artist_songs(artist, chromedriver_path, driver_pool,
+                                  headless=headless,
+                                  specific_songs=specific_songs,
+                                  backend=backend)
+            checkpoint = ScrapeCheckpoint(checkpoint_path, artist,
+                                          artist_discography_url)
+            asyncio.run(scrape_lyrics_pipeline(songs, backend, rate_limiter,
+                                               checkpoint, fetchers=fetchers,
+                                               parsers=parsers,
+                                               queue_size=queue_size))
+        finally:
+            backend.close()
+    print('{}\tLyrics scraping finished successfully.'.format(datetime.now()))
+
+    # unify songwriters who may appear under different names:
+    unify_songs_songwriters(songs, registry=registry)
+    if registry is not None:
+        registry.save()
+
+    # Write results in output file:
+    write_songs(songs, output_path)
+    print('{}\tAll lyrics written to output file.'.format(datetime.now()))
+
+    # The run is complete, the next one has to start from scratch:
+    if exists(checkpoint_path):
+        remove(checkpoint_path)
+
+
+async def scrape_lyrics_pipeline(songs, backend, rate_limiter, checkpoint,
+                                 fetchers=4, parsers=2, queue_size=16):
+    """
+    Scrape the lyrics and songwriters of a series of songs with a pipeline of
+    fetch, parse and write tasks (see "lyrics_scraping_pipeline_main"),
+    setting the lyrics and songwriters attributes of the songs.
+    Every attempt waits for its turn in the rate limiter (except for cached
+    webpages), and a song that fails is retried up to MAX_RETRIES times,
+    waiting longer after each error, like "scrape_lyrics_azlyrics" does. If a
+    song still fails, all the tasks are cancelled and the error is raised.
+    :param songs: {str->Song object} dictionary in which the keys are song
+        titles and the values are the corresponding Song objects.
+    :param backend: (HttpBackend, SeleniumBackend or CachedBackend object)
+        backend used to fetch the HTML source of the lyrics webpages.
+    :param rate_limiter: (AdaptiveRateLimiter object)
+    :param checkpoint: (ScrapeCheckpoint object) the songs already saved in it
+        are not scraped again, and every newly scraped song is saved to it.
+    :param fetchers: (int) number of webpages downloaded at the same time.
+    :param parsers: (int) number of webpages parsed at the same time.
+    :param queue_size: (int) maximum number of songs waiting between stages.
+    """
+    loop = asyncio.get_running_loop()
+
+    # restore the songs scraped by a previous, interrupted run:
+    done_keys = checkpoint.restore(songs)
+    if done_keys:
+        print('{} songs restored from checkpoint.'.format(len(done_keys)))
+
+    songs_to_scrape = []
+    for song_key, song in songs.items():
+        # skip instrumental songs (no lyrics):
+        if song.instrumental:
+            song.lyrics = ''
+        elif song_key not in done_keys:
+            songs_to_scrape.append((song_key, song))
+
+    fetch_queue = asyncio.Queue(queue_size)
+    parse_queue = asyncio.Queue(queue_size)
+    write_queue = asyncio.Queue(queue_size)
+    meter = ThroughputMeter()
+
+    async def fetch(url, cached):
+        # download a webpage once its turn in the rate limiter comes (cached
+        # webpages do not need to wait for their turn):
+        if not cached:
+            await asyncio.sleep(rate_limiter.reserve(url))
+        return await loop.run_in_executor(fetch_executor, backend.fetch, url)
+
+    async def failed(url, cached, error, attempt):
+        # report a failed attempt and wait before the next one, or raise the
+        # error if no attempts are left:
+        if not cached:
+            rate_limiter.failed(url, throttled=is_throttling_error(error))
+        if attempt >= MAX_RETRIES:
+            print('Error when scraping song. Max errors escaped reached.')
+            raise error
+        print('Error when scraping song at URL {}:'.format(url), error)
+        print('Retrying...')
+        await asyncio.sleep(10 * attempt)
+
+    async def fetch_stage():
+        while True:
+            item = await fetch_queue.get()
+            if item is None:
+                return
+            song_key, song = item
+            attempt = 0
+            while True:
+                cached = backend.is_cached(song.lyrics_url)
+                try:
+                    html = await fetch(song.lyrics_url, cached)
+                    check_throttled(html)
+                    break
+                except Exception as e:
+                    await failed(song.lyrics_url, cached, e, attempt)
+                    attempt += 1
+            await parse_queue.put((song_key, song, html, cached, attempt))
+
+    async def parse_stage():
+        while True:
+            item = await parse_queue.get()
+            if item is None:
+                return
+            song_key, song, html, cached, attempt = item
+            while True:
+                try:
+                    if html is None:  # retry: download the webpage again
+                        cached = backend.is_cached(song.lyrics_url)
+                        html = await fetch(song.lyrics_url, cached)
+                    song.lyrics, song.songwriters = await loop.run_in_executor(
+                        parse_executor, parse_lyrics_html, html)
+                    break
+                except Exception as e:
+                    await failed(song.lyrics_url, cached, e, attempt)
+                    attempt += 1
+                    html = None
+            if not cached:
+                rate_limiter.succeeded(song.lyrics_url)
+            await write_queue.put((song_key, song))
+
+    async def write_stage():
+        while True:
+            item = await write_queue.get()
+            if item is None:
+                return
+            song_key, song = item
+            await loop.run_in_executor(
+                write_executor, partial(checkpoint.record, song_key, song))
+            meter.add()
+            print('lyrics scraped for song: "{}" ({} done, {:.1f}/min)'
+                  .format(song.title, meter.count, meter.per_minute()))
+
+    async def feed_stage():
+        for item in songs_to_scrape:
+            await fetch_queue.put(item)
+
+    async def run_stage(stage, workers, next_queue, next_workers):
+        # run the workers of a stage, then tell the next stage to finish:
+        await asyncio.gather(*[stage() for _ in range(workers)])
+        for _ in range(next_workers):
+            await next_queue.put(None)
+
+    with ThreadPoolExecutor(max_workers=fetchers) as fetch_executor, \
+            ProcessPoolExecutor(max_workers=parsers) as parse_executor, \
+            ThreadPoolExecutor(max_workers=1) as write_executor:
+        tasks = [asyncio.ensure_future(task) for task in (
+            run_stage(feed_stage, 1, fetch_queue, fetchers),
+            run_stage(fetch_stage, fetchers, parse_queue, parsers),
+            run_stage(parse_stage, parsers, write_queue, 1),
+            write_stage())]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+
+if __name__ == '__main__':
+    chromedriver_path = r'C:\Users\pablo\PycharmProjects\chromedriver.exe'
+    output_path = r"C:\Users\pablo\ProjectsData\Lyrics\Bowie\Bowie_lyrics.json"
+
+    lyrics_scraping_pipeline_main('David Bowie', chromedriver_path,
+                                  output_path, fetchers=4, parsers=2)
@@ -0,0 +1,236 @@
+import heapq
+
+
+def clean_sw(sw):
+    """
+    Clean songwriter name: apply lowercase, replace '.' and '-' by spaces,
+    remove double spaces and spaces at the start and/or end of name.
+    :param sw: (str) songwriter name.
+    :return sw: (str) cleaned songwriter name.
+    """
+    sw = sw.lower()
+
+    sw = sw.replace('.', ' ').replace('-', ' ')
+
+    while '  ' in sw:
+        sw = sw.replace('  ', ' ')
+
+    if sw[0] == ' ':
+        sw = sw[1:]
+
+    if sw[-1] == ' ':
+        sw = sw[:-1]
+
+    return sw
+
+
+def songwriter_words(sw):
+    """
+    Split a songwriter name in the words compared by "songwriters_match".
+    :param sw: (str) songwriter name.
+    :return words: ([str]) words of the cleaned songwriter name.
+    """
+    return clean_sw(sw).split(' ')
+
+
+def songwriters_match(words_1, words_2):
+    """
+    Whether the words of a songwriter name ("words_1") match the words of
+    another one ("words_2"), following the rules described in
+    "unify_songwriters":
+    - first, the words contained in both lists are discarded from both.
+    - then, the words in words 1 whose initial characters are a word in words
+      2 are discarded, together with that word in words 2 ("john" <-> "j").
+    The names match if one of the lists ends up empty.
+    Note that the rules are not symmetrical: matching words 2 with words 1
+    may give a different result.
+    :param words_1: ([str]) see "songwriter_words".
+    :param words_2: ([str]) see "songwriter_words".
+    :return match: (boolean)
+    """
+    words_1, words_2 = list(words_1), list(words_2)
+
+    # discard the words contained in both lists:
+    for w_1 in list(words_1):
+        if w_1 in words_2:  # "john" <-> "john"
+            words_1.remove(w_1)
+            words_2.remove(w_1)
+
+    # discard the words in words 1 that start by a word in words 2, checking
+    # each time the words 1 from the beginning, and the initial sequences from
+    # the shortest:
+    change_in_words = True
+    while change_in_words:
+        change_in_words = False
+        for w_1 in words_1:
+            for i in range(len(w_1)):  # initial seq of any length
+                if w_1[:i+1] in words_2:  # "john" <-> "johnny"
+                    words_1.remove(w_1)
+                    words_2.remove(w_1[:i+1])
+                    change_in_words = True
+                    break
+            if change_in_words:
+                break
+
+    return not words_1 or not words_2
+
+
+def _prefixes(word):
+    # all the initial sequences of a word, from the shortest to the word:
+    return [word[:i+1] for i in range(len(word))]
+
+
+class SongwriterIndex:
+    """
+    Inverted index of songwriter names, used to find the names that may match
+    a given one without comparing it to every name.
+    Two names can only match (see "songwriters_match") if either every word of
+    the first one starts by a word of the second one, or every word of the
+    second one is the beginning of a word of the first one. Names are indexed
+    by each of their words for the first case, and by a single, rare word of
+    theirs for the second one, so candidates are found by looking up the
+    initial sequences of the words of the given name, and intersecting the
+    results.
+    """
+    def __init__(self, names=()):
+        """
+        :param names: iterable(str) songwriter names to index.
+        """
+        self.words = {}  # name -> words of the name
+        self._names_by_word = {}  # word -> names containing the word
+        self._names_by_key = {}  # word -> names using it as key word
+
+        # index all words first, so that the key word of each name is chosen
+        # knowing the frequency of every word:
+        names = list(names)
+        for name in names:
+            self._add_words(name, songwriter_words(name))
+        for name in names:
+            self._add_key(name)
+
+    def __contains__(self, name):
+        return name in self.words
+
+    def __len__(self):
+        return len(self.words)
+
+    def _add_words(self, name, words):
+        self.words[name] = words
+        for word in set(words):
+            self._names_by_word.setdefault(word, set()).add(name)
+
+    def _add_key(self, name):
+        # the rarest word of the name is used as its key word:
+        key = min(set(self.words[name]),
+                  key=lambda word: len(self._names_by_word[word]))
+        self._names_by_key.setdefault(key, set()).add(name)
+
+    def add(self, name, words=None):
+        """
+        Add a songwriter name to the index.
+        :param name: (str) songwriter name.
+        :param words: ([str]) words of the name, if already computed.
+        """
+        if name in self.words:
+            return
+        self._add_words(name, songwriter_words(name) if words is None
+                        else words)
+        self._add_key(name)
+
+    def candidates(self, words):
+        """
+        Indexed names that may match a songwriter name with the given words,
+        in any direction.
+        :param words: ([str]) see "songwriter_words".
+        :return candidates: set(str) candidate songwriter names.
+        """
+        candidates = set()
+
+        # names with a word at the beginning of every given word: the
+        # intersection, for all given words, of the names containing one of
+        # their initial sequences:
+        covering = None
+        for word in set(words):
+            word_covering = set().union(*[self._names_by_word.get(prefix, ())
+                                          for prefix in _prefixes(word)])
+            covering = word_covering if covering is None \
+                else covering & word_covering
+            if not covering:
+                break
+        candidates.update(covering or ())
+
+        # names whose words are all beginnings of the given words. Their key
+        # word has to be one of these beginnings:
+        prefixes = set()
+        for word in words:
+            prefixes.update(_prefixes(word))
+        for prefix in prefixes:
+            candidates.update(self._names_by_key.get(prefix, ()))
+
+        return candidates
+
+
+def resolve_equivalences(equivalences):
+    """
+    Replace, in place, the songwriter names in the values of an equivalences
+    dictionary that have an equivalence themselves by their final equivalent
+    name (union-find "find" with path compression).
+    :param equivalences: {str->str} relates songwriter names to the name they
+        should be replaced by.
+    """
+    for sw in equivalences:
+        root = equivalences[sw]
+        while root in equivalences and equivalences[root] != root:
+            root = equivalences[root]
+        # path compression:
+        node = sw
+        while equivalences[node] != root:
+            equivalences[node], node = root, equivalences[node]
+
+
+def unify_songwriters_indexed(raw_songwriters):
+    """
+    Same as "unify_songwriters" (same rules and same resulting equivalences),
+    but each name is cleaned and split only once, and it is only compared with
+    the candidate names found in a SongwriterIndex, instead of with every
+    other name again after every merge.
+    The merges of the original algorithm are reproduced exactly: it always
+    merges the first matching pair (in iteration order of the names) among the
+    names not discarded yet, discarding the longest name. So all the matching
+    pairs are found once, and then they are merged in that order, skipping the
+    pairs with an already discarded name.
+    :param raw_songwriters: set(str) or [str] unique songwriter names. The
+        discarded names are removed from it.
+    :return equivalences: {str->str} relates old songwriter names to discard
+        to the songwriter name it should be replaced by.
+    """
+    order = list(raw_songwriters)
+    position = {sw: i for i, sw in enumerate(order)}
+    index = SongwriterIndex(order)
+
+    # find all directed matching pairs, sorted by position in the order:
+    pairs = []
+    for sw_1 in order:
+        words_1 = index.words[sw_1]
+        for sw_2 in index.candidates(words_1):
+            if sw_2 != sw_1 and songwriters_match(words_1, index.words[sw_2]):
+                pairs.append((position[sw_1], position[sw_2]))
+    heapq.heapify(pairs)
+
+    # merge the pairs in order, keeping the shortest name:
+    equivalences = {}
+    while pairs:
+        i, j = heapq.heappop(pairs)
+        sw_1, sw_2 = order[i], order[j]
+        if sw_1 in equivalences or sw_2 in equivalences:
+            continue  # one of the names was already discarded
+        if len(sw_1) < len(sw_2):
+            equivalences[sw_2] = sw_1
+            raw_songwriters.remove(sw_2)
+        else:
+            equivalences[sw_1] = sw_2
+            raw_songwriters.remove(sw_1)
+
+    resolve_equivalences(equivalences)
+
+    return equivalences
@@ -0,0 +1,148 @@
+from scraping.songwriter_index import SongwriterIndex, songwriter_words, \
+    songwriters_match, unify_songwriters_indexed
+from os.path import exists
+from os import replace
+import threading
+import json
+
+
+class SongwriterRegistry:
+    """
+    On-disk registry of canonical songwriter names, shared by all scraping
+    runs and artists. For each canonical name it keeps the aliases that were
+    unified with it and the words of the name (see "songwriter_words"), so
+    the names seen in previous runs are neither cleaned nor compared again:
+    known names are resolved with a dictionary lookup, and only the new names
+    are compared, with the canonical names found in a SongwriterIndex.
+    Canonical names are never renamed, so the songwriters written by earlier
+    runs stay valid.
+    """
+    def __init__(self, path):
+        """
+        :param path: (str) path to the registry JSON file. It is created when
+            the registry is first saved.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._songwriters = {}  # canonical name -> entry dictionary
+        self._aliases = {}  # alias -> canonical name
+        self._index = SongwriterIndex()
+        self._unsaved = False
+
+        if exists(path):
+            with open(path, 'r', encoding="utf-8") as registry_file:
+                self._songwriters = json.load(registry_file)['songwriters']
+        for canonical, entry in self._songwriters.items():
+            self._index.add(canonical, entry['words'])
+            for alias in entry['aliases']:
+                self._aliases[alias] = canonical
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.save()
+
+    def __contains__(self, name):
+        return name in self._songwriters or name in self._aliases
+
+    def __len__(self):
+        return len(self._songwriters)
+
+    def canonical(self, name):
+        """
+        :param name: (str) songwriter name.
+        :return canonical: (str) canonical name of a registered songwriter
+            name, or None if the name is not registered.
+        """
+        if name in self._songwriters:
+            return name
+        return self._aliases.get(name)
+
+    def _match(self, name, words):
+        # canonical name matching a new name in any direction (the shortest
+        # one, and the first one alphabetically, if there are several):
+        matches = [canonical for canonical in self._index.candidates(words)
+                   if songwriters_match(words, self._index.words[canonical])
+                   or songwriters_match(self._index.words[canonical], words)]
+        if not matches:
+            return None
+        return min(matches, key=lambda canonical: (len(canonical), canonical))
+
+    def _register(self, canonical, words=None):
+        self._songwriters[canonical] = {
+            'aliases': [],
+            'words': songwriter_words(canonical) if words is None else words}
+        self._index.add(canonical, self._songwriters[canonical]['words'])
+
+    def _add_alias(self, alias, canonical):
+        self._songwriters[canonical]['aliases'].append(alias)
+        self._aliases[alias] = canonical
+
+    def unify(self, raw_songwriters):
+        """
+        Same as "unify_songwriters", but also unifying the names with the
+        canonical names of the registry, and registering the new names and
+        merges.
+        The names not registered yet are first unified among themselves, as
+        "unify_songwriters" does. Then, each remaining new name is replaced by
+        the registered canonical name it matches, if any, or registered as a
+        new canonical name otherwise.
+        :param raw_songwriters: set(str) unique songwriter names. The names
+            replaced by another one are removed from it, and the canonical
+            names they are replaced by are added to it.
+        :return equivalences: {str->str} relates old songwriter names to discard
+            to the songwriter name it should be replaced by.
+        """
+        with self._lock:
+            equivalences = {}
+            new_songwriters = set()
+            for sw in raw_songwriters:
+                canonical = self.canonical(sw)
+                if canonical is None:
+                    new_songwriters.add(sw)
+                elif canonical != sw:
+                    equivalences[sw] = canonical
+
+            # unify the new names among themselves:
+            new_equivalences = unify_songwriters_indexed(new_songwriters)
+
+            # then with the registered ones:
+            for sw in sorted(new_songwriters):
+                words = songwriter_words(sw)
+                canonical = self._match(sw, words)
+                if canonical is None:
+                    self._register(sw, words)
+                else:
+                    self._add_alias(sw, canonical)
+                    equivalences[sw] = canonical
+            for sw, eq_sw in new_equivalences.items():
+                canonical = self.canonical(eq_sw)
+                self._add_alias(sw, canonical)
+                if canonical != sw:
+                    equivalences[sw] = canonical
+
+            if new_equivalences or new_songwriters:
+                self._unsaved = True
+
+            for sw, eq_sw in equivalences.items():
+                raw_songwriters.discard(sw)
+                raw_songwriters.add(eq_sw)
+
+            print('Songwriter registry: {} new names, {} canonical names'
+                  .format(len(new_songwriters) + len(new_equivalences),
+                          len(self._songwriters)))
+
+        return equivalences
+
+    def save(self):
+        # write the registry atomically, and only if it changed:
+        with self._lock:
+            if not self._unsaved:
+                return
+            temporary_path = self.path + '.tmp'
+            with open(temporary_path, 'w', encoding="utf-8") as registry_file:
+                json.dump({'songwriters': self._songwriters}, registry_file,
+                          indent=1, sort_keys=True)
+            replace(temporary_path, self.path)
+            self._unsaved = False
@@ -37,7 +37,6 @@ def plot_albums_avg_sentiments(albums, output_path):
         will be created.
     """
     positives, negatives, names = [], [], []
-
     for album in albums.values():
         pos = get_album_avg_pos_sentiment(album)
         neg = get_album_avg_neg_sentiment(album)
@@ -45,6 +44,19 @@ def plot_albums_avg_sentiments(albums, output_path):
         negatives.append(neg)
         names.append(album.title)
 
+    plot_avg_sentiments(names, positives, negatives, output_path)
+
+
+def plot_avg_sentiments(names, positives, negatives, output_path):
+    """
+    Generate and write a scatter plot with the given average positive and
+    negative sentiments of a series of albums.
+    :param names: ([str]) album titles.
+    :param positives: ([float]) average positive sentiment of each album.
+    :param negatives: ([float]) average negative sentiment of each album.
+    :param output_path: {str} path to the file where the output scatter plot
+        will be created.
+    """
     plt.clf()
     plt.scatter(negatives, positives)
     for i, name in enumerate(names):
@@ -1,22 +1,46 @@
-from common.songs_and_albums import load_songs_json, \
-    write_songs_json, write_songs_csv
+from common.songs_and_albums import iter_songs, write_songs_json, \
+    write_songs_json_append, write_songs_csv, write_songs_csv_append
 from sentiment.sentiment_vader import get_songs_sentiments_vader
-from sentiment.plot_sentiments import plot_albums_avg_sentiments
+from sentiment.plot_sentiments import plot_albums_avg_sentiments, \
+    plot_avg_sentiments
 from os.path import dirname, join
 from common.common import create_subdir
+from common.corpus_db import load_songs, is_corpus_db, write_songs_db
+from common.near_duplicates import remove_near_duplicates, \
+    iter_canonical_songs
 
 
-def songs_sentiments_main(input_path):
+def songs_sentiments_main(input_path, streaming=False, chunk_size=1000,
+                          skip_duplicates=False):
     """
     Performs sentiment analysis of a series of songs.
-    :param input_path: (str) path to the input file with the song lyrics.
+    :param input_path: (str) path to the input file with the song lyrics. If
+        it is a SQLite corpus file (see "CorpusDB"), the sentiments are also
+        stored in it.
+    :param streaming: (boolean) if True, the songs are read, analysed and
+        written in chunks (see "songs_sentiments_streaming"), so that input
+        files of any size can be processed in bounded memory.
+    :param chunk_size: (int) number of songs per chunk when streaming.
+    :param skip_duplicates: (boolean) if True, songs whose lyrics are
+        near-duplicates of other songs (e.g. live or compilation versions)
+        are not analysed, only the canonical representative of each cluster
+        of near-duplicates is (see "remove_near_duplicates").
     """
+    if streaming:
+        songs_sentiments_streaming(input_path, chunk_size=chunk_size,
+                                   skip_duplicates=skip_duplicates)
+        return
+
     # load songs and albums information from input file:
-    songs, albums = load_songs_json(input_path)
+    songs, albums = load_songs(input_path)
+    if skip_duplicates:
+        remove_near_duplicates(songs, albums)
 
     # get the positive, negative and compound sentiments of son lyrics with
     # VADER method:
     get_songs_sentiments_vader(songs)
+    if is_corpus_db(input_path):
+        write_songs_db(songs, input_path)
 
     # write the VADER song sentiments to a CSV file:
     base_output_dir = create_subdir(dirname(input_path), 'sentiments')
@@ -31,6 +55,51 @@ def songs_sentiments_main(input_path):
     plot_albums_avg_sentiments(albums, output_plot_path)
 
 
+def songs_sentiments_streaming(input_path, chunk_size=1000,
+                               skip_duplicates=False):
+    """
+    Same as "songs_sentiments_main", but only a chunk of songs is in memory at
+    a time: each chunk is read, analysed and appended to the output files
+    before reading the next one, and only the sums needed for the average
+    sentiments of each album are kept.
+    :param input_path: (str) path to the input file with the song lyrics.
+    :param chunk_size: (int) number of songs per chunk.
+    :param skip_duplicates: (boolean) see "songs_sentiments_main". The
+        near-duplicates are found in a first pass over the input file (see
+        "iter_canonical_songs").
+    """
+    base_output_dir = create_subdir(dirname(input_path), 'sentiments')
+    json_output_path = join(base_output_dir, 'vader_lyrics_sentiments.json')
+    csv_output_path = join(base_output_dir, 'vader_lyrics_sentiments.csv')
+    write_songs_json({}, json_output_path)
+    write_songs_csv({}, csv_output_path)
+
+    # album title -> [number of songs, sum of positive sentiments, sum of
+    # negative sentiments]:
+    album_sums = {}
+    if skip_duplicates:
+        chunks = iter_canonical_songs(input_path, chunk_size=chunk_size)
+    else:
+        chunks = iter_songs(input_path, chunk_size=chunk_size)
+    for songs in chunks:
+        get_songs_sentiments_vader(songs)
+        if is_corpus_db(input_path):
+            write_songs_db(songs, input_path)
+        write_songs_json_append(songs, json_output_path)
+        write_songs_csv_append(songs, csv_output_path)
+        for song in songs.values():
+            sums = album_sums.setdefault(song.album.title, [0, 0., 0.])
+            sums[0] += 1
+            sums[1] += song.positive_sentiment
+            sums[2] += song.negative_sentiment
+
+    names = list(album_sums)
+    positives = [album_sums[name][1] / album_sums[name][0] for name in names]
+    negatives = [album_sums[name][2] / album_sums[name][0] for name in names]
+    output_plot_path = join(base_output_dir, 'vader_album_lyrics_sentiments')
+    plot_avg_sentiments(names, positives, negatives, output_plot_path)
+
+
 if __name__ == '__main__':
     songs_path = r"C:\Users\pablo\ProjectsData\Lyrics\David Bowie\sentiments\vader_lyrics_sentiments.json"
     songs_sentiments_main(songs_path)
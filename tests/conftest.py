@@ -0,0 +1,6 @@
+from os.path import dirname, abspath
+import sys
+
+
+# the tests import the project modules from the repository root:
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
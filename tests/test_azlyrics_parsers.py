@@ -0,0 +1,120 @@
+from scraping.scrape_discography_azlyrics import parse_discography_html, \
+    load_artist_discography
+from scraping.scrape_lyrics_azlyrics import parse_lyrics_html
+from scraping.page_backends import ThrottledError
+from contextlib import contextmanager
+from os.path import dirname, join
+import pytest
+
+
+FIXTURES_DIR = join(dirname(__file__), 'fixtures')
+ARTIST_URL = 'https://www.azlyrics.com/d/davidbowie.html'
+
+
+def read_fixture(file_name):
+    with open(join(FIXTURES_DIR, file_name), 'r', encoding="utf-8") as page:
+        return page.read()
+
+
+def test_parse_discography_html_albums():
+    _songs, albums = parse_discography_html(
+        read_fixture('azlyrics_discography.html'), ARTIST_URL)
+    assert [(album.title, album.year, album.number, album.album_type)
+            for album in albums.values()] == [
+        ('Space Oddity', 1969, 1, 'album'),
+        ('Hunky Dory', 1971, 2, 'album'),
+        ('other songs', None, 3, None)]
+
+
+def test_parse_discography_html_songs():
+    songs, albums = parse_discography_html(
+        read_fixture('azlyrics_discography.html'), ARTIST_URL)
+    assert list(songs) == ['Space Oddity',
+                           'Unwashed And Somewhat Slightly Dazed',
+                           'Changes',
+                           'Space Oddity (Hunky Dory)',
+                           'Bombers ',
+                           'The Laughing Gnome']
+
+    song = songs['Space Oddity (Hunky Dory)']
+    assert song.title == 'Space Oddity'
+    assert song.album is albums['Hunky Dory']
+    assert song.track_number == 2
+    assert song.instrumental is False
+    # relative links are resolved against the artist URL:
+    assert song.lyrics_url == \
+        'https://www.azlyrics.com/lyrics/davidbowie/spaceoddity.html'
+
+    instrumental = songs['Bombers ']
+    assert instrumental.instrumental is True
+    assert instrumental.lyrics_url is None
+
+
+class FakeDriver:
+    # browser session whose scripts return a fixed result:
+    def __init__(self, script_result, page_source):
+        self.script_result = script_result
+        self.page_source = page_source
+        self.title = 'AZLyrics'
+
+    def get(self, url):
+        pass
+
+    def execute_script(self, script):
+        return self.script_result
+
+
+class FakeDriverPool:
+    def __init__(self, driver):
+        self.driver = driver
+
+    @contextmanager
+    def lease(self):
+        yield self.driver
+
+
+def test_parse_discography_html_without_list():
+    with pytest.raises(ThrottledError):
+        parse_discography_html(read_fixture('azlyrics_captcha.html'),
+                               ARTIST_URL)
+    with pytest.raises(ValueError):
+        parse_discography_html('<html><body></body></html>', ARTIST_URL)
+
+
+def test_load_artist_discography_browser_without_list():
+    # the discography script returns null when the list is missing:
+    captcha_pool = FakeDriverPool(
+        FakeDriver(None, read_fixture('azlyrics_captcha.html')))
+    with pytest.raises(ThrottledError):
+        load_artist_discography(ARTIST_URL, None, driver_pool=captcha_pool)
+
+    empty_pool = FakeDriverPool(FakeDriver(None, '<html></html>'))
+    with pytest.raises(ValueError):
+        load_artist_discography(ARTIST_URL, None, driver_pool=empty_pool)
+
+
+def test_load_artist_discography_browser():
+    entries = [['album', 'album: "Hunky Dory" (1971)', None],
+               ['listalbum-item', 'Changes', ARTIST_URL + '#changes']]
+    pool = FakeDriverPool(FakeDriver(entries, ''))
+    songs, albums = load_artist_discography(ARTIST_URL, None,
+                                            driver_pool=pool)
+    assert list(albums) == ['Hunky Dory']
+    assert songs['Changes'].lyrics_url == ARTIST_URL + '#changes'
+
+
+def test_parse_lyrics_html():
+    lyrics, songwriters = parse_lyrics_html(
+        read_fixture('azlyrics_lyrics.html'))
+    assert lyrics == ("I still don't know what I was waiting for\n"
+                      "And my time was running wild\n"
+                      "A million dead-end streets\n"
+                      "\n"
+                      "Ch-ch-ch-ch-changes\n"
+                      "(Turn and face the strange)")
+    assert songwriters == {'David Bowie', 'Mick Ronson'}
+
+
+def test_parse_lyrics_html_throttled():
+    with pytest.raises(ThrottledError):
+        parse_lyrics_html(read_fixture('azlyrics_captcha.html'))
@@ -0,0 +1,59 @@
+import json
+import pytest
+from common.songs_and_albums import Song, Album, iter_songs, \
+    write_songs_json, _without_json_lyrics, song_json_line, \
+    MAX_SKIPPED_QUOTES
+
+
+LYRICS = [
+    'Ground control to Major Tom\nCommencing countdown',
+    'She said "hello" and \\"left\\"',
+    'ends with a backslash \\',
+    '\\\\"' * 40,  # more escaped quotes than are skipped
+    '"lyrics": "not the key"',
+    '',
+]
+
+
+def make_songs():
+    album = Album('Space Oddity')
+    album.year = 1969
+    songs = []
+    for number, lyrics in enumerate(LYRICS, 1):
+        song = Song('Song {}'.format(number))
+        song.artist = 'David Bowie'
+        song.track_number = number
+        song.album = album
+        song.lyrics = lyrics
+        song.songwriters = {'David Bowie'}
+        songs.append(song)
+    return songs
+
+
+@pytest.mark.parametrize('lyrics', LYRICS)
+def test_without_json_lyrics(lyrics):
+    song = make_songs()[0]
+    song.lyrics = lyrics
+    line = song_json_line(song).rstrip()
+    expected = json.loads(line)
+    skipped = json.loads(_without_json_lyrics(line))
+    # lyrics with too many escaped quotes are decoded anyway:
+    assert skipped['lyrics'] in (None, lyrics)
+    skipped['lyrics'] = lyrics
+    assert skipped == expected
+    if lyrics.count('"') < MAX_SKIPPED_QUOTES:
+        assert '"lyrics": null' in _without_json_lyrics(line)
+
+
+def test_iter_songs_json_fields(tmp_path):
+    path = str(tmp_path / 'songs.json')
+    write_songs_json(make_songs(), path)
+
+    songs = list(iter_songs(path, fields={'track_number'}))
+    assert [song.track_number for song in songs] == \
+        list(range(1, len(LYRICS) + 1))
+    assert all(song.lyrics is None for song in songs)
+    assert all(song.artist is None for song in songs)
+
+    songs = list(iter_songs(path, fields={'lyrics'}))
+    assert [song.lyrics for song in songs] == LYRICS
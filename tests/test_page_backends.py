@@ -0,0 +1,91 @@
+from scraping.page_backends import HttpBackend, PageFetchError
+from scraping.scrape_discography_azlyrics import load_artist_discography
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from os.path import dirname, join
+import threading
+import gzip
+import pytest
+
+
+FIXTURES_DIR = join(dirname(__file__), 'fixtures')
+
+# path -> fixture served by the local server:
+PAGES = {'/d/davidbowie.html': 'azlyrics_discography.html',
+         '/lyrics/davidbowie/changes.html': 'azlyrics_lyrics.html'}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    # serves the fixtures with keep-alive connections, gzipped if accepted,
+    # and records the client port of every request:
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.client_ports.append(self.client_address[1])
+        if self.path == '/old':
+            self.send_response(301)
+            self.send_header('Location', '/d/davidbowie.html')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path not in PAGES:
+            self.send_error(404)
+            return
+
+        with open(join(FIXTURES_DIR, PAGES[self.path]), 'rb') as page:
+            body = page.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    http_server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    http_server.client_ports = []
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield http_server
+    http_server.shutdown()
+    http_server.server_close()
+
+
+def server_url(server, path):
+    return 'http://127.0.0.1:{}{}'.format(server.server_address[1], path)
+
+
+def test_http_backend_reuses_connection(server):
+    with HttpBackend(timeout=5) as backend:
+        for _ in range(3):
+            for path, file_name in PAGES.items():
+                with open(join(FIXTURES_DIR, file_name), 'r',
+                          encoding="utf-8") as page:
+                    assert backend.fetch(server_url(server, path)) == \
+                        page.read()
+    # all the requests were sent through the same keep-alive connection:
+    assert len(server.client_ports) == 6
+    assert len(set(server.client_ports)) == 1
+
+
+def test_http_backend_redirect_and_errors(server):
+    with HttpBackend(timeout=5) as backend:
+        assert 'listAlbum' in backend.fetch(server_url(server, '/old'))
+        with pytest.raises(PageFetchError) as error:
+            backend.fetch(server_url(server, '/missing'))
+    assert error.value.status == 404
+
+
+def test_load_artist_discography_http(server):
+    with HttpBackend(timeout=5) as backend:
+        songs, albums = load_artist_discography(
+            server_url(server, '/d/davidbowie.html'), None, backend=backend)
+    assert list(albums) == ['Space Oddity', 'Hunky Dory', 'other songs']
+    assert songs['Changes'].lyrics_url == \
+        server_url(server, '/lyrics/davidbowie/changes.html')
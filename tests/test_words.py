@@ -0,0 +1,59 @@
+import common.words as words
+from common.words import get_word_stats, get_words, get_num_words, \
+    get_num_unique_words
+from common.songs_and_albums import Song, Album, write_songs_json, \
+    write_songs_csv, iter_songs
+
+
+def counting_tokens(monkeypatch):
+    # count the texts split by "get_word_stats":
+    calls = []
+    get_tokens = words.get_tokens
+
+    def tokens(lyrics):
+        calls.append(lyrics)
+        return get_tokens(lyrics)
+    monkeypatch.setattr(words, 'get_tokens', tokens)
+    monkeypatch.setattr(words, '_word_stats_cache', words.OrderedDict())
+    return calls
+
+
+def test_word_stats():
+    lyrics = 'Ground control to Major Tom\n(ten, nine) ground control'
+    assert get_words(lyrics) == ['Ground', 'control', 'to', 'Major', 'Tom',
+                                 'ten', 'nine', 'ground', 'control']
+    assert get_word_stats(lyrics) == (9, 8)
+    assert get_num_words(lyrics) == 9
+    assert get_num_unique_words(lyrics) == 8
+    assert get_word_stats('') == (1, 1)
+
+
+def test_word_stats_written_once(monkeypatch, tmp_path):
+    calls = counting_tokens(monkeypatch)
+    album = Album('Album')
+    songs = []
+    for number in range(2000):
+        song = Song('Song {}'.format(number))
+        song.album = album
+        song.lyrics = 'la ' * (number % 7) + 'song {}'.format(number)
+        songs.append(song)
+
+    write_songs_json(songs, str(tmp_path / 'songs.json'))
+    write_songs_csv(songs, str(tmp_path / 'songs.csv'))
+    assert len(calls) == len(songs)
+
+    # equal lyrics read again are new strings, but are not split again:
+    read_songs = list(iter_songs(str(tmp_path / 'songs.json')))
+    write_songs_csv(read_songs, str(tmp_path / 'copy.csv'))
+    assert len(calls) == len(songs)
+
+
+def test_word_stats_cache_bounded(monkeypatch):
+    calls = counting_tokens(monkeypatch)
+    monkeypatch.setattr(words, 'WORD_STATS_CACHE_SIZE', 10)
+    for number in range(30):
+        get_word_stats('text {}'.format(number))
+    assert len(words._word_stats_cache) == 10
+    get_word_stats('text 29')
+    get_word_stats('text 0')
+    assert len(calls) == 31
@@ -1,14 +1,20 @@
-from common.songs_and_albums import load_songs_json
+from common.songs_and_albums import iter_songs
+from common.corpus_db import load_songs
+from common.near_duplicates import remove_near_duplicates, \
+    iter_canonical_songs
 from wordclouds.plot_wordcloud import plot_and_save_wordcloud
 from common.common import string_for_path, create_subdir
 from common.clean_lyrics import apply_lowercase, filter_pos
+from common.tag_cache import TagCache, TAG_CACHE_FILE
 from os.path import dirname, join
 from wordcloud import WordCloud
 from datetime import datetime
+from tempfile import TemporaryDirectory
+import json
 
 
 def get_word_cloud(lyrics, title, output_dir, min_word_length=0,
-                   stopwords=set(), pos_tags=set()):
+                   stopwords=set(), pos_tags=set(), tagged=None):
     """
     Generates a wordcloud of some given lyrics under some specifications.
     :param lyrics: (str)
@@ -18,13 +24,15 @@ def get_word_cloud(lyrics, title, output_dir, min_word_length=0,
     :param min_word_length: (int) discard words shorter than N characters.
     :param stopwords: ([str])
     :param pos_tags: ([str])
+    :param tagged: ([(str, str)]) part-of-speech tags of the lowercased
+        lyrics (see "lyrics_tags"), if already known.
     """
     # clean lyrics
     lyrics = apply_lowercase(lyrics)
 
     # keep only words of a certain part-of-speech (e.g. nouns, verbs...)
     if pos_tags:
-        lyrics = filter_pos(lyrics, pos_tags)
+        lyrics = filter_pos(lyrics, pos_tags, tagged=tagged)
 
     try:
         # generate word cloud from lyrics:
@@ -41,95 +49,243 @@ def get_word_cloud(lyrics, title, output_dir, min_word_length=0,
         pass
 
 
-def word_clouds_main(input_path, stopwords_path=None):
+def get_word_clouds(lyrics, title, output_dir, stopwords, tagged=None):
+    """
+    Generates the three word clouds of some given lyrics: with all the words,
+    removing stopwords, and only with nouns.
+    :param lyrics: (str)
+    :param title: (str) title of the word cloud charts.
+    :param output_dir: (str) directory under which the output word clouds will
+        be created.
+    :param stopwords: ([str])
+    :param tagged: ([(str, str)]) see "get_word_cloud".
+    """
+    get_word_cloud(lyrics,
+                   title,
+                   output_dir)
+    get_word_cloud(lyrics,
+                   title + '\n*removing stopwords*',
+                   output_dir,
+                   stopwords=stopwords)
+    get_word_cloud(lyrics,
+                   title + '\n*only nouns*',
+                   output_dir,
+                   stopwords=stopwords,
+                   pos_tags={'NN', 'NNS', 'NNP', 'NNPS'},
+                   tagged=tagged)
+
+
+def lyrics_tags(songs, tag_cache):
+    """
+    Part-of-speech tags of the lowercased lyrics of some songs, as they are
+    filtered by "get_word_cloud": the tags of each song are read from the
+    cache (or tagged together and stored, the first time), and the tags of
+    several songs (e.g. of an album) are those of their songs, one after the
+    other, instead of tagging their joined lyrics again.
+    :param songs: iterable(Song object)
+    :param tag_cache: (TagCache object)
+    :return tagged: ([(str, str)])
+    """
+    tagged = []
+    for song_tags in tag_cache.tag_many([apply_lowercase(song.lyrics)
+                                         for song in songs
+                                         if song.lyrics is not None]):
+        tagged.extend(song_tags)
+    return tagged
+
+
+def song_chart_title(song):
+    # title of the word cloud charts of a song:
+    return '({}: {})\n{} - {}'.format(song.album.year, song.album.title,
+                                      song.track_number, song.title)
+
+
+def load_stopwords(stopwords_path=None):
+    # stopwords to consider, by default those in 'stopwords.txt':
+    if stopwords_path is None:
+        stopwords_path = 'stopwords.txt'
+    return set([line.rstrip() for line in open(stopwords_path)])
+
+
+def word_clouds_main(input_path, stopwords_path=None, streaming=False,
+                     skip_duplicates=False, tag_cache_path=None):
     """
     Generate files with word clouds of all songs and albums in the provided
     input file.
-    :param input_path: (str) path to the input file with the songs information.
+    :param input_path: (str) path to the input JSON, CSV or SQLite corpus file
+        with the songs information.
     :param stopwords_path: (str) path to the input file with the stopwords.
+    :param streaming: (boolean) if True, the songs are read one at a time
+        (see "word_clouds_streaming"), so that input files of any size can be
+        processed in bounded memory.
+    :param skip_duplicates: (boolean) if True, no word clouds are generated
+        for songs whose lyrics are near-duplicates of other songs (e.g. live
+        or compilation versions), and their lyrics are not added to their
+        albums and songwriters (see "remove_near_duplicates").
+    :param tag_cache_path: (str) path to the SQLite file in which the
+        part-of-speech tags of the lyrics are cached (see "TagCache"), so
+        that the lyrics are not tagged again in later runs. By default,
+        TAG_CACHE_FILE in the output directory.
     """
+    if streaming:
+        word_clouds_streaming(input_path, stopwords_path=stopwords_path,
+                              skip_duplicates=skip_duplicates,
+                              tag_cache_path=tag_cache_path)
+        return
+
     # generate base output directory from input path:
     base_output_dir = create_subdir(dirname(input_path), 'wordclouds')
+    if tag_cache_path is None:
+        tag_cache_path = join(base_output_dir, TAG_CACHE_FILE)
 
     # load songs and albums information from input file:
-    songs, albums = load_songs_json(input_path)
+    songs, albums = load_songs(input_path)
+    if skip_duplicates:
+        remove_near_duplicates(songs, albums)
 
     # stopwords to consider when specified so:
-    if stopwords_path is None:
-        stopwords_path = 'stopwords.txt'
-    stopwords = set([line.rstrip() for line in open(stopwords_path)])
-
-    # albums:
-    albums_dir = create_subdir(base_output_dir, 'albums')
-    for album in albums.values():
-        album_lyrics = ' '.join([song.lyrics for song in album.songs
-                                 if song.lyrics is not None])
-        chart_title = '({}) {}'.format(album.year, album.title)
-        get_word_cloud(album_lyrics,
-                       chart_title,
-                       albums_dir)
-        get_word_cloud(album_lyrics,
-                       chart_title + '\n*removing stopwords*',
-                       albums_dir,
-                       stopwords=stopwords)
-        get_word_cloud(album_lyrics,
-                       chart_title + '\n*only nouns*',
-                       albums_dir,
-                       stopwords=stopwords,
-                       pos_tags={'NN', 'NNS', 'NNP', 'NNPS'})
-    print('{}\tAlbum word clouds written.'.format(datetime.now()))
-
-    # songs:
+    stopwords = load_stopwords(stopwords_path)
+
+    with TagCache(tag_cache_path) as tag_cache:
+
+        # albums:
+        albums_dir = create_subdir(base_output_dir, 'albums')
+        for album in albums.values():
+            album_lyrics = ' '.join([song.lyrics for song in album.songs
+                                     if song.lyrics is not None])
+            chart_title = '({}) {}'.format(album.year, album.title)
+            get_word_clouds(album_lyrics, chart_title, albums_dir, stopwords,
+                            tagged=lyrics_tags(album.songs, tag_cache))
+        print('{}\tAlbum word clouds written.'.format(datetime.now()))
+
+        # songs:
+        songs_dir = create_subdir(base_output_dir, 'songs')
+        for song in songs.values():
+            if song.instrumental:
+                continue
+            get_word_clouds(song.lyrics, song_chart_title(song), songs_dir,
+                            stopwords, tagged=lyrics_tags([song], tag_cache))
+        print('{}\tSong word clouds written.'.format(datetime.now()))
+
+        # songwriters
+        songwriter_to_songs = {}
+        for song in songs.values():
+            if song.instrumental:
+                continue
+            for sw in song.songwriters:
+                if sw not in songwriter_to_songs:
+                    songwriter_to_songs[sw] = []
+                songwriter_to_songs[sw].append(song)
+
+        songwriters_dir = create_subdir(base_output_dir, 'songwriters')
+        for songwriter, sw_songs in songwriter_to_songs.items():
+            sw_lyrics = ''.join(['{}\n\n'.format(song.lyrics)
+                                 for song in sw_songs])
+            chart_title = 'Songwriter: {}'.format(songwriter)
+            get_word_clouds(sw_lyrics, chart_title, songwriters_dir, stopwords,
+                            tagged=lyrics_tags(sw_songs, tag_cache))
+        print('{}\tSongwriter word clouds written.'.format(datetime.now()))
+
+    print('{}\tAll word clouds written ({} lyrics tagged, {} read from the '
+          'tags cache).'.format(datetime.now(), tag_cache.misses,
+                                tag_cache.hits))
+
+
+def word_clouds_streaming(input_path, stopwords_path=None,
+                          skip_duplicates=False, tag_cache_path=None):
+    """
+    Same as "word_clouds_main", but reading the songs one at a time: the song
+    word clouds are generated as the songs are read, while the lyrics of each
+    album and songwriter are appended to temporary spill files, from which
+    the album and songwriter word clouds are generated once all songs have
+    been read. The part-of-speech tags of each song are spilled the same way,
+    so that the lyrics of the albums and songwriters are not tagged again.
+    Only the lyrics of one song, album or songwriter are in memory at a
+    time.
+    :param input_path: (str) path to the input file with the songs information.
+    :param stopwords_path: (str) path to the input file with the stopwords.
+    :param skip_duplicates: (boolean) see "word_clouds_main". The
+        near-duplicates are found in a first pass over the input file (see
+        "iter_canonical_songs").
+    :param tag_cache_path: (str) see "word_clouds_main".
+    """
+    base_output_dir = create_subdir(dirname(input_path), 'wordclouds')
+    stopwords = load_stopwords(stopwords_path)
+    if tag_cache_path is None:
+        tag_cache_path = join(base_output_dir, TAG_CACHE_FILE)
+
+    def read_tags(spill_path):
+        # tags of the songs spilled to a file, one after the other:
+        return [pair for line in open(spill_path, encoding="utf-8")
+                for pair in json.loads(line)]
+
     songs_dir = create_subdir(base_output_dir, 'songs')
-    for song in songs.values():
-        if song.instrumental:
-            continue
-        chart_title = '({}: {})\n{} - {}'.format(song.album.year,
-                                                 song.album.title,
-                                                 song.track_number,
-                                                 song.title)
-        get_word_cloud(song.lyrics,
-                       chart_title,
-                       songs_dir)
-        get_word_cloud(song.lyrics,
-                       chart_title + '\n*removing stopwords*',
-                       songs_dir,
-                       stopwords=stopwords)
-        get_word_cloud(song.lyrics,
-                       chart_title + '\n*only nouns*',
-                       songs_dir,
-                       stopwords=stopwords,
-                       pos_tags={'NN', 'NNS', 'NNP', 'NNPS'})
-    print('{}\tSong word clouds written.'.format(datetime.now()))
-
-    # songwriters
-    songwriter_to_lyrics = {}
-    for song in songs.values():
-        if song.instrumental:
-            continue
-        for sw in song.songwriters:
-            if sw not in songwriter_to_lyrics:
-                songwriter_to_lyrics[sw] = ''
-            songwriter_to_lyrics[sw] += '{}\n\n'.format(song.lyrics)
-
-    songwriters_dir = create_subdir(base_output_dir, 'songwriters')
-    for songwriter, sw_lyrics in songwriter_to_lyrics.items():
-        chart_title = 'Songwriter: {}'.format(songwriter)
-        get_word_cloud(sw_lyrics,
-                       chart_title,
-                       songwriters_dir)
-        get_word_cloud(sw_lyrics,
-                       chart_title + '\n*removing stopwords*',
-                       songwriters_dir,
-                       stopwords=stopwords)
-        get_word_cloud(sw_lyrics,
-                       chart_title + '\n*only nouns*',
-                       songwriters_dir,
-                       stopwords=stopwords,
-                       pos_tags={'NN', 'NNS', 'NNP', 'NNPS'})
-    print('{}\tSongwriter word clouds written.'.format(datetime.now()))
-
-    print('{}\tAll word clouds written.'.format(datetime.now()))
+    albums, album_files, songwriter_files = {}, {}, {}
+    album_tag_files, songwriter_tag_files = {}, {}
+    with TemporaryDirectory() as spill_dir, \
+            TagCache(tag_cache_path) as tag_cache:
+
+        def spill(files, prefix, name, text, separator):
+            # append text to the spill file of an album or songwriter:
+            is_new = name not in files
+            if is_new:
+                files[name] = join(spill_dir,
+                                   '{}_{}.txt'.format(prefix, len(files)))
+            with open(files[name], 'a', encoding="utf-8") as spill_file:
+                spill_file.write(text if is_new else separator + text)
+
+        # songs:
+        fields = {'track_number', 'lyrics', 'instrumental', 'songwriters'}
+        if skip_duplicates:
+            songs = iter_canonical_songs(input_path, fields=fields)
+        else:
+            songs = iter_songs(input_path, fields=fields)
+        for song in songs:
+            albums[song.album.title] = song.album
+            tagged = lyrics_tags([song], tag_cache)
+            tags_line = '{}\n'.format(json.dumps(tagged))
+            if song.lyrics is not None:
+                spill(album_files, 'album', song.album.title, song.lyrics,
+                      ' ')
+                spill(album_tag_files, 'album_tags', song.album.title,
+                      tags_line, '')
+            if song.instrumental:
+                continue
+            get_word_clouds(song.lyrics, song_chart_title(song), songs_dir,
+                            stopwords, tagged=tagged)
+            for sw in song.songwriters:
+                spill(songwriter_files, 'songwriter', sw,
+                      '{}\n\n'.format(song.lyrics), '')
+                spill(songwriter_tag_files, 'songwriter_tags', sw, tags_line,
+                      '')
+        print('{}\tSong word clouds written.'.format(datetime.now()))
+
+        # albums:
+        albums_dir = create_subdir(base_output_dir, 'albums')
+        for album_title, album in albums.items():
+            album_lyrics, album_tags = '', []
+            if album_title in album_files:
+                album_lyrics = open(album_files[album_title],
+                                    encoding="utf-8").read()
+                album_tags = read_tags(album_tag_files[album_title])
+            chart_title = '({}) {}'.format(album.year, album.title)
+            get_word_clouds(album_lyrics, chart_title, albums_dir, stopwords,
+                            tagged=album_tags)
+        print('{}\tAlbum word clouds written.'.format(datetime.now()))
+
+        # songwriters:
+        songwriters_dir = create_subdir(base_output_dir, 'songwriters')
+        for songwriter, spill_path in songwriter_files.items():
+            sw_lyrics = open(spill_path, encoding="utf-8").read()
+            chart_title = 'Songwriter: {}'.format(songwriter)
+            get_word_clouds(sw_lyrics, chart_title, songwriters_dir,
+                            stopwords,
+                            tagged=read_tags(songwriter_tag_files[songwriter]))
+        print('{}\tSongwriter word clouds written.'.format(datetime.now()))
+
+    print('{}\tAll word clouds written ({} lyrics tagged, {} read from the '
+          'tags cache).'.format(datetime.now(), tag_cache.misses,
+                                tag_cache.hits))
 
 
 if __name__ == '__main__':